@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MlConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ml"
+
+    def ready(self):
+        """
+        Build the pipeline of the online updates at the start of the app, so
+        that the first comparisons don't wait for the compilation of its
+        kernels.
+        """
+        if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
+            # pylint: disable=import-outside-toplevel
+            from ml.online_updates import get_online_pipeline
+
+            get_online_pipeline()
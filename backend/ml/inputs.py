@@ -1,61 +1,147 @@
+import json
+from datetime import datetime
 from functools import cached_property
+from itertools import islice
+from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
-from django.db.models import F, Q
+from django.db.models import F, Q, Value
 from solidago.pipeline import PipelineInput
 
 from core.models import User
 from tournesol.models import (
     ComparisonCriteriaScore,
+    ComparisonDeletion,
     ContributorRating,
     ContributorRatingCriteriaScore,
     ContributorScaling,
 )
 from vouch.models import Voucher
 
+# Number of rows fetched at once from the server-side cursors
+QUERY_CHUNK_SIZE = 100_000
+
+COMPARISONS_FIELDS = {
+    "user_id": ("comparison__user_id", np.int64),
+    "entity_a": ("comparison__entity_1_id", np.int64),
+    "entity_b": ("comparison__entity_2_id", np.int64),
+    "criterion": ("criteria", "category"),
+    "score": ("score", np.float64),
+    "score_max": ("score_max", np.int64),
+    "weight": ("weight", np.float64),
+}
+
+INDIVIDUAL_SCORES_FIELDS = {
+    "user_id": ("contributor_rating__user_id", np.int64),
+    "entity_id": ("contributor_rating__entity_id", np.int64),
+    "criterion": ("criteria", "category"),
+    "raw_score": ("raw_score", np.float64),
+    "raw_uncertainty": ("raw_uncertainty", np.float64),
+}
+
 
 class MlInputFromDb(PipelineInput):
-    def __init__(self, poll_name: str):
+    def __init__(self, poll_name: str, last_run_started_at: Optional[datetime] = None):
+        """
+        `last_run_started_at`: start time of the previous ML run. When provided,
+        the comparisons edited or deleted since then are used to reuse the
+        individual models of the users without new comparisons.
+        """
         self.poll_name = poll_name
+        self.last_run_started_at = last_run_started_at
 
-    def get_comparisons(self, criterion=None, user_id=None) -> pd.DataFrame:
+    def save_snapshot(self, directory) -> "MlInputFromSnapshot":
+        """
+        Fetches the input data of all criteria at once, and saves them as
+        numpy arrays in `directory`. The returned `MlInputFromSnapshot` reads
+        them as memory-mapped files, so that the processes computing the
+        different criteria share a single copy of the poll data.
+        """
+        directory = Path(directory)
+        comparisons = ComparisonCriteriaScore.objects.filter(
+            comparison__poll__name=self.poll_name,
+            comparison__user__is_active=True,
+        )
+        if self.last_run_started_at is not None:
+            # Flags the comparisons returned by `get_new_comparisons()`
+            comparisons = comparisons.annotate(is_new=self.new_comparisons_filter())
+        else:
+            comparisons = comparisons.annotate(is_new=Value(False))
+        comparisons = read_frame(
+            comparisons, {**COMPARISONS_FIELDS, "is_new": ("is_new", bool)}
+        )
+        individual_scores = read_frame(
+            ContributorRatingCriteriaScore.objects.filter(
+                contributor_rating__poll__name=self.poll_name,
+                contributor_rating__user__is_active=True,
+            ),
+            INDIVIDUAL_SCORES_FIELDS,
+        )
+        criteria = sorted(set(comparisons["criterion"]) | set(individual_scores["criterion"]))
+        _save_columns(directory / "comparisons", comparisons, criteria)
+        _save_columns(directory / "individual_scores", individual_scores, criteria)
+
+        ratings_properties = self.ratings_properties
+        _save_columns(directory / "ratings_properties", pd.DataFrame({
+            "user_id": ratings_properties["user_id"].to_numpy(dtype=np.int64),
+            "entity_id": ratings_properties["entity_id"].to_numpy(dtype=np.int64),
+            "is_public": ratings_properties["is_public"].to_numpy(dtype=bool),
+        }))
+        users = self.get_users()
+        _save_columns(directory / "users", pd.DataFrame({
+            "user_id": users.index.to_numpy(dtype=np.int64),
+            "is_pretrusted": users["is_pretrusted"].to_numpy(dtype=bool),
+            "trust_score": users["trust_score"].to_numpy(dtype=np.float64, na_value=np.nan),
+        }))
+        vouches = self.get_vouches()
+        _save_columns(directory / "vouches", pd.DataFrame({
+            "voucher": vouches["voucher"].to_numpy(dtype=np.int64),
+            "vouchee": vouches["vouchee"].to_numpy(dtype=np.int64),
+            "vouch": vouches["vouch"].to_numpy(dtype=np.float64),
+        }))
+        with open(directory / "snapshot.json", "w", encoding="utf-8") as snapshot_file:
+            json.dump({
+                "criteria": criteria,
+                "incremental": self.last_run_started_at is not None,
+            }, snapshot_file)
+
+        return MlInputFromSnapshot(directory)
+
+    def new_comparisons_filter(self) -> Q:
+        """
+        The comparisons edited since the last run, and all the comparisons of
+        the users who deleted a comparison since then: the deleted comparisons
+        leave the compared entities unchanged when they were compared in other
+        comparisons, and the models of these users must be learned again.
+        """
+        return Q(comparison__datetime_lastedit__gte=self.last_run_started_at) | Q(
+            comparison__user__in=ComparisonDeletion.objects.filter(
+                poll__name=self.poll_name,
+                datetime_deleted__gte=self.last_run_started_at,
+            ).values("user_id")
+        )
+
+    def get_comparisons(self, criterion=None, user_id=None, only_new=False) -> pd.DataFrame:
         scores_queryset = ComparisonCriteriaScore.objects.filter(
             comparison__poll__name=self.poll_name,
             comparison__user__is_active=True,
         )
+        if only_new:
+            scores_queryset = scores_queryset.filter(self.new_comparisons_filter())
         if criterion is not None:
             scores_queryset = scores_queryset.filter(criteria=criterion)
 
         if user_id is not None:
             scores_queryset = scores_queryset.filter(comparison__user_id=user_id)
 
-        values = scores_queryset.values(
-            "score",
-            "score_max",
-            "weight",
-            criterion=F("criteria"),
-            entity_a=F("comparison__entity_1_id"),
-            entity_b=F("comparison__entity_2_id"),
-            user_id=F("comparison__user_id"),
-        )
-        if len(values) > 0:
-            dtf = pd.DataFrame(values)
-            return dtf[
-                ["user_id", "entity_a", "entity_b", "criterion", "score", "score_max", "weight"]
-            ]
+        return read_frame(scores_queryset, COMPARISONS_FIELDS)
 
-        return pd.DataFrame(
-            columns=[
-                "user_id",
-                "entity_a",
-                "entity_b",
-                "criterion",
-                "score",
-                "score_max",
-                "weight",
-            ]
-        )
+    def get_new_comparisons(self, criterion=None) -> Optional[pd.DataFrame]:
+        if self.last_run_started_at is None:
+            return None
+        return self.get_comparisons(criterion=criterion, only_new=True)
 
     @cached_property
     def ratings_properties(self):
@@ -127,17 +213,7 @@ class MlInputFromDb(PipelineInput):
         if user_id is not None:
             scores_queryset = scores_queryset.filter(contributor_rating__user_id=user_id)
 
-        values = scores_queryset.values(
-            "raw_score",
-            criterion=F("criteria"),
-            entity_id=F("contributor_rating__entity_id"),
-            user_id=F("contributor_rating__user_id"),
-        )
-        if len(values) == 0:
-            return pd.DataFrame(columns=["user_id", "entity_id", "criterion", "raw_score"])
-
-        dtf = pd.DataFrame(values)
-        return dtf[["user_id", "entity_id", "criterion", "raw_score"]]
+        return read_frame(scores_queryset, INDIVIDUAL_SCORES_FIELDS)
 
     def get_vouches(self):
         values = Voucher.objects.filter(
@@ -165,3 +241,157 @@ class MlInputFromDb(PipelineInput):
             data=values,
             columns=["user_id", "is_pretrusted", "trust_score"],
         ).set_index("user_id")
+
+
+def read_frame(queryset, fields: dict[str, tuple[str, object]]) -> pd.DataFrame:
+    """
+    Reads a queryset into a DataFrame, where `fields` maps each column name
+    to the queried field and to the numpy dtype of the column. Columns of
+    dtype "category" are kept as a `pd.Categorical` of strings, with sorted
+    categories, so that rows only hold the codes of the shared strings.
+
+    Rows are streamed from a server-side cursor and converted chunk by chunk
+    into typed arrays, so that the memory used is proportional to the size
+    of the arrays, rather than to the python objects of every row.
+    """
+    rows = queryset.values_list(*(field for field, _ in fields.values())).iterator(
+        chunk_size=QUERY_CHUNK_SIZE
+    )
+    chunks: dict[str, list] = {column: [] for column in fields}
+    while chunk := list(islice(rows, QUERY_CHUNK_SIZE)):
+        for (column, (_, dtype)), values in zip(fields.items(), zip(*chunk)):
+            if dtype == "category":
+                chunks[column].append(pd.Categorical(values))
+            else:
+                chunks[column].append(np.array(values, dtype=dtype))
+
+    data = {}
+    for column, (_, dtype) in fields.items():
+        if dtype == "category":
+            data[column] = (
+                pd.api.types.union_categoricals(chunks[column], sort_categories=True)
+                if chunks[column]
+                else pd.Categorical([])
+            )
+        else:
+            data[column] = np.concatenate(chunks[column]) if chunks[column] else np.empty(0, dtype)
+    return pd.DataFrame(data)
+
+
+def _save_columns(directory: Path, dtf: pd.DataFrame, criteria: Optional[list[str]] = None):
+    """
+    Saves each column of `dtf` as a numpy array in `directory`. When `criteria`
+    is given, rows are sorted by criterion, which is stored as a categorical
+    column: the codes of the criteria, and `criterion_indptr` delimiting the
+    rows of each criterion.
+    """
+    directory.mkdir(parents=True)
+    if criteria is not None:
+        codes = pd.Categorical(dtf["criterion"], categories=criteria).codes
+        order = np.argsort(codes, kind="stable")
+        dtf = dtf.drop(columns="criterion").iloc[order]
+        codes = codes[order]
+        np.save(directory / "criterion.npy", codes)
+        np.save(
+            directory / "criterion_indptr.npy",
+            np.searchsorted(codes, np.arange(len(criteria) + 1)),
+        )
+    for column in dtf.columns:
+        np.save(directory / f"{column}.npy", dtf[column].to_numpy())
+
+
+class MlInputFromSnapshot(PipelineInput):
+    """
+    Reads the poll snapshot saved by `MlInputFromDb.save_snapshot()`.
+
+    Arrays are loaded lazily as memory-mapped files, and the rows of a
+    criterion are a contiguous slice of each array. Only the path of the
+    snapshot is pickled when this input is sent to another process.
+    """
+
+    COMPARISONS_COLUMNS = list(COMPARISONS_FIELDS)
+    INDIVIDUAL_SCORES_COLUMNS = list(INDIVIDUAL_SCORES_FIELDS)
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "snapshot.json", encoding="utf-8") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        self.criteria: list[str] = snapshot["criteria"]
+        self.incremental: bool = snapshot["incremental"]
+
+    def __getstate__(self):
+        return {"directory": self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"])
+
+    def _load(self, table: str, column: str) -> np.ndarray:
+        return np.load(self.directory / table / f"{column}.npy", mmap_mode="r")
+
+    def _get_table(
+        self,
+        table: str,
+        columns: list[str],
+        criterion: Optional[str] = None,
+        user_id: Optional[int] = None,
+        mask_column: Optional[str] = None,
+    ) -> pd.DataFrame:
+        rows = slice(None)
+        if criterion is not None:
+            indptr = self._load(table, "criterion_indptr")
+            if criterion in self.criteria:
+                code = self.criteria.index(criterion)
+                rows = slice(indptr[code], indptr[code + 1])
+            else:
+                rows = slice(0, 0)
+
+        data = {}
+        for column in columns:
+            values = self._load(table, column)[rows]
+            if column == "criterion":
+                values = pd.Categorical.from_codes(values, categories=self.criteria)
+            data[column] = values
+        dtf = pd.DataFrame(data, columns=columns)
+
+        mask = np.ones(len(dtf), dtype=bool)
+        if mask_column is not None:
+            mask &= self._load(table, mask_column)[rows]
+        if user_id is not None:
+            mask &= dtf["user_id"].to_numpy() == user_id
+        if not mask.all():
+            dtf = dtf[mask].reset_index(drop=True)
+        return dtf
+
+    def get_comparisons(self, criterion=None, user_id=None) -> pd.DataFrame:
+        return self._get_table(
+            "comparisons", self.COMPARISONS_COLUMNS, criterion=criterion, user_id=user_id
+        )
+
+    def get_new_comparisons(self, criterion=None) -> Optional[pd.DataFrame]:
+        if not self.incremental:
+            return None
+        return self._get_table(
+            "comparisons", self.COMPARISONS_COLUMNS, criterion=criterion, mask_column="is_new"
+        )
+
+    @cached_property
+    def ratings_properties(self):
+        return self._get_table("ratings_properties", ["user_id", "entity_id", "is_public"])
+
+    def get_individual_scores(
+        self, user_id: Optional[int] = None, criterion: Optional[str] = None,
+    ) -> pd.DataFrame:
+        return self._get_table(
+            "individual_scores",
+            self.INDIVIDUAL_SCORES_COLUMNS,
+            criterion=criterion,
+            user_id=user_id,
+        )
+
+    def get_vouches(self):
+        return self._get_table("vouches", ["voucher", "vouchee", "vouch"])
+
+    def get_users(self):
+        return self._get_table(
+            "users", ["user_id", "is_pretrusted", "trust_score"]
+        ).set_index("user_id")
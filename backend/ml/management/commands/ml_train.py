@@ -1,26 +1,39 @@
 import os
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import tempfile
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from contextlib import contextmanager
 from functools import cache
+from typing import Iterator, Optional
 
 from django import db
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 from solidago.aggregation import EntitywiseQrQuantile
-from solidago.pipeline import Pipeline
+from solidago.pipeline import CheckpointStore, Pipeline
 from solidago.post_process.squash import Squash
 from solidago.preference_learning import UniformGBT
 from solidago.scaling import Mehestan, QuantileShift, ScalingCompose, Standardize
 from solidago.trust_propagation import LipschiTrust, NoopTrust
 from solidago.voting_rights import AffineOvertrust
 
-from ml.inputs import MlInputFromDb
-from ml.outputs import TournesolPollOutput, save_tournesol_scores
+from ml.inputs import MlInputFromDb, MlInputFromSnapshot
+from ml.outputs import ScoresSaveOptions, TournesolPollOutput, save_tournesol_scores
 from tournesol.models import EntityPollRating, Poll
 from tournesol.models.poll import ALGORITHM_MEHESTAN, DEFAULT_POLL_NAME
 
 
 @cache
-def get_solidago_pipeline(run_trust_propagation: bool = True):
+def get_solidago_pipeline(
+    run_trust_propagation: bool = True,
+    n_jobs: int = 1,
+):
     if run_trust_propagation:
         trust_algo = LipschiTrust()
     else:
@@ -39,9 +52,10 @@ def get_solidago_pipeline(run_trust_propagation: bool = True):
             cumulant_generating_function_error=1e-5,
             high_likelihood_range_threshold=0.25,
             # max_iter=300,
+            n_jobs=n_jobs,
         ),
         scaling=ScalingCompose(
-            Mehestan(),
+            Mehestan(n_jobs=n_jobs),
             Standardize(
                 dev_quantile=0.9,
                 lipschitz=0.1,
@@ -65,6 +79,18 @@ def get_solidago_pipeline(run_trust_propagation: bool = True):
     )
 
 
+def get_cpu_count() -> int:
+    return max(1, (os.cpu_count() or 1) - settings.MEHESTAN_KEEP_N_FREE_CPU)
+
+
+def get_n_jobs(n_criteria: int) -> int:
+    if settings.MEHESTAN_MULTIPROCESSING and n_criteria == 1:
+        # With a single criterion, parallelize the preference learning
+        # and the scaling across users instead
+        return get_cpu_count()
+    return 1
+
+
 class Command(BaseCommand):
     help = "Runs Machine Learning tasks, to update scores periodically"
 
@@ -75,6 +101,18 @@ class Command(BaseCommand):
             help="Disable trust scores computation and preserve existing trust_score values",
         )
         parser.add_argument("--main-criterion-only", action="store_true")
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Reuse the individual raw scores of the contributors whose comparisons"
+            " have not been edited since the last run, instead of learning them again",
+        )
+        parser.add_argument(
+            "--checkpoint-dir",
+            help="Directory where the outputs of the pipeline stages are saved. A run"
+            " interrupted by an error is resumed from the last stage saved there, and stages"
+            " whose inputs and parameters are unchanged are not run again.",
+        )
 
     def handle(self, *args, **options):
         for poll in Poll.objects.filter(active=True):
@@ -86,6 +124,12 @@ class Command(BaseCommand):
                 poll=poll,
                 update_trust_scores=(not options["no_trust_algo"] and is_default_poll),
                 main_criterion_only=options["main_criterion_only"],
+                incremental=options["incremental"],
+                checkpoints=(
+                    CheckpointStore(options["checkpoint_dir"]).subdirectory(poll.name)
+                    if options["checkpoint_dir"]
+                    else None
+                ),
             )
 
     def run_poll_pipeline(
@@ -93,69 +137,146 @@ class Command(BaseCommand):
         poll: Poll,
         update_trust_scores: bool,
         main_criterion_only: bool,
+        incremental: bool = False,
+        checkpoints: Optional[CheckpointStore] = None,
     ):
+        run_started_at = timezone.now()
+        criteria_to_run = self.get_criteria_to_run(poll, main_criterion_only)
         pipeline = get_solidago_pipeline(
-            run_trust_propagation=update_trust_scores
+            run_trust_propagation=update_trust_scores,
+            n_jobs=get_n_jobs(n_criteria=len(criteria_to_run)),
         )
-        criteria_list = poll.criterias_list
-        criteria_to_run = [poll.main_criteria]
-        if not main_criterion_only:
-            criteria_to_run.extend(
-                c for c in criteria_list if c != poll.main_criteria
-            )
 
-        if settings.MEHESTAN_MULTIPROCESSING:
-            # compute each criterion in parallel
-            cpu_count = os.cpu_count() or 1
-            cpu_count -= settings.MEHESTAN_KEEP_N_FREE_CPU
-            os.register_at_fork(before=db.connections.close_all)
-            executor = ProcessPoolExecutor(max_workers=max(1, cpu_count))
-        else:
-            # In tests, we might prefer to use a single thread to reduce overhead
-            # of multiple processes, db connections, and redundant numba compilation
-            executor = ThreadPoolExecutor(max_workers=1)
-
-        with executor:
-            futures = []
-            for crit in criteria_to_run:
-                pipeline_input = MlInputFromDb(poll_name=poll.name)
-                pipeline_output = TournesolPollOutput(
-                    poll_name=poll.name,
-                    criterion=crit,
-                    save_trust_scores_enabled=(update_trust_scores and crit == poll.main_criteria)
-                )
+        # Incremental runs update the `sum_trust_scores` with the changes of the
+        # trust scores and of the rated entities only, instead of recomputing
+        # all of them.
+        update_sum_trust_scores_with_deltas = (
+            incremental and settings.MEHESTAN_SAVE_SCORES_WITH_COPY
+        )
 
-                futures.append(
-                    executor.submit(
-                        self.run_pipeline_and_close_db,
-                        pipeline=pipeline,
-                        pipeline_input=pipeline_input,
-                        pipeline_output=pipeline_output,
+        # The executor is shut down before the snapshot is removed
+        with (
+            self.input_snapshot(poll, incremental) as pipeline_input,
+            self.get_executor() as executor,
+        ):
+            futures = [
+                executor.submit(
+                    self.run_pipeline_and_close_db,
+                    pipeline=pipeline,
+                    pipeline_input=pipeline_input,
+                    pipeline_output=self.get_pipeline_output(
+                        poll,
                         criterion=crit,
-                    )
+                        update_trust_scores=update_trust_scores,
+                        update_sum_trust_scores_with_deltas=update_sum_trust_scores_with_deltas,
+                    ),
+                    criterion=crit,
+                    checkpoints=checkpoints,
                 )
-
-            for fut in as_completed(futures):
-                # reraise potential exception
-                fut.result()
+                for crit in criteria_to_run
+            ]
+            entities_with_changed_raters = self.collect_entities_with_changed_raters(futures)
 
         save_tournesol_scores(poll)
-        EntityPollRating.bulk_update_sum_trust_scores(poll)
+        if update_sum_trust_scores_with_deltas:
+            EntityPollRating.bulk_update_sum_trust_scores(
+                poll, entity_ids=entities_with_changed_raters
+            )
+        else:
+            EntityPollRating.bulk_update_sum_trust_scores(poll)
+
+        # The score matrices of the recommendations are loaded again after any run
+        poll.ml_scores_saved_at = timezone.now()
+        update_fields = ["ml_scores_saved_at"]
+        if not main_criterion_only:
+            # Comparisons edited during this run will be considered again by the next one
+            poll.ml_last_run_started_at = run_started_at
+            update_fields.append("ml_last_run_started_at")
+        poll.save(update_fields=update_fields)
 
         self.stdout.write(f"Pipeline for poll {poll.name}: Done")
 
+    @staticmethod
+    @contextmanager
+    def input_snapshot(poll: Poll, incremental: bool) -> Iterator[MlInputFromSnapshot]:
+        """
+        The poll data of all criteria, fetched once and shared with the
+        workers as memory-mapped arrays, until the end of the context.
+        """
+        with tempfile.TemporaryDirectory(prefix="ml_train_") as snapshot_dir:
+            yield MlInputFromDb(
+                poll_name=poll.name,
+                last_run_started_at=poll.ml_last_run_started_at if incremental else None,
+            ).save_snapshot(snapshot_dir)
+
+    @staticmethod
+    def get_executor() -> Executor:
+        if settings.MEHESTAN_MULTIPROCESSING:
+            # compute each criterion in parallel
+            os.register_at_fork(before=db.connections.close_all)
+            return ProcessPoolExecutor(max_workers=get_cpu_count())
+        # In tests, we might prefer to use a single thread to reduce overhead
+        # of multiple processes, db connections, and redundant numba compilation
+        return ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def get_criteria_to_run(poll: Poll, main_criterion_only: bool) -> list[str]:
+        """The main criterion first, followed by the other criteria of the poll if requested."""
+        if main_criterion_only:
+            return [poll.main_criteria]
+        return [poll.main_criteria] + [c for c in poll.criterias_list if c != poll.main_criteria]
+
+    @staticmethod
+    def get_pipeline_output(
+        poll: Poll,
+        criterion: str,
+        update_trust_scores: bool,
+        update_sum_trust_scores_with_deltas: bool,
+    ) -> TournesolPollOutput:
+        return TournesolPollOutput(
+            poll_name=poll.name,
+            criterion=criterion,
+            save_trust_scores_enabled=(update_trust_scores and criterion == poll.main_criteria),
+            save_options=ScoresSaveOptions.from_settings(
+                update_trust_scores_with_deltas=update_sum_trust_scores_with_deltas
+            ),
+        )
+
+    @staticmethod
+    def collect_entities_with_changed_raters(futures: list[Future]) -> Optional[set[int]]:
+        """
+        Waits for the pipelines of all criteria, and returns the union of
+        their entities with changed raters, or None if unknown for a criterion.
+        """
+        entities_with_changed_raters: Optional[set[int]] = set()
+        for fut in as_completed(futures):
+            # reraise potential exception
+            criterion_entities = fut.result()
+            if criterion_entities is None:
+                entities_with_changed_raters = None
+            elif entities_with_changed_raters is not None:
+                entities_with_changed_raters.update(criterion_entities)
+        return entities_with_changed_raters
+
     @staticmethod
     def run_pipeline_and_close_db(
         pipeline: Pipeline,
-        pipeline_input: MlInputFromDb,
+        pipeline_input: MlInputFromSnapshot,
         pipeline_output: TournesolPollOutput,
-        criterion: str
-    ):
+        criterion: str,
+        checkpoints: Optional[CheckpointStore] = None,
+    ) -> Optional[set[int]]:
+        """
+        Returns the entities whose contributors with individual scores may
+        have changed, or None if unknown.
+        """
         pipeline.run(
             input=pipeline_input,
             criterion=criterion,
             output=pipeline_output,
+            checkpoints=checkpoints,
         )
         # Closing the connection fixes a warning in tests
         # about open connections to the database.
         db.connection.close()
+        return pipeline_output.entities_with_changed_raters
@@ -0,0 +1,189 @@
+import logging
+import timeit
+from functools import cache
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from solidago.pipeline import Pipeline
+from solidago.scoring_model import DirectScoringModel, ScaledScoringModel, ScoringModel
+
+from core.models import User
+from ml.inputs import MlInputFromDb
+from ml.management.commands.ml_train import get_solidago_pipeline
+from ml.outputs import ScoresSaveOptions, TournesolPollOutput
+from tournesol.models import ContributorRatingCriteriaScore, EntityPollRating, Poll
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_online_pipeline() -> Pipeline:
+    """
+    Returns the pipeline used by the online updates, built once per process.
+
+    The numba kernels of the preference learning are compiled for each
+    pipeline instance. They are compiled here on a single comparison, so that
+    the online updates reuse them instead of paying for their compilation.
+    """
+    pipeline = get_solidago_pipeline()
+    pipeline.preference_learning.comparison_learning(
+        pd.DataFrame({
+            "entity_a": np.array([0], dtype=np.int64),
+            "entity_b": np.array([1], dtype=np.int64),
+            "comparison": np.array([1.0]),
+            "comparison_max": np.array([10.0]),
+        })
+    )
+    return pipeline
+
+
+def update_user_scores(
+    poll: Poll,
+    user: User,
+    criteria: Optional[Iterable[str]] = None,
+    updated_entities: Optional[set[int]] = None,
+):
+    """
+    Updates the individual scores of `user` in `poll`, without waiting for
+    the next run of ml_train. Global scores are left unchanged.
+
+    For each criterion, the raw scores are learned again from the comparisons
+    of `user` only, starting from the raw scores of the previous run, and
+    updating `updated_entities` first. The scaling of `user` computed by the
+    previous run is then applied, followed by the pipeline post-processing.
+    Users who have not been scaled yet keep their raw scores, post-processed.
+
+    `criteria`: the criteria to update, by default all criteria of `poll`.
+    """
+    start = timeit.default_timer()
+    pipeline = get_online_pipeline()
+    ml_input = MlInputFromDb(poll_name=poll.name)
+    criteria = poll.criterias_list if criteria is None else list(criteria)
+
+    comparisons = ml_input.get_comparisons(user_id=user.id)
+    comparisons = comparisons[comparisons["criterion"].isin(criteria)]
+    individual_scores = ml_input.get_individual_scores(user_id=user.id)
+    scalings = ml_input.get_user_scalings(user_id=user.id).set_index("criterion")
+    voting_rights = pd.DataFrame(
+        ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__poll=poll,
+            contributor_rating__user=user,
+            criteria__in=criteria,
+        ).values_list("criteria", "contributor_rating__entity_id", "voting_right"),
+        columns=["criterion", "entity_id", "voting_right"],
+    ).set_index(["criterion", "entity_id"])["voting_right"]
+
+    # The entities whose contributors taken into account in `sum_trust_scores`
+    # may change: the entities scored by the user, before or after the update.
+    rated_entities = set(individual_scores["entity_id"])
+    for criterion in criteria:
+        raw_model = _learn_raw_model(
+            pipeline,
+            comparisons[comparisons["criterion"] == criterion],
+            individual_scores[individual_scores["criterion"] == criterion],
+            updated_entities,
+        )
+        user_models, _ = pipeline.post_process(
+            {user.id: _apply_scaling(raw_model, scalings, criterion)}, DirectScoringModel()
+        )
+        rated_entities.update(
+            _save_user_scores(
+                TournesolPollOutput(
+                    poll_name=poll.name,
+                    criterion=criterion,
+                    save_trust_scores_enabled=False,
+                    save_options=ScoresSaveOptions.from_settings(),
+                ),
+                user.id,
+                raw_model,
+                user_models[user.id],
+                voting_rights.loc[criterion]
+                if criterion in voting_rights.index
+                else pd.Series(dtype=np.float64),
+            )
+        )
+
+    EntityPollRating.bulk_update_sum_trust_scores(poll, entity_ids=rated_entities)
+
+    logger.info(
+        "Updated the individual scores of user %s in %.3f seconds",
+        user.id, timeit.default_timer() - start,
+    )
+
+
+def _learn_raw_model(
+    pipeline: Pipeline,
+    comparisons: pd.DataFrame,
+    raw_scores: pd.DataFrame,
+    updated_entities: Optional[set[int]],
+) -> ScoringModel:
+    """
+    Learns the raw scores of a user from their `comparisons` of a criterion,
+    starting from their previous `raw_scores`.
+    """
+    if len(comparisons) == 0:
+        return DirectScoringModel()
+
+    compared_entities = set(comparisons["entity_a"]) | set(comparisons["entity_b"])
+    raw_uncertainties = raw_scores["raw_uncertainty"].to_numpy(dtype=np.float64)
+    initialization = DirectScoringModel.from_arrays(
+        raw_scores["entity_id"].to_numpy(),
+        raw_scores["raw_score"].to_numpy(dtype=np.float64),
+        raw_uncertainties / 2,
+        raw_uncertainties / 2,
+    )
+    return pipeline.preference_learning.comparison_learning(
+        comparisons.rename(columns={"score": "comparison", "score_max": "comparison_max"}),
+        initialization=initialization,
+        updated_entities=(
+            None if updated_entities is None else set(updated_entities) & compared_entities
+        ),
+    )
+
+
+def _apply_scaling(
+    raw_model: ScoringModel, scalings: pd.DataFrame, criterion: str
+) -> ScaledScoringModel:
+    """Applies the scaling of the user computed by the previous run, if any."""
+    scaling = {}
+    if criterion in scalings.index:
+        scaling = scalings.loc[criterion].dropna().to_dict()
+    return ScaledScoringModel(
+        raw_model,
+        multiplicator=scaling.get("scale", 1.0),
+        translation=scaling.get("translation", 0.0),
+        multiplicator_left_uncertainty=scaling.get("scale_uncertainty", 0.0) / 2,
+        multiplicator_right_uncertainty=scaling.get("scale_uncertainty", 0.0) / 2,
+        translation_left_uncertainty=scaling.get("translation_uncertainty", 0.0) / 2,
+        translation_right_uncertainty=scaling.get("translation_uncertainty", 0.0) / 2,
+    )
+
+
+def _save_user_scores(
+    output: TournesolPollOutput,
+    user_id: int,
+    raw_model: ScoringModel,
+    model: ScoringModel,
+    voting_rights: pd.Series,
+) -> list[int]:
+    """
+    Saves the individual scores of a user with `output`, and returns the
+    scored entities.
+    """
+    entity_ids, scores, lefts, rights = model.to_arrays()
+    _, raw_values, raw_lefts, raw_rights = raw_model.to_arrays()
+    output.save_individual_scores(
+        pd.DataFrame({
+            "user_id": user_id,
+            "entity_id": entity_ids,
+            "score": scores,
+            "uncertainty": lefts + rights,
+            "raw_score": raw_values,
+            "raw_uncertainty": raw_lefts + raw_rights,
+            # Voting rights are only computed by ml_train, and are 0.0 for new entities
+            "voting_right": voting_rights.reindex(entity_ids).fillna(0.0).to_numpy(),
+        }),
+        single_user_id=user_id,
+    )
+    return entity_ids.tolist()
@@ -1,11 +1,14 @@
+import io
 import logging
+import timeit
+from dataclasses import dataclass
 from functools import cached_property
-from itertools import islice
 from typing import Optional
 
 import numpy as np
 import pandas as pd
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 from solidago.pipeline.outputs import PipelineOutput
 
 from core.models import User
@@ -18,10 +21,196 @@ from tournesol.models import (
     EntityPollRating,
     Poll,
 )
+from tournesol.models.entity_score import ScoreMode
 from tournesol.models.poll import ALGORITHM_MEHESTAN
 
 logger = logging.getLogger(__name__)
 
+# Number of rows sent at once by `COPY FROM STDIN`
+COPY_CHUNK_SIZE = 100_000
+
+CREATE_MISSING_RATINGS_SQL = """
+    INSERT INTO tournesol_contributorrating (poll_id, user_id, entity_id, is_public, entity_seen)
+    SELECT DISTINCT %(poll_id)s, scores.user_id, scores.entity_id, %(is_public)s, %(entity_seen)s
+    FROM ml_individual_scores AS scores
+    ON CONFLICT DO NOTHING
+"""
+
+# Existing scores are only updated when one of their values changed by more
+# than the tolerance. The numbers of inserted and updated rows are returned.
+UPSERT_INDIVIDUAL_SCORES_SQL = """
+    WITH upserted AS (
+        INSERT INTO tournesol_contributorratingcriteriascore AS score (
+            contributor_rating_id, criteria, score, uncertainty,
+            raw_score, raw_uncertainty, voting_right
+        )
+        SELECT
+            rating.id, %(criterion)s, scores.score, scores.uncertainty,
+            scores.raw_score, scores.raw_uncertainty, scores.voting_right
+        FROM ml_individual_scores AS scores
+        JOIN tournesol_contributorrating AS rating
+            ON rating.poll_id = %(poll_id)s
+            AND rating.user_id = scores.user_id
+            AND rating.entity_id = scores.entity_id
+        ON CONFLICT (contributor_rating_id, criteria) DO UPDATE SET
+            score = EXCLUDED.score,
+            uncertainty = EXCLUDED.uncertainty,
+            raw_score = EXCLUDED.raw_score,
+            raw_uncertainty = EXCLUDED.raw_uncertainty,
+            voting_right = EXCLUDED.voting_right
+        WHERE abs(score.score - EXCLUDED.score) > %(tolerance)s
+            OR abs(score.uncertainty - EXCLUDED.uncertainty) > %(tolerance)s
+            OR abs(score.raw_score - EXCLUDED.raw_score) > %(tolerance)s
+            OR abs(score.raw_uncertainty - EXCLUDED.raw_uncertainty) > %(tolerance)s
+            OR abs(score.voting_right - EXCLUDED.voting_right) > %(tolerance)s
+        RETURNING (xmax = 0) AS is_inserted, score.contributor_rating_id
+    )
+    SELECT
+        count(*) FILTER (WHERE is_inserted),
+        count(*) FILTER (WHERE NOT is_inserted),
+        coalesce(
+            array_agg(DISTINCT rating.entity_id) FILTER (WHERE is_inserted), '{}'
+        )
+    FROM upserted
+    JOIN tournesol_contributorrating AS rating ON rating.id = upserted.contributor_rating_id
+"""
+
+# The entities of the deleted scores are returned.
+DELETE_STALE_INDIVIDUAL_SCORES_SQL = """
+    DELETE FROM tournesol_contributorratingcriteriascore AS score
+    USING tournesol_contributorrating AS rating
+    WHERE score.contributor_rating_id = rating.id
+        AND score.criteria = %(criterion)s
+        AND rating.poll_id = %(poll_id)s
+        AND (%(user_id)s IS NULL OR rating.user_id = %(user_id)s)
+        AND NOT EXISTS (
+            SELECT 1 FROM ml_individual_scores AS scores
+            WHERE scores.user_id = rating.user_id AND scores.entity_id = rating.entity_id
+        )
+    RETURNING rating.entity_id
+"""
+
+UPSERT_ENTITY_SCORES_SQL = """
+    WITH upserted AS (
+        INSERT INTO tournesol_entitycriteriascore AS score (
+            entity_id, poll_id, criteria, score_mode, score, uncertainty
+        )
+        SELECT
+            scores.entity_id, %(poll_id)s, %(criterion)s, %(score_mode)s,
+            scores.score, scores.uncertainty
+        FROM ml_entity_scores AS scores
+        ON CONFLICT (entity_id, poll_id, criteria, score_mode) DO UPDATE SET
+            score = EXCLUDED.score,
+            uncertainty = EXCLUDED.uncertainty
+        WHERE abs(score.score - EXCLUDED.score) > %(tolerance)s
+            OR abs(score.uncertainty - EXCLUDED.uncertainty) > %(tolerance)s
+        RETURNING (xmax = 0) AS is_inserted
+    )
+    SELECT count(*) FILTER (WHERE is_inserted), count(*) FILTER (WHERE NOT is_inserted)
+    FROM upserted
+"""
+
+DELETE_STALE_ENTITY_SCORES_SQL = """
+    DELETE FROM tournesol_entitycriteriascore AS score
+    WHERE score.poll_id = %(poll_id)s
+        AND score.criteria = %(criterion)s
+        AND score.score_mode = %(score_mode)s
+        AND NOT EXISTS (
+            SELECT 1 FROM ml_entity_scores AS scores WHERE scores.entity_id = score.entity_id
+        )
+"""
+
+# The changed ratings are locked in the order of their `entity_id` before
+# being updated. The comparisons update the `n_comparisons` of the ratings
+# concurrently, in the same order, which prevents deadlocks between them and
+# this poll-wide update.
+UPDATE_TOURNESOL_SCORES_SQL = """
+    WITH changed AS (
+        SELECT rating.id, scores.tournesol_score
+        FROM tournesol_entitypollrating AS rating
+        JOIN (
+            SELECT entity_id, {tournesol_score} AS tournesol_score
+            FROM tournesol_entitycriteriascore
+            WHERE poll_id = %(poll_id)s
+            GROUP BY entity_id
+        ) AS scores ON rating.entity_id = scores.entity_id
+        WHERE rating.poll_id = %(poll_id)s
+            AND rating.tournesol_score IS DISTINCT FROM scores.tournesol_score
+        ORDER BY rating.entity_id
+        FOR UPDATE OF rating
+    )
+    UPDATE tournesol_entitypollrating AS rating
+    SET tournesol_score = changed.tournesol_score
+    FROM changed
+    WHERE rating.id = changed.id
+"""
+
+UPDATE_TOURNESOL_SCORES_MEHESTAN_SQL = UPDATE_TOURNESOL_SCORES_SQL.format(
+    tournesol_score="""max(score) FILTER (
+        WHERE score_mode = %(score_mode)s AND criteria = %(main_criterion)s
+    )"""
+)
+
+UPDATE_TOURNESOL_SCORES_SUM_SQL = UPDATE_TOURNESOL_SCORES_SQL.format(
+    tournesol_score="10 * coalesce(sum(score) FILTER (WHERE score_mode = %(score_mode)s), 0)"
+)
+
+
+def copy_to_temporary_table(cursor, table: str, columns: dict[str, str], dtf: pd.DataFrame):
+    """
+    Creates the temporary `table`, dropped at the end of the transaction,
+    with `columns` mapping column names to their SQL types. The rows of `dtf`
+    are then streamed into it by chunks, with `COPY FROM STDIN`.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    columns_sql = ", ".join(f"{column} {sql_type}" for column, sql_type in columns.items())
+    cursor.execute(f"CREATE TEMPORARY TABLE {table} ({columns_sql}) ON COMMIT DROP")
+    dtf = dtf[list(columns)]
+    for start in range(0, len(dtf), COPY_CHUNK_SIZE):
+        buffer = io.StringIO()
+        dtf.iloc[start:start + COPY_CHUNK_SIZE].to_csv(
+            buffer, header=False, index=False, na_rep="NaN"
+        )
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+@dataclass(frozen=True)
+class ScoresSaveOptions:
+    """
+    How `TournesolPollOutput` saves the scores.
+
+    `with_copy`: when True, individual and entity scores are streamed into
+    a temporary table with `COPY FROM STDIN`, and merged into the scores
+    tables with set-based queries, instead of creating a model instance per
+    score. Only the new, changed and vanished scores are then written.
+
+    `score_update_tolerance`: with `with_copy`, a stored score is updated
+    only if one of its values changed by more than this tolerance.
+
+    `trust_score_update_tolerance`: when provided, only the trust scores
+    which changed by more than this tolerance are saved, and their
+    differences are applied to the `sum_trust_scores` of the entities
+    rated by these users. The sums are otherwise left unchanged, and
+    are expected to be recomputed afterwards.
+    """
+
+    with_copy: bool = False
+    score_update_tolerance: float = 0.0
+    trust_score_update_tolerance: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, update_trust_scores_with_deltas: bool = False) -> "ScoresSaveOptions":
+        return cls(
+            with_copy=settings.MEHESTAN_SAVE_SCORES_WITH_COPY,
+            score_update_tolerance=settings.MEHESTAN_SCORE_UPDATE_TOLERANCE,
+            trust_score_update_tolerance=(
+                settings.MEHESTAN_TRUST_SCORE_UPDATE_TOLERANCE
+                if update_trust_scores_with_deltas
+                else None
+            ),
+        )
+
 
 class TournesolPollOutput(PipelineOutput):
     def __init__(
@@ -29,10 +218,16 @@ class TournesolPollOutput(PipelineOutput):
         poll_name: str,
         criterion: Optional[str] = None,
         save_trust_scores_enabled: bool = True,
+        save_options: Optional[ScoresSaveOptions] = None,
     ):
         self.poll_name = poll_name
         self.criterion = criterion
         self.save_trust_scores_enabled = save_trust_scores_enabled
+        self.save_options = save_options or ScoresSaveOptions()
+        # The entities whose individual scores were created or deleted, and whose
+        # contributors taken into account in `sum_trust_scores` may thus have
+        # changed. None when unknown, i.e. all entities may be affected.
+        self.entities_with_changed_raters: Optional[set[int]] = set()
 
     @cached_property
     def poll(self) -> Poll:
@@ -50,12 +245,38 @@ class TournesolPollOutput(PipelineOutput):
             return
         trust_scores = trusts.trust_score
         users = User.objects.filter(id__in=trust_scores.index).only("trust_score")
+        tolerance = self.save_options.trust_score_update_tolerance
+        if tolerance is None:
+            for user in users:
+                user.trust_score = trust_scores[user.id]
+            User.objects.bulk_update(
+                users,
+                ["trust_score"],
+                batch_size=1000
+            )
+            return
+
+        changed_users = []
+        trust_score_deltas = {}
         for user in users:
-            user.trust_score = trust_scores[user.id]
-        User.objects.bulk_update(
-            users,
-            ["trust_score"],
-            batch_size=1000
+            # Null trust scores are not counted in the sums.
+            old_trust_score = 0.0 if user.trust_score is None else user.trust_score
+            delta = np.nan_to_num(trust_scores[user.id]) - old_trust_score
+            if user.trust_score is None or abs(delta) > tolerance:
+                user.trust_score = trust_scores[user.id]
+                changed_users.append(user)
+                trust_score_deltas[user.id] = float(delta)
+
+        with transaction.atomic():
+            User.objects.bulk_update(
+                changed_users,
+                ["trust_score"],
+                batch_size=1000
+            )
+            EntityPollRating.apply_trust_score_deltas(trust_score_deltas)
+        logger.info(
+            "Saved the trust scores of %s users, out of %s",
+            len(changed_users), len(trust_scores),
         )
 
     def save_individual_scalings(self, scalings: pd.DataFrame):
@@ -95,6 +316,26 @@ class TournesolPollOutput(PipelineOutput):
             # temporarily and to expect it to be updated during the next ML run.
             scores["voting_right"] = 0.0
 
+        start = timeit.default_timer()
+        if self.save_options.with_copy:
+            n_inserted, n_updated, n_deleted = self._copy_individual_scores(scores, single_user_id)
+            logger.info(
+                "Saved individual scores for criterion %s in %.2f seconds: "
+                "%s inserted, %s updated, %s deleted, %s unchanged",
+                self.criterion, timeit.default_timer() - start,
+                n_inserted, n_updated, n_deleted, len(scores) - n_inserted - n_updated,
+            )
+        else:
+            self._create_individual_scores(scores, single_user_id)
+            self.entities_with_changed_raters = None
+            logger.info(
+                "Saved %s individual scores for criterion %s in %.2f seconds",
+                len(scores), self.criterion, timeit.default_timer() - start,
+            )
+
+    def _create_individual_scores(
+        self, scores: pd.DataFrame, single_user_id: Optional[int] = None
+    ):
         ratings = ContributorRating.objects.filter(poll=self.poll)
         if single_user_id is not None:
             ratings = ratings.filter(user_id=single_user_id)
@@ -162,6 +403,37 @@ class TournesolPollOutput(PipelineOutput):
                 batch_size=10000,
             )
 
+    def _copy_individual_scores(
+        self, scores: pd.DataFrame, single_user_id: Optional[int] = None
+    ) -> tuple[int, int, int]:
+        """Returns the numbers of inserted, updated and deleted scores"""
+        params = {
+            "poll_id": self.poll.pk,
+            "criterion": self.criterion,
+            "user_id": single_user_id,
+            "tolerance": self.save_options.score_update_tolerance,
+            "is_public": ContributorRating._meta.get_field("is_public").get_default(),
+            "entity_seen": ContributorRating._meta.get_field("entity_seen").get_default(),
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            copy_to_temporary_table(cursor, "ml_individual_scores", {
+                "user_id": "bigint",
+                "entity_id": "bigint",
+                "score": "double precision",
+                "uncertainty": "double precision",
+                "raw_score": "double precision",
+                "raw_uncertainty": "double precision",
+                "voting_right": "double precision",
+            }, scores)
+            cursor.execute(CREATE_MISSING_RATINGS_SQL, params)
+            cursor.execute(UPSERT_INDIVIDUAL_SCORES_SQL, params)
+            n_inserted, n_updated, inserted_entity_ids = cursor.fetchone()
+            cursor.execute(DELETE_STALE_INDIVIDUAL_SCORES_SQL, params)
+            deleted_entity_ids = [entity_id for (entity_id,) in cursor.fetchall()]
+        if self.entities_with_changed_raters is not None:
+            self.entities_with_changed_raters.update(inserted_entity_ids, deleted_entity_ids)
+        return n_inserted, n_updated, len(deleted_entity_ids)
+
     def save_entity_scores(
         self,
         scores: pd.DataFrame,
@@ -170,6 +442,23 @@ class TournesolPollOutput(PipelineOutput):
         if len(scores) == 0:
             return
 
+        start = timeit.default_timer()
+        if self.save_options.with_copy:
+            n_inserted, n_updated, n_deleted = self._copy_entity_scores(scores, score_mode)
+            logger.info(
+                "Saved %s entity scores for criterion %s in %.2f seconds: "
+                "%s inserted, %s updated, %s deleted, %s unchanged",
+                score_mode, self.criterion, timeit.default_timer() - start,
+                n_inserted, n_updated, n_deleted, len(scores) - n_inserted - n_updated,
+            )
+        else:
+            self._create_entity_scores(scores, score_mode)
+            logger.info(
+                "Saved %s %s entity scores for criterion %s in %.2f seconds",
+                len(scores), score_mode, self.criterion, timeit.default_timer() - start,
+            )
+
+    def _create_entity_scores(self, scores: pd.DataFrame, score_mode: str):
         scores_iterator = scores[["entity_id", "score", "uncertainty"]].itertuples(index=False)
         with transaction.atomic():
             EntityCriteriaScore.objects.filter(
@@ -192,48 +481,56 @@ class TournesolPollOutput(PipelineOutput):
                 batch_size=10000,
             )
 
+    def _copy_entity_scores(self, scores: pd.DataFrame, score_mode: str) -> tuple[int, int, int]:
+        """Returns the numbers of inserted, updated and deleted scores"""
+        params = {
+            "poll_id": self.poll.pk,
+            "criterion": self.criterion,
+            "score_mode": score_mode,
+            "tolerance": self.save_options.score_update_tolerance,
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            copy_to_temporary_table(cursor, "ml_entity_scores", {
+                "entity_id": "bigint",
+                "score": "double precision",
+                "uncertainty": "double precision",
+            }, scores)
+            cursor.execute(UPSERT_ENTITY_SCORES_SQL, params)
+            n_inserted, n_updated = cursor.fetchone()
+            cursor.execute(DELETE_STALE_ENTITY_SCORES_SQL, params)
+            return n_inserted, n_updated, cursor.rowcount
 
-def save_tournesol_scores(poll):
-    def entities_iterator():
-        for entity in (
-            Entity.objects.filter(all_criteria_scores__poll=poll)
-            .distinct()
-            .with_prefetched_scores(poll_name=poll.name)
-            .with_prefetched_poll_ratings(poll_name=poll.name)
-        ):
-            if poll.algorithm == ALGORITHM_MEHESTAN:
-                # The Tournesol score is the score of the main criterion.
-                tournesol_score = next(
-                    (
-                        s.score
-                        for s in entity.criteria_scores
-                        if s.criteria == poll.main_criteria
-                    ),
-                    None,
-                )
-            else:
-                tournesol_score = 10 * sum(
-                    criterion.score for criterion in entity.criteria_scores
-                )
 
-            poll_rating = entity.single_poll_rating
-            if poll_rating is None:
-                logger.warning(
-                    "Entity had not EntityPollRating to save tournesol_score. "
-                    "It will be created now."
-                )
-                poll_rating = EntityPollRating.objects.create(poll=poll, entity=entity)
-                entity.single_poll_ratings = [poll_rating]
-
-            poll_rating.tournesol_score = tournesol_score
-            yield entity
-
-    # Updating all entities at once increases the risk of a database deadlock.
-    # We use explicit batches instead of bulk_update "batch_size" to avoid
-    # locking all entities in a large transaction.
-    entities_it = entities_iterator()
-    while batch := list(islice(entities_it, 1000)):
-        EntityPollRating.objects.bulk_update(
-            [ent.single_poll_rating for ent in batch],
-            fields=["tournesol_score"],
+def save_tournesol_scores(poll):
+    """
+    Updates the `tournesol_score` of the `EntityPollRating`s of the entities
+    scored in `poll`, computed from their default `EntityCriteriaScore`s.
+    """
+    scored_entities = EntityCriteriaScore.objects.filter(poll=poll).values("entity_id")
+    missing_ratings = list(
+        Entity.objects.filter(pk__in=scored_entities)
+        .exclude(all_poll_ratings__poll=poll)
+        .values_list("pk", flat=True)
+    )
+    if missing_ratings:
+        logger.warning(
+            "%s entities had no EntityPollRating to save tournesol_score. "
+            "They will be created now.",
+            len(missing_ratings),
         )
+        EntityPollRating.objects.bulk_create(
+            [EntityPollRating(poll=poll, entity_id=entity_id) for entity_id in missing_ratings],
+            ignore_conflicts=True,
+        )
+
+    if poll.algorithm == ALGORITHM_MEHESTAN:
+        # The Tournesol score is the score of the main criterion.
+        update_sql = UPDATE_TOURNESOL_SCORES_MEHESTAN_SQL
+    else:
+        update_sql = UPDATE_TOURNESOL_SCORES_SUM_SQL
+    with connection.cursor() as cursor:
+        cursor.execute(update_sql, {
+            "poll_id": poll.pk,
+            "main_criterion": poll.main_criteria,
+            "score_mode": ScoreMode.DEFAULT,
+        })
@@ -429,11 +429,42 @@ VIDEO_METADATA_REFRESH_THRESHOLD = 0.5
 
 RECOMMENDATIONS_MIN_TOURNESOL_SCORE = 20.0
 RECOMMENDATIONS_MIN_TRUST_SCORES = 1.5
+# Rank the recommendations with a matrix of the entities' criteria scores kept in memory by
+# each process, instead of aggregating the weighted criteria scores in the database
+RECOMMENDATIONS_SCORE_MATRIX = server_settings.get("RECOMMENDATIONS_SCORE_MATRIX", False)
+# The matrix is loaded again after each run of ml_train, including the runs on the main
+# criterion only, or when it is older than this age
+RECOMMENDATIONS_SCORE_MATRIX_MAX_AGE_SECONDS = server_settings.get(
+    "RECOMMENDATIONS_SCORE_MATRIX_MAX_AGE_SECONDS", 600
+)
+# The random recommendations are drawn from the safe entities of each poll kept in memory by
+# each process, loaded again when they are older than this age
+RECOMMENDATIONS_RANDOM_POOL_MAX_AGE_SECONDS = server_settings.get(
+    "RECOMMENDATIONS_RANDOM_POOL_MAX_AGE_SECONDS", 600
+)
+
+# Queue the updates of the compared entities (metadata, rate-later lists), to be run by the
+# command `run_entity_tasks`, instead of running them within the requests
+COMPARISON_SIDE_EFFECTS_ASYNC = server_settings.get("COMPARISON_SIDE_EFFECTS_ASYNC", False)
+# Queued tasks wait this delay before being run, so that repeated updates of an entity are
+# run once
+ENTITY_TASKS_DELAY_SECONDS = server_settings.get("ENTITY_TASKS_DELAY_SECONDS", 10)
+# Tasks claimed by a worker for longer than this timeout can be claimed by another worker
+ENTITY_TASKS_CLAIM_TIMEOUT_SECONDS = server_settings.get("ENTITY_TASKS_CLAIM_TIMEOUT_SECONDS", 600)
+ENTITY_TASKS_MAX_ATTEMPTS = server_settings.get("ENTITY_TASKS_MAX_ATTEMPTS", 5)
 
 
 UPDATE_MEHESTAN_SCORES_ON_COMPARISON = False
 MEHESTAN_MULTIPROCESSING = True
 MEHESTAN_KEEP_N_FREE_CPU = server_settings.get("MEHESTAN_KEEP_N_FREE_CPU", 2)
+# Save the scores computed by ml_train with `COPY FROM STDIN` and set-based upserts
+MEHESTAN_SAVE_SCORES_WITH_COPY = server_settings.get("MEHESTAN_SAVE_SCORES_WITH_COPY", True)
+# Stored scores are not rewritten when their values changed by less than this tolerance
+MEHESTAN_SCORE_UPDATE_TOLERANCE = server_settings.get("MEHESTAN_SCORE_UPDATE_TOLERANCE", 1e-5)
+# In incremental runs, the trust scores which changed by less than this tolerance are not saved
+MEHESTAN_TRUST_SCORE_UPDATE_TOLERANCE = server_settings.get(
+    "MEHESTAN_TRUST_SCORE_UPDATE_TOLERANCE", 1e-5
+)
 
 # Configuration of the app `core`
 # See the documentation for the complete description.
@@ -1,6 +1,7 @@
 """ Tournesol's AppConfig """
 
 from django.apps import AppConfig
+from prometheus_client import REGISTRY
 
 
 class TournesolConfig(AppConfig):
@@ -8,6 +9,12 @@ class TournesolConfig(AppConfig):
     name = "tournesol"
 
     def ready(self):
-        """Register the signal handlers at the start of the app, via import"""
+        """
+        Register the signal handlers at the start of the app, via import, and
+        the collectors of the app metrics.
+        """
         # pylint: disable=import-outside-toplevel,unused-import
         from . import signals  # noqa
+        from .metrics import EntityTasksCollector
+
+        REGISTRY.register(EntityTasksCollector())
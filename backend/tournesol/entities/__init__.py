@@ -1,3 +1,7 @@
+from django.db import transaction
+
+from tournesol import models
+
 from .candidate import CandidateEntity
 from .video import VideoEntity
 
@@ -11,3 +15,27 @@ ENTITY_TYPE_CHOICES = [
 ENTITY_TYPE_NAME_TO_CLASS = {
     k.name: k for k in ENTITY_CLASSES
 }
+
+
+def build_all_search_tokens(batch_size: int = 10000) -> None:
+    """
+    Rebuild the search tokens for all entities, inserted by batches of
+    `batch_size` tokens.
+
+    This is usually not necessary because the search tokens are
+    automatically updated after a save.
+    """
+    with transaction.atomic():
+        models.EntitySearchToken.objects.all().delete()
+        tokens = []
+        for entity in models.Entity.objects.only("id", "type", "metadata").iterator():
+            entity_type = ENTITY_TYPE_NAME_TO_CLASS[entity.type]
+            tokens.extend(
+                models.EntitySearchToken.from_texts(
+                    entity, entity_type.get_search_token_texts(entity)
+                )
+            )
+            if len(tokens) >= batch_size:
+                models.EntitySearchToken.objects.bulk_create(tokens)
+                tokens = []
+        models.EntitySearchToken.objects.bulk_create(tokens)
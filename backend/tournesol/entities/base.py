@@ -14,7 +14,7 @@ from tournesol import models
 UID_DELIMITER = ":"
 
 
-class EntityType(ABC):
+class EntityType(ABC):  # pylint: disable=too-many-public-methods
     """
     Abstract base class for the processing specific to each entity type (mainly about metadata).
     """
@@ -37,6 +37,10 @@ class EntityType(ABC):
     # operation string.
     metadata_filter_operation_delimiter = ":"
 
+    # The metadata fields searched by the search-as-you-type, with their
+    # weight in the relevance of the matching entities.
+    search_token_weights: Dict[str, float] = {}
+
     def __init__(self, entity: "models.Entity"):
         self.instance = entity
 
@@ -277,16 +281,47 @@ class EntityType(ABC):
     def update_search_vector(cls, entity) -> None:
         raise NotImplementedError
 
+    @classmethod
+    @abstractmethod
+    def bulk_update_search_vectors(cls, queryset) -> int:
+        """
+        Update the search vectors of the entities of this type in `queryset`
+        with a few set-based queries, and return their number.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def get_search_token_texts(cls, entity) -> list[tuple[str, float]]:
+        """
+        Return the texts of the metadata fields `search_token_weights`, with
+        their weight.
+        """
+        texts = []
+        for field, weight in cls.search_token_weights.items():
+            value = entity.metadata.get(field)
+            values = value if isinstance(value, list) else [value]
+            texts.extend((text, weight) for text in values if isinstance(text, str))
+        return texts
+
+    @classmethod
+    def update_search_tokens(cls, entity) -> None:
+        """
+        Update the tokens of the metadata fields `search_token_weights`, used
+        by the search-as-you-type.
+        """
+        models.EntitySearchToken.replace_entity_tokens(entity, cls.get_search_token_texts(entity))
+
     @staticmethod
     def build_all_search_vectors() -> None:
         """
         Rebuild the search vectors for all entities.
 
-        This can take dozens of seconds and is usually not necessary
-        because search_vector is automatically updated after a save.
+        This is usually not necessary because search_vector is automatically
+        updated after a save. The command `rebuild_search_vectors` rebuilds
+        them by chunks, with several workers.
         """
         # pylint: disable=import-outside-toplevel
         from tournesol.entities import ENTITY_TYPE_NAME_TO_CLASS
 
-        for entity in models.Entity.objects.iterator():
-            ENTITY_TYPE_NAME_TO_CLASS[entity.type].update_search_vector(entity)
+        for entity_type in ENTITY_TYPE_NAME_TO_CLASS.values():
+            entity_type.bulk_update_search_vectors(models.Entity.objects.all())
@@ -23,6 +23,8 @@ class CandidateEntity(EntityType):
     """
     name = TYPE_CANDIDATE
     metadata_serializer_class = CandidateMetadata
+    search_token_weights = {"name": 1.0, "frwiki_title": 0.5}
+    search_config = "customized_french"
 
     @classmethod
     def get_uid_regex(cls, namespace: str) -> str:
@@ -84,31 +86,42 @@ class CandidateEntity(EntityType):
 
         self.instance.metadata = metadata
 
+    @classmethod
+    def get_search_vector(cls):
+        return (
+            SearchVector("uid", weight="A", config=cls.search_config)
+            + SearchVector(
+                KeyTextTransform("name", "metadata"), weight="A", config=cls.search_config
+            )
+            + SearchVector(
+                KeyTextTransform("frwiki_title", "metadata"),
+                weight="B",
+                config=cls.search_config,
+            )
+            + SearchVector(
+                KeyTextTransform("youtube_channel_id", "metadata"),
+                weight="B",
+                config=cls.search_config,
+            )
+            + SearchVector(
+                KeyTextTransform("twitter_username", "metadata"),
+                weight="B",
+                config=cls.search_config,
+            )
+        )
+
     @classmethod
     def update_search_vector(cls, entity) -> None:
 
         if entity.type == TYPE_CANDIDATE:
-            french_config = "customized_french"
-
-            entity.search_config_name = french_config
-            entity.search_vector = (
-                SearchVector("uid", weight="A", config=french_config)
-                + SearchVector(
-                    KeyTextTransform("name", "metadata"), weight="A", config=french_config
-                )
-                + SearchVector(
-                    KeyTextTransform("frwiki_title", "metadata"), weight="B", config=french_config
-                )
-                + SearchVector(
-                    KeyTextTransform("youtube_channel_id", "metadata"),
-                    weight="B",
-                    config=french_config,
-                )
-                + SearchVector(
-                    KeyTextTransform("twitter_username", "metadata"),
-                    weight="B",
-                    config=french_config,
-                )
-            )
+            entity.search_config_name = cls.search_config
+            entity.search_vector = cls.get_search_vector()
 
             entity.save(update_fields=["search_config_name", "search_vector"])
+
+    @classmethod
+    def bulk_update_search_vectors(cls, queryset) -> int:
+        return queryset.filter(type=cls.name).update(
+            search_config_name=cls.search_config,
+            search_vector=cls.get_search_vector(),
+        )
@@ -3,6 +3,7 @@ from typing import List
 
 from django.conf import settings
 from django.contrib.postgres.search import SearchVector
+from django.db.models import Q
 from django.db.models.fields.json import KeyTextTransform
 from django.utils import timezone
 
@@ -29,6 +30,7 @@ class VideoEntity(EntityType):
 
     name = TYPE_VIDEO
     metadata_serializer_class = VideoMetadata
+    search_token_weights = {"name": 1.0, "uploader": 0.8, "tags": 0.5}
 
     @classmethod
     def get_allowed_meta_order_fields(cls) -> List[str]:
@@ -99,14 +101,8 @@ class VideoEntity(EntityType):
         return ratio > settings.VIDEO_METADATA_REFRESH_THRESHOLD
 
     @classmethod
-    def update_search_vector(cls, entity) -> None:
-        # pylint: disable=import-outside-toplevel
-        from tournesol.utils.video_language import language_to_postgres_config
-
-        language_config = language_to_postgres_config(entity.metadata["language"])
-
-        entity.search_config_name = language_config
-        entity.search_vector = (
+    def get_search_vector(cls, language_config: str):
+        return (
             SearchVector("uid", weight="A", config=language_config)
             + SearchVector(
                 KeyTextTransform("name", "metadata"), weight="A", config=language_config
@@ -126,4 +122,45 @@ class VideoEntity(EntityType):
             )
         )
 
+    @classmethod
+    def update_search_vector(cls, entity) -> None:
+        # pylint: disable=import-outside-toplevel
+        from tournesol.utils.video_language import language_to_postgres_config
+
+        language_config = language_to_postgres_config(entity.metadata["language"])
+
+        entity.search_config_name = language_config
+        entity.search_vector = cls.get_search_vector(language_config)
+
         entity.save(update_fields=["search_config_name", "search_vector"])
+
+    @classmethod
+    def bulk_update_search_vectors(cls, queryset) -> int:
+        """
+        Update the search vectors with one query per language config, instead
+        of one query per entity.
+        """
+        # pylint: disable=import-outside-toplevel
+        from tournesol.utils.video_language import (
+            DEFAULT_SEARCH_CONFIG,
+            postgres_config_to_language_codes,
+        )
+
+        queryset = queryset.filter(type=cls.name)
+        n_updated = 0
+        all_language_codes = []
+        for language_config, language_codes in postgres_config_to_language_codes().items():
+            all_language_codes.extend(language_codes)
+            n_updated += queryset.filter(metadata__language__in=language_codes).update(
+                search_config_name=language_config,
+                search_vector=cls.get_search_vector(language_config),
+            )
+
+        # The videos without language, or with a language not supported by Postgres
+        n_updated += queryset.filter(
+            Q(metadata__language__isnull=True) | ~Q(metadata__language__in=all_language_codes)
+        ).update(
+            search_config_name=DEFAULT_SEARCH_CONFIG,
+            search_vector=cls.get_search_vector(DEFAULT_SEARCH_CONFIG),
+        )
+        return n_updated
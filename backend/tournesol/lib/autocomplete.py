@@ -0,0 +1,172 @@
+"""
+Search-as-you-type of the entities of a poll, using the prefix index of the
+entities' search tokens instead of the full-text search.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Collate
+
+from tournesol.models import Entity, EntityPollRating, EntitySearchToken, Poll
+from tournesol.utils.constants import MEHESTAN_MAX_SCALED_SCORE
+
+# Only the first words of the query are searched.
+MAX_QUERY_TOKENS = 5
+# Shorter words of the query only match identical tokens, as they would
+# start too many tokens.
+MIN_PREFIX_LENGTH = 2
+# The maximum number of entities whose tokens are aggregated, so that the
+# latency doesn't grow with the number of entities matching a short prefix.
+MAX_CANDIDATES = 500
+# The relevance of a token starting with a word of the query, relatively to
+# a token equal to this word.
+PREFIX_MATCH_FACTOR = 0.5
+# The weight of the tournesol score in the ranking, as `search_score_coef`
+# in the recommendations.
+SCORE_COEF = 2
+
+
+def _tokens() -> QuerySet:
+    """
+    The search tokens, with their `c_token` compared in the "C" collation,
+    like in the prefix index.
+    """
+    return EntitySearchToken.objects.alias(c_token=Collate("token", "C"))
+
+
+def _matching_condition(prefix: str) -> Q:
+    if len(prefix) >= MIN_PREFIX_LENGTH:
+        return Q(c_token__startswith=prefix)
+    return Q(c_token=prefix)
+
+
+def _candidate_entity_ids(prefixes: list[str], entities: QuerySet) -> QuerySet:
+    """
+    Return the ids of at most `MAX_CANDIDATES` entities of `entities` matching
+    every word of the query, found from the tokens starting with the longest
+    word, likely the most selective.
+
+    The tokens are read in the order of the prefix index, so the entities
+    whose token is equal to this word, or is one of its first completions,
+    are the candidates. When more entities match, the entities matching only
+    through later completions are not ranked, whatever their tournesol score.
+    """
+    longest_prefix = max(prefixes, key=len)
+    other_matches = [
+        Exists(
+            _tokens().filter(
+                _matching_condition(prefix), entity_id=OuterRef("entity_id")
+            )
+        )
+        for prefix in prefixes
+        if prefix != longest_prefix
+    ]
+    return (
+        _tokens()
+        .filter(_matching_condition(longest_prefix), *other_matches, entity__in=entities)
+        .order_by("c_token")
+        .values("entity_id")[:MAX_CANDIDATES]
+    )
+
+
+def _match_expressions(prefixes: list[str]) -> dict[str, Max]:
+    """
+    The best weight of the tokens matching each word of the query.
+    """
+    return {
+        f"_match_{index}": Max(
+            Case(
+                When(c_token=prefix, then=F("weight")),
+                When(_matching_condition(prefix), then=F("weight") * PREFIX_MATCH_FACTOR),
+                output_field=FloatField(),
+            )
+        )
+        for index, prefix in enumerate(prefixes)
+    }
+
+
+def _tournesol_score_expression(poll: Poll) -> Coalesce:
+    return Coalesce(
+        Subquery(
+            EntityPollRating.objects.filter(poll=poll, entity_id=OuterRef("entity_id")).values(
+                "tournesol_score"
+            )[:1]
+        ),
+        0.0,
+        output_field=FloatField(),
+    )
+
+
+def _relevance_expression(matches: dict[str, Max]):
+    """
+    The mean of the best weights matching each word of the query.
+    """
+    return reduce(lambda total, match: total + F(match), matches, Value(0.0)) / len(matches)
+
+
+def _search_score_expression():
+    normalized_score = (F("tournesol_score") + MEHESTAN_MAX_SCALED_SCORE) / (
+        2 * MEHESTAN_MAX_SCALED_SCORE
+    )
+    return F("relevance") * (F("relevance") + SCORE_COEF * normalized_score)
+
+
+def autocomplete_entities(poll: Poll, query: str, limit: int, unsafe=False) -> list[Entity]:
+    """
+    Return the `limit` entities of `poll` having a token starting with each
+    word of `query`, sorted by decreasing search score.
+
+    The search score combines the relevance of the matching tokens and the
+    tournesol score, like the search score of the recommendations. The
+    entities are annotated with their `relevance` and `tournesol_score`.
+    """
+    prefixes = list(dict.fromkeys(EntitySearchToken.tokenize(query)))[:MAX_QUERY_TOKENS]
+    if not prefixes:
+        return []
+
+    if unsafe:
+        entities = Entity.objects.filter(all_poll_ratings__poll=poll)
+    else:
+        entities = Entity.objects.filter_safe_for_poll(poll)
+
+    matches = _match_expressions(prefixes)
+    results = list(
+        _tokens()
+        .filter(
+            reduce(or_, (_matching_condition(prefix) for prefix in prefixes)),
+            entity_id__in=_candidate_entity_ids(prefixes, entities),
+        )
+        .values("entity_id")
+        .annotate(**matches)
+        .filter(**{f"{match}__isnull": False for match in matches})
+        .annotate(
+            relevance=_relevance_expression(matches),
+            tournesol_score=_tournesol_score_expression(poll),
+        )
+        .alias(search_score=_search_score_expression())
+        .order_by("-search_score", "-entity_id")
+        .values_list("entity_id", "relevance", "tournesol_score")[:limit]
+    )
+
+    entities_by_id = Entity.objects.in_bulk([entity_id for entity_id, _, _ in results])
+    ranked_entities = []
+    for entity_id, entity_relevance, entity_tournesol_score in results:
+        entity = entities_by_id[entity_id]
+        entity.relevance = entity_relevance
+        entity.tournesol_score = entity_tournesol_score
+        ranked_entities.append(entity)
+    return ranked_entities
@@ -0,0 +1,287 @@
+"""
+In-memory index of the recommendation filters, used to filter the entities of
+a score matrix without evaluating the JSON metadata in the database.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from tournesol.models import Entity, EntityCriteriaScore, Poll
+
+
+class CompressedBitmap:
+    """
+    A set of rows among `n_rows`, stored as a sorted array of rows when it is
+    sparse, and as packed bits otherwise.
+    """
+
+    def __init__(self, n_rows: int, mask: np.ndarray):
+        self.n_rows = n_rows
+        self._rows: Optional[np.ndarray] = None
+        self._bits: Optional[np.ndarray] = None
+        self._store(mask)
+
+    @classmethod
+    def from_rows(cls, n_rows: int, rows: Iterable[int]) -> "CompressedBitmap":
+        mask = np.zeros(n_rows, dtype=bool)
+        mask[np.fromiter(rows, dtype=np.int64)] = True
+        return cls(n_rows, mask)
+
+    def _store(self, mask: np.ndarray):
+        # A sorted array of int32 takes less memory than the packed bits
+        # below 1 row out of 32.
+        if np.count_nonzero(mask) * 32 < self.n_rows:
+            self._rows, self._bits = np.flatnonzero(mask).astype(np.int32), None
+        else:
+            self._rows, self._bits = None, np.packbits(mask)
+
+    def to_mask(self) -> np.ndarray:
+        if self._bits is not None:
+            return np.unpackbits(self._bits, count=self.n_rows).astype(bool)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self._rows] = True
+        return mask
+
+    def set(self, row: int, value: bool):
+        if self._bits is not None:
+            byte, bit = divmod(row, 8)
+            if value:
+                self._bits[byte] |= 0x80 >> bit
+            else:
+                self._bits[byte] &= 0xFF ^ (0x80 >> bit)
+            return
+        position = int(np.searchsorted(self._rows, row))
+        present = position < len(self._rows) and self._rows[position] == row
+        if value and not present:
+            self._rows = np.insert(self._rows, position, row)
+        elif not value and present:
+            self._rows = np.delete(self._rows, position)
+
+
+class CategoricalColumn:
+    """
+    The values of a categorical metadata field, with the bitmap of the rows
+    of each value.
+    """
+
+    def __init__(self, values: list):
+        self.values = values
+        rows_by_value: dict = {}
+        for row, value in enumerate(values):
+            if isinstance(value, str):
+                rows_by_value.setdefault(value, []).append(row)
+        self.bitmaps = {
+            value: CompressedBitmap.from_rows(len(values), rows)
+            for value, rows in rows_by_value.items()
+        }
+
+    def set(self, row: int, value):
+        old_value = self.values[row]
+        if old_value == value:
+            return
+        if isinstance(old_value, str):
+            self.bitmaps[old_value].set(row, False)
+        if isinstance(value, str):
+            if value not in self.bitmaps:
+                self.bitmaps[value] = CompressedBitmap.from_rows(len(self.values), [])
+            self.bitmaps[value].set(row, True)
+        self.values[row] = value
+
+    def mask(self, values: list[str]) -> np.ndarray:
+        """The mask of the rows having one of `values`."""
+        mask = np.zeros(len(self.values), dtype=bool)
+        for value in values:
+            bitmap = self.bitmaps.get(value)
+            if bitmap is not None:
+                mask |= bitmap.to_mask()
+        return mask
+
+
+class DateColumn:
+    """
+    The ISO dates of a metadata field, as fixed-width strings compared at
+    once, with the mask of the rows having a date.
+    """
+
+    def __init__(self, dates: list):
+        self.has_date = np.array([isinstance(date, str) for date in dates], dtype=bool)
+        self.dates = np.array(
+            [date if isinstance(date, str) else "" for date in dates], dtype=str
+        )
+
+    def set(self, row: int, date):
+        self.has_date[row] = isinstance(date, str)
+        date = date if isinstance(date, str) else ""
+        if len(date) > self.dates.dtype.itemsize // 4:
+            # The fixed width of the strings must be increased
+            self.dates = self.dates.astype(f"<U{len(date)}")
+        self.dates[row] = date
+
+    def range_mask(self, date_lte, date_gte) -> np.ndarray:
+        """The mask of the rows having a date between the optional bounds."""
+        mask = self.has_date.copy()
+        if date_lte:
+            mask &= self.dates <= date_lte.isoformat()
+        if date_gte:
+            mask &= self.dates >= date_gte.isoformat()
+        return mask
+
+
+class PollFilterIndex:
+    """
+    Bitmaps of the rows of a score matrix matching the common filters of the
+    recommendations: one per value of the categorical metadata, and one of
+    the entities safe to recommend. The numeric metadata and the dates are
+    kept as columns, compared at once.
+
+    `filter_rows` returns None for the filters that are not indexed, which
+    must then be evaluated by the database.
+    """
+
+    CATEGORICAL_FIELDS = ("language", "uploader")
+    NUMERIC_FIELDS = ("duration",)
+    NUMERIC_LOOKUPS = {
+        None: np.equal,
+        "lt": np.less,
+        "lte": np.less_equal,
+        "gt": np.greater,
+        "gte": np.greater_equal,
+    }
+    DATE_FIELD = "publication_date"
+
+    def __init__(self, poll: Poll, entity_ids: np.ndarray):
+        self.poll = poll
+        self.entity_ids = entity_ids
+        n_rows = len(entity_ids)
+
+        metadata_fields = [*self.CATEGORICAL_FIELDS, *self.NUMERIC_FIELDS, self.DATE_FIELD]
+        metadata_values = {
+            entity_id: values
+            for entity_id, *values in Entity.objects.filter(
+                id__in=EntityCriteriaScore.objects.filter(poll=poll).values("entity_id")
+            )
+            .values_list("id", *(f"metadata__{field}" for field in metadata_fields))
+            .iterator()
+        }
+        empty_values = [None] * len(metadata_fields)
+        rows_values = [metadata_values.get(entity_id, empty_values) for entity_id in entity_ids]
+
+        self.categorical = {
+            field: CategoricalColumn([values[column] for values in rows_values])
+            for column, field in enumerate(self.CATEGORICAL_FIELDS)
+        }
+
+        self.numbers: dict[str, np.ndarray] = {}
+        for column, field in enumerate(self.NUMERIC_FIELDS, start=len(self.CATEGORICAL_FIELDS)):
+            self.numbers[field] = np.array(
+                [_as_number(values[column]) for values in rows_values], dtype=np.float64
+            )
+
+        self.dates = DateColumn([values[-1] for values in rows_values])
+        self.safe = CompressedBitmap(n_rows, np.zeros(n_rows, dtype=bool))
+        self.update_safety()
+
+    def row_of(self, entity_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.entity_ids, entity_id))
+        if row < len(self.entity_ids) and self.entity_ids[row] == entity_id:
+            return row
+        return None
+
+    def update_entity(self, entity: Entity):
+        """Updates the bitmaps and columns of the metadata of `entity`."""
+        row = self.row_of(entity.pk)
+        if row is None:
+            return
+        metadata = entity.metadata or {}
+        for field, column in self.categorical.items():
+            column.set(row, metadata.get(field))
+        for field in self.NUMERIC_FIELDS:
+            self.numbers[field][row] = _as_number(metadata.get(field))
+        self.dates.set(row, metadata.get(self.DATE_FIELD))
+
+    def update_safety(self, entity_ids: Optional[list[int]] = None):
+        """
+        Updates the safety of `entity_ids`, or of all entities, from their
+        ratings and the contexts of the poll.
+        """
+        queryset = Entity.objects.filter_safe_for_poll(self.poll)
+        if entity_ids is None:
+            safe_ids = np.fromiter(queryset.values_list("id", flat=True), dtype=np.int64)
+            self.safe = CompressedBitmap(
+                len(self.entity_ids), np.isin(self.entity_ids, safe_ids)
+            )
+            return
+        safe_ids = set(queryset.filter(id__in=entity_ids).values_list("id", flat=True))
+        for entity_id in entity_ids:
+            row = self.row_of(entity_id)
+            if row is not None:
+                self.safe.set(row, entity_id in safe_ids)
+
+    def filter_rows(
+        self,
+        filters: dict,
+        metadata_filters: list[tuple[str, list[str]]],
+    ) -> Optional[np.ndarray]:
+        """
+        Returns the mask of the rows matching the validated `filters` of the
+        recommendations and the `metadata_filters`, or None if some of them
+        are not indexed.
+
+        The `search` and `exclude_compared_entities` filters are not indexed.
+        """
+        if filters.get("search"):
+            return None
+        mask = np.ones(len(self.entity_ids), dtype=bool)
+
+        if filters["date_lte"] or filters["date_gte"]:
+            if self.poll.entity_cls.get_filter_date_field() != f"metadata__{self.DATE_FIELD}":
+                return None
+            mask &= self.dates.range_mask(filters["date_lte"], filters["date_gte"])
+
+        for operation, values in metadata_filters:
+            field_mask = self._metadata_filter_mask(operation, values)
+            if field_mask is None:
+                return None
+            mask &= field_mask
+
+        if not filters["unsafe"]:
+            mask &= self.safe.to_mask()
+        return mask
+
+    def _metadata_filter_mask(self, operation: str, values: list[str]) -> Optional[np.ndarray]:
+        """
+        Returns the mask of a metadata filter, with the semantics and the
+        validation of `EntityType.filter_metadata`.
+        """
+        entity_cls = self.poll.entity_cls
+        field, lookup, func = entity_cls.get_meta_filter_operation(operation)
+        entity_cls.validate_meta_filter_field(field)
+
+        if len(values) > 1:
+            if field not in self.categorical:
+                return None
+            return self.categorical[field].mask(values)
+
+        if lookup not in entity_cls.get_allowed_meta_filter_lookups():
+            lookup = None
+        value = values[0]
+        if func:
+            value = entity_cls.cast_meta_filter_value(value, func)
+
+        if field in self.categorical and lookup is None and isinstance(value, str):
+            return self.categorical[field].mask([value])
+        if (
+            field in self.NUMERIC_FIELDS
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+        ):
+            return self.NUMERIC_LOOKUPS[lookup](self.numbers[field], value)
+        return None
+
+
+def _as_number(value) -> float:
+    """Numeric metadata, or NaN which matches no comparison, like a missing value"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
@@ -0,0 +1,219 @@
+"""
+In-memory pools of the entities that can be recommended at random, used to
+draw random recommendations without sorting all the safe entities of a poll
+in the database.
+
+The pools are kept by each process, and loaded again when they are older than
+`RECOMMENDATIONS_RANDOM_POOL_MAX_AGE_SECONDS`.
+"""
+
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import QuerySet
+
+from tournesol.lib.filter_index import DateColumn
+from tournesol.models import Entity, EntityPollRating, Poll
+
+
+class RandomCandidates:
+    """
+    Entities among which random samples are drawn, uniformly or with a
+    probability proportional to their weight.
+    """
+
+    def __init__(self, entity_ids: np.ndarray, weights: np.ndarray):
+        self.entity_ids = entity_ids
+        self.weights = weights
+        self.cumulative_weights = np.cumsum(weights, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def sample(self, k: int, weighted: bool, rng: np.random.Generator) -> np.ndarray:
+        """
+        Returns `k` distinct entity ids drawn at random, in a random order, or
+        all entity ids shuffled if there are not enough of them.
+        """
+        if k >= len(self):
+            return rng.permutation(self.entity_ids)
+        if not weighted or self.cumulative_weights[-1] <= 0:
+            # Drawn in O(k) when k is small compared to the number of candidates
+            return self.entity_ids[rng.choice(len(self), size=k, replace=False)]
+        return self.entity_ids[self._weighted_positions(k, rng)]
+
+    def subset(self, mask: np.ndarray) -> "RandomCandidates":
+        return RandomCandidates(self.entity_ids[mask], self.weights[mask])
+
+    def _weighted_positions(self, k: int, rng: np.random.Generator) -> np.ndarray:
+        total_weight = self.cumulative_weights[-1]
+        positions = np.empty(0, dtype=np.int64)
+        # Entities are drawn with replacement in O(k log n), and drawn again
+        # until `k` distinct entities are found.
+        for _ in range(10):
+            draws = np.searchsorted(
+                self.cumulative_weights,
+                rng.random(2 * (k - len(positions))) * total_weight,
+                side="right",
+            )
+            positions = np.concatenate([positions, draws])
+            _, first_draws = np.unique(positions, return_index=True)
+            positions = positions[np.sort(first_draws)]
+            if len(positions) >= k:
+                return positions[:k]
+        # A few entities hold most of the weight
+        return rng.choice(
+            len(self),
+            size=k,
+            replace=False,
+            p=self.weights / total_weight,
+        )
+
+
+class PollRandomPool:
+    """
+    The safe entities of a poll, weighted by their tournesol score, with the
+    candidates of each language and their publication dates.
+    """
+
+    DATE_FIELD = "publication_date"
+
+    def __init__(
+        self,
+        entity_ids: np.ndarray,
+        languages: list[Optional[str]],
+        weights: np.ndarray,
+        dates: Optional[list[Optional[str]]] = None,
+    ):
+        self.all = RandomCandidates(entity_ids, weights)
+        self.dates = DateColumn(dates if dates is not None else [None] * len(entity_ids))
+        rows_by_language: dict[str, list[int]] = {}
+        for row, language in enumerate(languages):
+            if isinstance(language, str):
+                rows_by_language.setdefault(language, []).append(row)
+        self.by_language = {
+            language: RandomCandidates(entity_ids[rows], weights[rows])
+            for language, rows in rows_by_language.items()
+        }
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, poll: Poll) -> "PollRandomPool":
+        rows = list(
+            EntityPollRating.objects.filter(
+                poll=poll, entity__in=Entity.objects.filter_safe_for_poll(poll)
+            )
+            .order_by("entity_id")
+            .values_list(
+                "entity_id",
+                "entity__metadata__language",
+                "tournesol_score",
+                f"entity__metadata__{cls.DATE_FIELD}",
+            )
+        )
+        return cls(
+            entity_ids=np.array([row[0] for row in rows], dtype=np.int64),
+            languages=[row[1] for row in rows],
+            weights=np.array([row[2] or 0.0 for row in rows], dtype=np.float64),
+            dates=[row[3] for row in rows],
+        )
+
+    @classmethod
+    def filters_dates_of(cls, poll: Poll) -> bool:
+        """Whether the date filters of `poll` can be evaluated by its pool."""
+        return poll.entity_cls.get_filter_date_field() == f"metadata__{cls.DATE_FIELD}"
+
+    def is_up_to_date(self) -> bool:
+        return (
+            time.monotonic() - self.loaded_at
+            < settings.RECOMMENDATIONS_RANDOM_POOL_MAX_AGE_SECONDS
+        )
+
+    def candidates(
+        self,
+        languages: Optional[list[str]] = None,
+        entity_ids: Optional[Iterable[int]] = None,
+        date_lte=None,
+        date_gte=None,
+    ) -> RandomCandidates:
+        """
+        Returns the candidates of the pool, restricted to the entities in
+        `languages`, in `entity_ids`, and published between `date_gte` and
+        `date_lte`, if provided.
+        """
+        if languages is None:
+            candidates = self.all
+        elif len(languages) == 1:
+            candidates = self.by_language.get(
+                languages[0], RandomCandidates(np.empty(0, dtype=np.int64), np.empty(0))
+            )
+        else:
+            selected = [self.by_language[lang] for lang in languages if lang in self.by_language]
+            candidates = RandomCandidates(
+                np.concatenate([np.empty(0, dtype=np.int64)] + [c.entity_ids for c in selected]),
+                np.concatenate([np.empty(0)] + [c.weights for c in selected]),
+            )
+        if date_lte or date_gte:
+            # The rows of the candidates in the pool, sorted by entity id
+            rows = np.searchsorted(self.all.entity_ids, candidates.entity_ids)
+            candidates = candidates.subset(self.dates.range_mask(date_lte, date_gte)[rows])
+        if entity_ids is None:
+            return candidates
+        return candidates.subset(
+            np.isin(candidates.entity_ids, np.fromiter(entity_ids, dtype=np.int64))
+        )
+
+
+_pools: dict[int, PollRandomPool] = {}
+
+
+def get_random_pool(poll: Poll) -> PollRandomPool:
+    pool = _pools.get(poll.pk)
+    if pool is None or not pool.is_up_to_date():
+        pool = PollRandomPool.load(poll)
+        _pools[poll.pk] = pool
+    return pool
+
+
+def clear_random_pools(poll_id: Optional[int] = None):
+    """Clears the pools loaded by this process, of all polls or of `poll_id`."""
+    if poll_id is None:
+        _pools.clear()
+    else:
+        _pools.pop(poll_id, None)
+
+
+class RandomSample:
+    """
+    Random entities drawn among `candidates`.
+
+    Slicing draws the entities of the slice only, fetched by `fetch_entities`.
+    This allows to use it as the queryset of a paginated view.
+    """
+
+    def __init__(
+        self,
+        candidates: RandomCandidates,
+        fetch_entities: Callable[[list[int]], QuerySet],
+        weighted: bool = False,
+    ):
+        self.candidates = candidates
+        self.fetch_entities = fetch_entities
+        self.weighted = weighted
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __getitem__(self, key: slice) -> list:
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return []
+        entity_ids = self.candidates.sample(
+            stop, self.weighted, np.random.default_rng()
+        )[start:].tolist()
+        entities_by_id = {entity.id: entity for entity in self.fetch_entities(entity_ids)}
+        return [
+            entities_by_id[entity_id] for entity_id in entity_ids if entity_id in entities_by_id
+        ]
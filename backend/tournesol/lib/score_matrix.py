@@ -0,0 +1,183 @@
+"""
+In-memory matrices of the entities' criteria scores, used to rank the
+recommendations for any criteria weights without aggregating the scores in
+the database.
+
+The matrices are kept by each process, and loaded again when `ml_train` has
+saved scores since they were loaded, even of the main criterion only, or when
+they are older than `RECOMMENDATIONS_SCORE_MATRIX_MAX_AGE_SECONDS`.
+"""
+
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import QuerySet
+
+from tournesol.lib.filter_index import PollFilterIndex
+from tournesol.models import EntityCriteriaScore, Poll
+
+
+class PollScoreMatrix:
+    """
+    The criteria scores of the entities of a poll in a score mode: one row
+    per entity having at least one score, sorted by id, and one column per
+    criterion. Missing scores are 0, like in the weighted sum computed by the
+    database.
+
+    The rows matching the recommendation filters are given by `filter_index`.
+    """
+
+    def __init__(
+        self,
+        entity_ids: np.ndarray,
+        criteria: list[str],
+        scores: np.ndarray,
+        filter_index: PollFilterIndex,
+        ml_scores_saved_at=None,
+    ):
+        self.entity_ids = entity_ids
+        self.criteria = criteria
+        self.scores = scores
+        self.filter_index = filter_index
+        self.ml_scores_saved_at = ml_scores_saved_at
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, poll: Poll, score_mode: str) -> "PollScoreMatrix":
+        rows = list(
+            EntityCriteriaScore.objects.filter(poll=poll, score_mode=score_mode).values_list(
+                "entity_id", "criteria", "score"
+            )
+        )
+        entity_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        row_criteria = [row[1] for row in rows]
+        # Scores of criteria removed from the poll are kept, with a weight of 0
+        criteria = poll.criterias_list + sorted(set(row_criteria) - set(poll.criterias_list))
+        criteria_columns = {criterion: column for column, criterion in enumerate(criteria)}
+
+        unique_entity_ids, entity_rows = np.unique(entity_ids, return_inverse=True)
+        scores = np.zeros((len(unique_entity_ids), len(criteria)), dtype=np.float64)
+        np.add.at(
+            scores,
+            (entity_rows, [criteria_columns[criterion] for criterion in row_criteria]),
+            np.array([row[2] for row in rows], dtype=np.float64),
+        )
+        return cls(
+            entity_ids=unique_entity_ids,
+            criteria=criteria,
+            scores=scores,
+            filter_index=PollFilterIndex(poll, unique_entity_ids),
+            ml_scores_saved_at=poll.ml_scores_saved_at,
+        )
+
+    def is_up_to_date(self, poll: Poll) -> bool:
+        return (
+            self.ml_scores_saved_at == poll.ml_scores_saved_at
+            and time.monotonic() - self.loaded_at
+            < settings.RECOMMENDATIONS_SCORE_MATRIX_MAX_AGE_SECONDS
+        )
+
+    def total_scores(self, weights: dict[str, float]) -> np.ndarray:
+        """Returns the weighted sum of the criteria scores of each entity."""
+        weights_vector = np.array(
+            [weights.get(criterion, 0.0) for criterion in self.criteria], dtype=np.float64
+        )
+        return self.scores @ weights_vector
+
+    def rows_of(self, entity_ids: Iterable[int]) -> np.ndarray:
+        """Returns the mask of the rows of the entities among `entity_ids`."""
+        return np.isin(self.entity_ids, np.fromiter(entity_ids, dtype=np.int64))
+
+
+_matrices: dict[tuple[int, str], PollScoreMatrix] = {}
+
+
+def get_score_matrix(poll: Poll, score_mode: str) -> PollScoreMatrix:
+    matrix = _matrices.get((poll.pk, score_mode))
+    if matrix is None or not matrix.is_up_to_date(poll):
+        matrix = PollScoreMatrix.load(poll, score_mode)
+        _matrices[(poll.pk, score_mode)] = matrix
+    return matrix
+
+
+def loaded_score_matrices(poll_id: Optional[int] = None) -> list[PollScoreMatrix]:
+    """Returns the matrices loaded by this process, of all polls or of `poll_id`."""
+    return [
+        matrix
+        for (matrix_poll_id, _), matrix in list(_matrices.items())
+        if poll_id is None or matrix_poll_id == poll_id
+    ]
+
+
+def clear_score_matrices():
+    _matrices.clear()
+
+
+class RankedEntities:
+    """
+    The entities of a score matrix ranked by decreasing total score, then by
+    decreasing id, like `order_by("-total_score", "-pk")`.
+
+    Slicing returns the entities of the slice only, fetched by `fetch_entities`
+    and annotated with their `total_score`. This allows to use it as the
+    queryset of a paginated view.
+    """
+
+    def __init__(
+        self,
+        entity_ids: np.ndarray,
+        total_scores: np.ndarray,
+        fetch_entities: Callable[[list[int]], QuerySet],
+    ):
+        self.entity_ids = entity_ids
+        self.total_scores = total_scores
+        self.fetch_entities = fetch_entities
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def top(self, stop: int) -> np.ndarray:
+        """Returns the positions of the `stop` first ranked entities, in order."""
+        if stop < len(self.total_scores):
+            # Only the entities scored at least as high as the last selected one are sorted
+            threshold = -np.partition(-self.total_scores, stop - 1)[stop - 1]
+            selected = np.flatnonzero(self.total_scores >= threshold)
+        else:
+            selected = np.arange(len(self.total_scores))
+        order = np.lexsort((-self.entity_ids[selected], -self.total_scores[selected]))
+        return selected[order][:stop]
+
+    def __getitem__(self, key: slice) -> list:
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return []
+        positions = self.top(stop)[start:]
+        entity_ids = self.entity_ids[positions].tolist()
+        entities_by_id = {
+            entity.id: entity for entity in self.fetch_entities(entity_ids)
+        }
+        entities = []
+        for entity_id, total_score in zip(entity_ids, self.total_scores[positions].tolist()):
+            entity = entities_by_id.get(entity_id)
+            if entity is not None:
+                entity.total_score = total_score
+                entities.append(entity)
+        return entities
+
+
+def rank_entities(
+    matrix: PollScoreMatrix,
+    weights: dict[str, float],
+    fetch_entities: Callable[[list[int]], QuerySet],
+    rows: Optional[np.ndarray] = None,
+) -> RankedEntities:
+    """
+    Ranks the entities of `matrix` by their total score computed with
+    `weights`, restricted to `rows` if provided.
+    """
+    total_scores = matrix.total_scores(weights)
+    if rows is None:
+        return RankedEntities(matrix.entity_ids, total_scores, fetch_entities)
+    return RankedEntities(matrix.entity_ids[rows], total_scores[rows], fetch_entities)
@@ -0,0 +1,85 @@
+import random
+import timeit
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tournesol.lib.autocomplete import autocomplete_entities
+from tournesol.models import Entity, Poll
+from tournesol.models.poll import DEFAULT_POLL_NAME
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency of the search-as-you-type, and of the full-text search of the"
+        " recommendations, with the names of random safe entities typed one key at a time."
+        " Meant to be run on a database created by `load_public_dataset`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", default=DEFAULT_POLL_NAME)
+        parser.add_argument(
+            "--entities", type=int, default=100, help="Number of entity names typed"
+        )
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        poll = Poll.objects.get(name=options["poll"])
+        limit = options["limit"]
+        names = sorted(
+            (entity_id, name)
+            for entity_id, name in Entity.objects.filter_safe_for_poll(poll).values_list(
+                "id", "metadata__name"
+            )
+            if isinstance(name, str) and name.strip()
+        )
+        sample = random.Random(options["seed"]).sample(names, min(options["entities"], len(names)))
+
+        autocomplete_durations = []
+        search_durations = []
+        n_found = 0
+        for entity_id, name in sample:
+            # The first words of the name, typed one key at a time
+            typed_text = " ".join(name.split()[:3])
+            results = self.type_text(poll, typed_text, limit, autocomplete_durations)
+            n_found += entity_id in [entity.id for entity in results]
+
+            start = timeit.default_timer()
+            list(
+                poll.entity_cls.filter_search(
+                    Entity.objects.filter_safe_for_poll(poll), typed_text
+                ).order_by("-relevance", "-pk")[:limit]
+            )
+            search_durations.append(timeit.default_timer() - start)
+
+        self.stdout.write(f"Poll {poll.name}: {len(sample)} entity names typed")
+        self.write_durations("Search-as-you-type, per keystroke", autocomplete_durations)
+        self.write_durations("Full-text search, per typed text", search_durations)
+        self.stdout.write(
+            f"Typed entities found in the {limit} first results of the search-as-you-type:"
+            f" {n_found}/{len(sample)}"
+        )
+
+    @staticmethod
+    def type_text(poll: Poll, typed_text: str, limit: int, durations: list[float]) -> list:
+        """
+        Search `typed_text` as it is typed, from its second key, and return
+        the results of the last keystroke.
+        """
+        results = []
+        for length in range(2, len(typed_text) + 1):
+            start = timeit.default_timer()
+            results = autocomplete_entities(poll, typed_text[:length], limit=limit)
+            durations.append(timeit.default_timer() - start)
+        return results
+
+    def write_durations(self, title: str, durations: list[float]):
+        if not durations:
+            self.stdout.write(f"{title}: no query")
+            return
+        p50, p95, p99 = np.percentile(np.array(durations) * 1000, [50, 95, 99])
+        self.stdout.write(
+            f"{title}: {len(durations)} queries, p50 {p50:.1f} ms, p95 {p95:.1f} ms,"
+            f" p99 {p99:.1f} ms, max {max(durations) * 1000:.1f} ms"
+        )
@@ -160,9 +160,6 @@ class Command(BaseCommand):
                 nb_comparisons += 1
             print(f"Created {nb_comparisons} comparisons")
 
-            for video in videos.values():
-                video.update_entity_poll_rating(poll=poll)
-
             self.create_test_user()
             ContributorRating.objects.update(is_public=True, entity_seen=True)
 
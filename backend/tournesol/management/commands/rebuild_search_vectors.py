@@ -0,0 +1,151 @@
+import json
+import os
+import timeit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Type
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+
+from tournesol.entities import ENTITY_TYPE_NAME_TO_CLASS
+from tournesol.entities.base import EntityType
+from tournesol.models import Entity
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search vectors of all entities, by chunks of consecutive ids updated"
+        " with one query per language config. Used to roll out a change of the search"
+        " configs or weights."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            action="append",
+            choices=list(ENTITY_TYPE_NAME_TO_CLASS),
+            help="Entity type to rebuild, all types by default. Can be repeated.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Size of the ranges of entity ids updated at once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of chunks updated concurrently, each with its own connection",
+        )
+        parser.add_argument(
+            "--progress-file",
+            type=Path,
+            default=None,
+            help="File recording the chunks already rebuilt. If it exists, these chunks are"
+            " skipped, to resume an interrupted rebuild.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        workers = options["workers"]
+        if chunk_size < 1 or workers < 1:
+            raise CommandError("--chunk-size and --workers must be positive")
+        entity_types = [
+            ENTITY_TYPE_NAME_TO_CLASS[name]
+            for name in options["type"] or ENTITY_TYPE_NAME_TO_CLASS.keys()
+        ]
+
+        chunk_starts = self.chunk_starts(chunk_size)
+        if not chunk_starts:
+            self.stdout.write("No entity to rebuild")
+            return
+
+        done = self.load_progress(options["progress_file"], chunk_size)
+        pending = [start for start in chunk_starts if start not in done]
+        self.stdout.write(
+            f"Rebuilding {len(pending)} chunks of {chunk_size} ids"
+            f" ({len(chunk_starts) - len(pending)} chunks already rebuilt)"
+        )
+
+        begin = timeit.default_timer()
+        n_updated = 0
+        rebuilt_chunks = self.rebuilt_chunks(
+            partial(self.rebuild_chunk, entity_types, chunk_size, workers > 1), pending, workers
+        )
+        for n_chunks, (start, n_chunk_updated) in enumerate(rebuilt_chunks, start=1):
+            n_updated += n_chunk_updated
+            done.add(start)
+            self.save_progress(options["progress_file"], chunk_size, done)
+            self.stdout.write(
+                f"[{n_chunks}/{len(pending)}] ids {start} to {start + chunk_size - 1}:"
+                f" {n_updated} entities updated in {timeit.default_timer() - begin:.1f}s"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{n_updated} search vectors rebuilt in {timeit.default_timer() - begin:.1f}s"
+            )
+        )
+
+    @staticmethod
+    def chunk_starts(chunk_size: int) -> range:
+        bounds = Entity.objects.aggregate(min_id=Min("id"), max_id=Max("id"))
+        if bounds["min_id"] is None:
+            return range(0)
+        return range(bounds["min_id"], bounds["max_id"] + 1, chunk_size)
+
+    @staticmethod
+    def rebuild_chunk(
+        entity_types: list[Type[EntityType]], chunk_size: int, close_connection: bool, start: int
+    ) -> int:
+        try:
+            queryset = Entity.objects.filter(id__gte=start, id__lt=start + chunk_size)
+            return sum(
+                entity_type.bulk_update_search_vectors(queryset) for entity_type in entity_types
+            )
+        finally:
+            if close_connection:
+                # Each thread opens its own connection
+                connection.close()
+
+    @staticmethod
+    def rebuilt_chunks(
+        rebuild_chunk: Callable[[int], int], pending: list[int], workers: int
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Rebuild the `pending` chunks with `workers` threads, and yield the
+        start of each chunk with its number of updated entities, as soon as
+        it is rebuilt.
+        """
+        if workers == 1:
+            for start in pending:
+                yield start, rebuild_chunk(start)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(rebuild_chunk, start): start for start in pending}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def load_progress(progress_file: Optional[Path], chunk_size: int) -> set[int]:
+        if progress_file is None or not progress_file.exists():
+            return set()
+        progress = json.loads(progress_file.read_text())
+        if progress["chunk_size"] != chunk_size:
+            raise CommandError(
+                f"{progress_file} was created with a chunk size of {progress['chunk_size']}"
+            )
+        return set(progress["done"])
+
+    @staticmethod
+    def save_progress(progress_file: Optional[Path], chunk_size: int, done: set[int]):
+        if progress_file is None:
+            return
+        # The file is replaced atomically, so that an interruption leaves it readable
+        tmp_file = progress_file.with_name(f".{progress_file.name}.tmp")
+        tmp_file.write_text(json.dumps({"chunk_size": chunk_size, "done": sorted(done)}))
+        os.replace(tmp_file, progress_file)
@@ -0,0 +1,38 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from tournesol.models import EntityPollRating, Poll
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Repair the number of comparisons and contributors of the entities, maintained"
+        " incrementally, which drifted from the comparisons"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            action="append",
+            help="Name of the poll to reconcile, all polls by default. Can be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        polls = Poll.objects.all()
+        if options["poll"]:
+            polls = polls.filter(name__in=options["poll"])
+
+        for poll in polls:
+            n_contributors, n_ratings = EntityPollRating.reconcile_n_ratings(poll)
+            if n_contributors or n_ratings:
+                logger.warning(
+                    "Poll %s: repaired %s entity contributors and %s entity ratings",
+                    poll.name, n_contributors, n_ratings,
+                )
+            self.stdout.write(
+                f"Poll {poll.name}: repaired {n_contributors} entity contributors"
+                f" and {n_ratings} entity ratings"
+            )
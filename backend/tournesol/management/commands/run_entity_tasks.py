@@ -0,0 +1,60 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournesol.metrics import get_entity_tasks_stats
+from tournesol.models import EntityTask
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run the queued updates of entities, see the setting COMPARISON_SIDE_EFFECTS_ASYNC"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the tasks due, and stop when none is left, instead of waiting for new ones",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of tasks claimed at once",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when no task is due",
+        )
+
+    def run_tasks(self, tasks: list[EntityTask]) -> int:
+        n_failed = 0
+        for task in tasks:
+            try:
+                task.run()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Entity task %s failed", task)
+                task.fail()
+                n_failed += 1
+            else:
+                task.complete()
+        return n_failed
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = EntityTask.claim(limit=options["batch_size"])
+            if tasks:
+                n_failed = self.run_tasks(tasks)
+                depths, lag = get_entity_tasks_stats()
+                logger.info(
+                    "Ran %s entity tasks (%s failed), %s queued, lag %.1f seconds",
+                    len(tasks), n_failed, sum(depths.values()), lag,
+                )
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["sleep"])
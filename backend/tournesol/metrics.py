@@ -0,0 +1,73 @@
+"""
+Prometheus metrics of the app `tournesol`, exposed at `/monitoring/metrics`.
+"""
+
+import logging
+
+from django.db import DatabaseError
+from django.db.models import Count, Min
+from django.utils import timezone
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+
+def get_entity_tasks_stats():
+    """
+    Returns the number of queued entity tasks per kind, and the lag of the
+    queue: the age in seconds of the oldest task due, 0.0 if no task is due.
+    """
+    from tournesol.models import EntityTask  # pylint: disable=import-outside-toplevel
+
+    now = timezone.now()
+    depths = dict(
+        EntityTask.objects.values("kind")
+        .annotate(n_tasks=Count("id"))
+        .values_list("kind", "n_tasks")
+    )
+    oldest_due = EntityTask.objects.filter(run_after__lte=now).aggregate(
+        oldest=Min("run_after")
+    )["oldest"]
+    lag = 0.0 if oldest_due is None else (now - oldest_due).total_seconds()
+    return depths, lag
+
+
+class EntityTasksCollector(Collector):
+    """Measures the queue of `EntityTask` when the metrics are scraped."""
+
+    @staticmethod
+    def _depth_metric():
+        return GaugeMetricFamily(
+            "tournesol_entity_tasks_queued",
+            "Number of queued entity tasks",
+            labels=["kind"],
+        )
+
+    @staticmethod
+    def _lag_metric(lag=None):
+        return GaugeMetricFamily(
+            "tournesol_entity_tasks_lag_seconds",
+            "Time since the oldest due entity task should have been run",
+            value=lag,
+        )
+
+    def describe(self):
+        # Prevents the registry from calling `collect`, and querying the
+        # database, when the collector is registered.
+        return [self._depth_metric(), self._lag_metric()]
+
+    def collect(self):
+        from tournesol.models import EntityTask  # pylint: disable=import-outside-toplevel
+
+        try:
+            depths, lag = get_entity_tasks_stats()
+        except DatabaseError:
+            logger.warning("Failed to measure the queue of entity tasks", exc_info=True)
+            return
+
+        depth = self._depth_metric()
+        for kind, _ in EntityTask.KIND_CHOICES:
+            depth.add_metric([kind], depths.get(kind, 0))
+        yield depth
+        yield self._lag_metric(lag)
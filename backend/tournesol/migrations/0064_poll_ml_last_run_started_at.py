@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournesol", "0063_data_mark_compared_entities_as_seen"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="poll",
+            name="ml_last_run_started_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Start time of the last ML run which updated the scores of all criteria."
+                " Used by incremental runs to find the comparisons edited since then.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+CREATE_CONTRIBUTORS_SQL = """
+    INSERT INTO tournesol_entitypollcontributor (poll_id, entity_id, user_id, n_comparisons)
+    SELECT poll_id, entity_id, user_id, count(*)
+    FROM (
+        SELECT poll_id, entity_1_id AS entity_id, user_id FROM tournesol_comparison
+        UNION ALL
+        SELECT poll_id, entity_2_id AS entity_id, user_id FROM tournesol_comparison
+    ) AS compared
+    GROUP BY poll_id, entity_id, user_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournesol", "0065_entitytask"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntityPollContributor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "n_comparisons",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of comparisons of the entity made by the user in the"
+                        " poll",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="poll_contributors",
+                        to="tournesol.entity",
+                    ),
+                ),
+                (
+                    "poll",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entity_contributors",
+                        to="tournesol.poll",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entity_contributions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("poll", "entity", "user")},
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_CONTRIBUTORS_SQL, reverse_sql=migrations.RunSQL.noop),
+        # The poll ratings are now updated with the comparisons, instead of
+        # by a queued task.
+        migrations.RunSQL(
+            sql="DELETE FROM tournesol_entitytask WHERE kind = 'update_poll_rating'",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="entitytask",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("refresh_metadata", "Refresh metadata"),
+                    ("auto_remove_rate_later", "Auto remove from rate later"),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
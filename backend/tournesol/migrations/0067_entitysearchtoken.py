@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+from tournesol.entities import build_all_search_tokens
+
+
+def migrate_forward(apps, schema_editor):
+    """
+    Fill the search tokens, used by the search-as-you-type
+    """
+    build_all_search_tokens()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournesol", "0066_entitypollcontributor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntitySearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(help_text="A lowercase word without accents", max_length=64),
+                ),
+                (
+                    "weight",
+                    models.FloatField(
+                        help_text="Weight of the metadata field containing the word, between 0"
+                        " and 1"
+                    ),
+                ),
+                (
+                    "entity",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="tournesol.entity",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        django.db.models.functions.comparison.Collate("token", "C"),
+                        name="search_token_prefix_index",
+                    )
+                ],
+                "unique_together": {("entity", "token")},
+            },
+        ),
+        migrations.RunPython(migrate_forward, migrations.RunPython.noop),
+    ]
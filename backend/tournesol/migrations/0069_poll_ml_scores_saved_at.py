@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournesol", "0068_comparisondeletion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="poll",
+            name="ml_scores_saved_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="End time of the last ML run, on any criteria."
+                " Used to reload the scores kept in memory by the recommendations.",
+                null=True,
+            ),
+        ),
+    ]
@@ -2,11 +2,15 @@
 Models for Tournesol app
 """
 
+from .comparison_deletion import ComparisonDeletion
 from .comparisons import Comparison, ComparisonCriteriaScore
 from .criteria import Criteria, CriteriaLocale, CriteriaRank
 from .entity import Entity
+from .entity_poll_contributor import EntityPollContributor
 from .entity_poll_rating import EntityPollRating
 from .entity_score import EntityCriteriaScore
+from .entity_search_token import EntitySearchToken
+from .entity_task import EntityTask
 from .poll import Poll
 from .rate_later import RateLater
 from .ratings import ContributorRating, ContributorRatingCriteriaScore
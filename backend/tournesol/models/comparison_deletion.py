@@ -0,0 +1,39 @@
+"""
+Deletions of comparisons per contributor and per poll.
+"""
+
+from django.db import models
+
+from core.models import User
+
+from .poll import Poll
+
+
+class ComparisonDeletion(models.Model):
+    """
+    The last time a contributor deleted one of their comparisons in a poll.
+
+    Used by the incremental ML runs to learn again the individual scores of
+    the contributors who deleted comparisons since the previous run, as the
+    deleted comparisons leave no trace in the remaining ones.
+    """
+
+    class Meta:
+        unique_together = ["poll", "user"]
+
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="comparison_deletions",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="comparison_deletions",
+    )
+    datetime_deleted = models.DateTimeField(
+        help_text="Time of the last deletion of a comparison of the user in the poll",
+    )
+
+    def __str__(self):
+        return f"{self.user} / {self.poll} ({self.datetime_deleted})"
@@ -235,11 +235,13 @@ class Entity(models.Model):
             update_fields=update_fields,
         )
 
-        # If "metadata" has changed, the indexed search_vector needs to be updated.
-        # This condition also avoids infinite loop when calling .save()
+        # If "metadata" has changed, the indexed search_vector and search tokens
+        # need to be updated. This condition also avoids infinite loop when
+        # calling .save()
         if (update_fields is None) or ("metadata" in update_fields):
             if self.type in ENTITY_TYPE_NAME_TO_CLASS:
                 self.entity_cls.update_search_vector(self)
+                self.entity_cls.update_search_tokens(self)
 
     def update_entity_poll_rating(self, poll):
         """
@@ -0,0 +1,46 @@
+"""
+Number of comparisons of an entity per contributor and per poll.
+"""
+
+from django.db import models
+
+from core.models import User
+
+from .entity import Entity
+from .poll import Poll
+
+
+class EntityPollContributor(models.Model):
+    """
+    The number of comparisons of an entity made by a contributor in a poll.
+
+    Used to maintain `EntityPollRating.n_contributors` incrementally: a
+    contributor is counted when their first comparison of the entity is
+    created, and uncounted when their last one is deleted.
+    """
+
+    class Meta:
+        unique_together = ["poll", "entity", "user"]
+
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="entity_contributors",
+    )
+    entity = models.ForeignKey(
+        Entity,
+        on_delete=models.CASCADE,
+        related_name="poll_contributors",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="entity_contributions",
+    )
+    n_comparisons = models.IntegerField(
+        default=0,
+        help_text="Number of comparisons of the entity made by the user in the poll",
+    )
+
+    def __str__(self):
+        return f"{self.user} / {self.entity} ({self.n_comparisons})"
@@ -1,16 +1,17 @@
 """
 Entity score and ratings per poll.
 """
-from typing import Optional
+from typing import Iterable, Optional
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
 from django.db.models.functions import Coalesce
 from django.utils.functional import cached_property
 
 from tournesol.models.comparisons import Comparison
 from tournesol.models.entity import Entity
+from tournesol.models.entity_poll_contributor import EntityPollContributor
 from tournesol.models.poll import Poll
 from tournesol.models.ratings import ContributorRating, ContributorRatingCriteriaScore
 
@@ -27,6 +28,85 @@ UNSAFE_REASONS = [
     UNSAFE_REASON_MODERATION_CONTRIBUTORS,
 ]
 
+# Counts the comparisons of each (entity, user) of a poll with a single grouped
+# query, and repairs the rows of `EntityPollContributor` which differ.
+RECONCILE_CONTRIBUTORS_SQL = """
+    WITH counts AS (
+        SELECT entity_id, user_id, count(*) AS n_comparisons
+        FROM (
+            SELECT entity_1_id AS entity_id, user_id
+            FROM tournesol_comparison WHERE poll_id = %(poll_id)s
+            UNION ALL
+            SELECT entity_2_id AS entity_id, user_id
+            FROM tournesol_comparison WHERE poll_id = %(poll_id)s
+        ) AS compared
+        GROUP BY entity_id, user_id
+    ),
+    deleted AS (
+        DELETE FROM tournesol_entitypollcontributor AS contributor
+        WHERE contributor.poll_id = %(poll_id)s
+        AND NOT EXISTS (
+            SELECT 1 FROM counts
+            WHERE counts.entity_id = contributor.entity_id
+            AND counts.user_id = contributor.user_id
+        )
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO tournesol_entitypollcontributor (poll_id, entity_id, user_id, n_comparisons)
+        SELECT %(poll_id)s, entity_id, user_id, n_comparisons FROM counts
+        ON CONFLICT (poll_id, entity_id, user_id) DO UPDATE
+        SET n_comparisons = EXCLUDED.n_comparisons
+        WHERE tournesol_entitypollcontributor.n_comparisons <> EXCLUDED.n_comparisons
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM deleted) + (SELECT count(*) FROM upserted)
+"""
+
+# Repairs the counters of `EntityPollRating` which differ from the totals
+# of `EntityPollContributor`.
+RECONCILE_N_RATINGS_SQL = """
+    WITH totals AS (
+        SELECT
+            rating.id,
+            coalesce(sum(contributor.n_comparisons), 0) AS n_comparisons,
+            count(contributor.id) AS n_contributors
+        FROM tournesol_entitypollrating AS rating
+        LEFT JOIN tournesol_entitypollcontributor AS contributor
+            ON contributor.poll_id = rating.poll_id
+            AND contributor.entity_id = rating.entity_id
+        WHERE rating.poll_id = %(poll_id)s
+        GROUP BY rating.id
+    )
+    UPDATE tournesol_entitypollrating AS rating
+    SET n_comparisons = totals.n_comparisons, n_contributors = totals.n_contributors
+    FROM totals
+    WHERE rating.id = totals.id
+    AND (rating.n_comparisons, rating.n_contributors)
+        IS DISTINCT FROM (totals.n_comparisons, totals.n_contributors)
+"""
+
+
+# Adds the trust score differences of the users to the sums of the entities
+# they rated, i.e. for which they have individual scores.
+APPLY_TRUST_SCORE_DELTAS_SQL = """
+    UPDATE tournesol_entitypollrating AS rating
+    SET sum_trust_scores = rating.sum_trust_scores + deltas.delta
+    FROM (
+        SELECT contributor.poll_id, contributor.entity_id, sum(changes.delta) AS delta
+        FROM unnest(%(user_ids)s::bigint[], %(deltas)s::double precision[])
+            AS changes (user_id, delta)
+        JOIN tournesol_contributorrating AS contributor
+            ON contributor.user_id = changes.user_id
+        WHERE EXISTS (
+            SELECT 1 FROM tournesol_contributorratingcriteriascore AS score
+            WHERE score.contributor_rating_id = contributor.id
+        )
+        GROUP BY contributor.poll_id, contributor.entity_id
+    ) AS deltas
+    WHERE rating.poll_id = deltas.poll_id AND rating.entity_id = deltas.entity_id
+"""
+
 
 class EntityPollRating(models.Model):
     """
@@ -93,15 +173,170 @@ class EntityPollRating(models.Model):
         self.save(update_fields=["n_comparisons", "n_contributors"])
 
     @staticmethod
-    def bulk_update_sum_trust_scores(poll: Poll, batch_size: Optional[int] = 4000):
+    def add_comparison_to_n_ratings(comparison: Comparison):
+        """
+        Count a created `comparison` in the `n_comparisons` and the
+        `n_contributors` of its entities, without recomputing them. The
+        counters of a created rating are initialized from the contributions
+        to its entity.
+
+        The ratings are updated in the order of their `entity_id`, like the
+        tournesol scores by ml_train, to prevent deadlocks.
+        """
+        for entity_id in sorted((comparison.entity_1_id, comparison.entity_2_id)):
+            contributor, first_comparison = EntityPollContributor.objects.get_or_create(
+                poll_id=comparison.poll_id,
+                entity_id=entity_id,
+                user_id=comparison.user_id,
+                defaults={"n_comparisons": 1},
+            )
+            if not first_comparison:
+                EntityPollContributor.objects.filter(pk=contributor.pk).update(
+                    n_comparisons=F("n_comparisons") + 1
+                )
+
+            rating, created = EntityPollRating.objects.get_or_create(
+                poll_id=comparison.poll_id, entity_id=entity_id
+            )
+            if created:
+                # The entity may have been compared before its rating existed
+                counts = EntityPollContributor.objects.filter(
+                    poll_id=comparison.poll_id, entity_id=entity_id
+                ).aggregate(
+                    n_comparisons=Coalesce(Sum("n_comparisons"), 0),
+                    n_contributors=Count("*"),
+                )
+                EntityPollRating.objects.filter(pk=rating.pk).update(**counts)
+                continue
+            EntityPollRating.objects.filter(pk=rating.pk).update(
+                n_comparisons=F("n_comparisons") + 1,
+                n_contributors=F("n_contributors") + int(first_comparison),
+            )
+
+    @staticmethod
+    def remove_comparison_from_n_ratings(comparison: Comparison):
+        """
+        Uncount a deleted `comparison` from the `n_comparisons` and the
+        `n_contributors` of its entities, without recomputing them.
+        """
+        for entity_id in sorted((comparison.entity_1_id, comparison.entity_2_id)):
+            contributors = EntityPollContributor.objects.filter(
+                poll_id=comparison.poll_id, entity_id=entity_id, user_id=comparison.user_id
+            )
+            if contributors.filter(n_comparisons__gt=1).update(
+                n_comparisons=F("n_comparisons") - 1
+            ):
+                last_comparison = False
+            else:
+                n_deleted, _ = contributors.delete()
+                if n_deleted == 0:
+                    # No contribution is left to uncount: the comparisons of
+                    # a deleted user are uncounted at once, by
+                    # `remove_user_from_n_ratings`, before their deletion.
+                    continue
+                last_comparison = True
+
+            EntityPollRating.objects.filter(
+                poll_id=comparison.poll_id, entity_id=entity_id
+            ).update(
+                n_comparisons=F("n_comparisons") - 1,
+                n_contributors=F("n_contributors") - int(last_comparison),
+            )
+
+    @staticmethod
+    def remove_user_from_n_ratings(user_id: int):
+        """
+        Uncount all the comparisons of a user being deleted from the
+        `n_comparisons` and the `n_contributors` of the compared entities,
+        with one grouped update.
+
+        The user's `EntityPollContributor` are deleted, so that the
+        comparisons deleted in cascade are not uncounted again.
+        """
+        contributions = EntityPollContributor.objects.filter(
+            user_id=user_id, poll_id=OuterRef("poll_id"), entity_id=OuterRef("entity_id")
+        )
+        with transaction.atomic():
+            EntityPollRating.objects.filter(Exists(contributions)).update(
+                n_comparisons=F("n_comparisons")
+                - Subquery(contributions.values("n_comparisons")[:1]),
+                n_contributors=F("n_contributors") - 1,
+            )
+            EntityPollContributor.objects.filter(user_id=user_id).delete()
+
+    @staticmethod
+    def reconcile_n_ratings(poll: Poll) -> tuple[int, int]:
+        """
+        Repair the `n_comparisons` and `n_contributors` of all entities of
+        `poll` which drifted from the comparisons, and create the missing
+        ratings of the compared entities.
+
+        Returns the number of repaired `EntityPollContributor` and
+        `EntityPollRating`.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(RECONCILE_CONTRIBUTORS_SQL, {"poll_id": poll.pk})
+            n_repaired_contributors = cursor.fetchone()[0]
+            EntityPollRating.objects.bulk_create(
+                [
+                    EntityPollRating(poll=poll, entity_id=entity_id)
+                    for entity_id in (
+                        EntityPollContributor.objects.filter(poll=poll)
+                        .exclude(
+                            Exists(
+                                EntityPollRating.objects.filter(
+                                    poll=poll, entity_id=OuterRef("entity_id")
+                                )
+                            )
+                        )
+                        .values_list("entity_id", flat=True)
+                        .distinct()
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+            cursor.execute(RECONCILE_N_RATINGS_SQL, {"poll_id": poll.pk})
+            n_repaired_ratings = cursor.rowcount
+        return n_repaired_contributors, n_repaired_ratings
+
+    @staticmethod
+    def bulk_update_sum_trust_scores(
+        poll: Poll,
+        batch_size: Optional[int] = 4000,
+        entity_ids: Optional[Iterable[int]] = None,
+    ):
+        """
+        Recompute the `sum_trust_scores` of the entities of `poll`, or only
+        of `entity_ids` when provided.
+        """
+        ep_ratings = EntityPollRating.objects.filter(poll=poll)
+        if entity_ids is not None:
+            ep_ratings = ep_ratings.filter(entity_id__in=list(entity_ids))
         if batch_size is None:
-            EntityPollRating._bulk_update_sum_trust_score(poll)
+            EntityPollRating._bulk_update_sum_trust_score(ep_ratings)
         else:
-            EntityPollRating._bulk_update_sum_trust_score_by_batch(poll, batch_size)
+            EntityPollRating._bulk_update_sum_trust_score_by_batch(ep_ratings, batch_size)
+
+    @staticmethod
+    def apply_trust_score_deltas(trust_score_deltas: dict[int, float]):
+        """
+        Add the changes of the trust scores of some users, mapping their ids
+        to the signed differences of their `trust_score`, to the
+        `sum_trust_scores` of the entities they rated, in all polls.
+
+        Only the ratings of these users are read, with a single UPDATE.
+        """
+        if not trust_score_deltas:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(APPLY_TRUST_SCORE_DELTAS_SQL, {
+                "user_ids": list(trust_score_deltas.keys()),
+                "deltas": list(trust_score_deltas.values()),
+            })
 
     @staticmethod
-    def _bulk_update_sum_trust_score(poll):
-        EntityPollRating.objects.filter(poll=poll).update(
+    def _bulk_update_sum_trust_score(ep_ratings):
+        ep_ratings.update(
             sum_trust_scores=Coalesce(
                 Subquery(
                     ContributorRating.objects.filter(
@@ -124,8 +359,8 @@ class EntityPollRating(models.Model):
         )
 
     @staticmethod
-    def _bulk_update_sum_trust_score_by_batch(poll, batch_size: int):
-        ep_ratings = list(EntityPollRating.objects.filter(poll=poll).filter(
+    def _bulk_update_sum_trust_score_by_batch(ep_ratings, batch_size: int):
+        ep_ratings = list(ep_ratings.filter(
             Exists(ContributorRatingCriteriaScore.objects.filter(
                 contributor_rating=OuterRef('entity__contributorvideoratings')
             )),
@@ -0,0 +1,83 @@
+"""
+Words of the entities' metadata, indexed for the search-as-you-type.
+"""
+
+import re
+import unicodedata
+from typing import Iterable
+
+from django.db import models, transaction
+from django.db.models.functions import Collate
+
+from .entity import Entity
+
+TOKEN_MAX_LENGTH = 64
+
+
+class EntitySearchToken(models.Model):
+    """
+    A normalized word of the metadata of an entity, such as its name, and
+    its weight in the relevance of the entities matching a search prefix.
+
+    The tokens are maintained by `EntityType.update_search_vector`, and
+    indexed to find the tokens starting with a prefix.
+    """
+
+    class Meta:
+        unique_together = ["entity", "token"]
+        indexes = [
+            # The "C" collation compares the tokens byte by byte, so that the
+            # same index finds the tokens starting with a prefix and sorts them.
+            models.Index(Collate("token", "C"), name="search_token_prefix_index"),
+        ]
+
+    entity = models.ForeignKey(
+        Entity,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(
+        max_length=TOKEN_MAX_LENGTH,
+        help_text="A lowercase word without accents",
+    )
+    weight = models.FloatField(
+        help_text="Weight of the metadata field containing the word, between 0 and 1",
+    )
+
+    def __str__(self):
+        return f"{self.entity} / {self.token}"
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        """
+        tokenize("Où est Charlie ?") -> ["ou", "est", "charlie"]
+        """
+        text = unicodedata.normalize("NFKD", text.casefold())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        return [token[:TOKEN_MAX_LENGTH] for token in re.findall(r"\w+", text)]
+
+    @classmethod
+    def from_texts(
+        cls, entity: Entity, texts: Iterable[tuple[str, float]]
+    ) -> list["EntitySearchToken"]:
+        """
+        Return the unsaved tokens of `entity` in the weighted `texts`.
+        A token appearing in several texts keeps its highest weight.
+        """
+        weights: dict[str, float] = {}
+        for text, weight in texts:
+            for token in cls.tokenize(text):
+                weights[token] = max(weight, weights.get(token, 0.0))
+        return [
+            cls(entity=entity, token=token, weight=weight)
+            for token, weight in weights.items()
+        ]
+
+    @classmethod
+    def replace_entity_tokens(cls, entity: Entity, texts: Iterable[tuple[str, float]]):
+        """
+        Replace the tokens of `entity` by the tokens of the weighted `texts`.
+        """
+        with transaction.atomic():
+            cls.objects.filter(entity=entity).delete()
+            cls.objects.bulk_create(cls.from_texts(entity, texts))
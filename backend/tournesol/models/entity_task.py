@@ -0,0 +1,177 @@
+"""
+Queue of the updates of entities to run in the background.
+"""
+
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import User
+
+from .entity import Entity
+from .poll import Poll
+
+
+class EntityTask(models.Model):
+    """
+    An update of an entity, queued to be run by the `run_entity_tasks`
+    command instead of within the request which triggered it.
+
+    A task is identified by its `key`: queuing a task already pending only
+    marks it as pending again, so that the repeated updates of the same
+    entity are run once.
+    """
+
+    REFRESH_METADATA = "refresh_metadata"
+    AUTO_REMOVE_RATE_LATER = "auto_remove_rate_later"
+    KIND_CHOICES = [
+        (REFRESH_METADATA, "Refresh metadata"),
+        (AUTO_REMOVE_RATE_LATER, "Auto remove from rate later"),
+    ]
+
+    # Failed tasks are retried after this delay, doubled at each attempt
+    RETRY_DELAY_SECONDS = 30
+
+    key = models.CharField(
+        max_length=128,
+        unique=True,
+        help_text="Identifies the task: kind, poll, entity and user",
+    )
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    entity = models.ForeignKey(
+        to=Entity,
+        on_delete=models.CASCADE,
+        related_name="tasks",
+    )
+    poll = models.ForeignKey(
+        to=Poll,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="entity_tasks",
+    )
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="entity_tasks",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    run_after = models.DateTimeField(
+        db_index=True,
+        help_text="The task is not run before this time, to gather repeated updates",
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Time at which a worker started to run the task. Reset when the task is"
+        " queued again meanwhile, so that the task is run again.",
+    )
+    attempts = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.key
+
+    @classmethod
+    def build(
+        cls,
+        kind: str,
+        entity_id: int,
+        poll: Optional[Poll] = None,
+        user: Optional[User] = None,
+    ) -> "EntityTask":
+        now = timezone.now()
+        key = ":".join(
+            str(part) for part in (kind, poll and poll.pk, entity_id, user and user.pk)
+        )
+        return cls(
+            key=key,
+            kind=kind,
+            entity_id=entity_id,
+            poll=poll,
+            user=user,
+            created_at=now,
+            run_after=now + timedelta(seconds=settings.ENTITY_TASKS_DELAY_SECONDS),
+        )
+
+    @classmethod
+    def build_comparison_tasks(cls, comparison) -> list["EntityTask"]:
+        """
+        Returns the tasks updating the entities of a created `comparison`.
+        """
+        tasks = []
+        for entity_id in (comparison.entity_1_id, comparison.entity_2_id):
+            tasks.append(cls.build(cls.REFRESH_METADATA, entity_id))
+            tasks.append(
+                cls.build(
+                    cls.AUTO_REMOVE_RATE_LATER,
+                    entity_id,
+                    poll=comparison.poll,
+                    user=comparison.user,
+                )
+            )
+        return tasks
+
+    @classmethod
+    def enqueue(cls, tasks: list["EntityTask"]):
+        """
+        Queues `tasks`. Tasks already pending keep their `run_after`, and
+        tasks being run are marked as pending again.
+        """
+        cls.objects.bulk_create(
+            tasks,
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["claimed_at"],
+        )
+
+    @classmethod
+    def claim(cls, limit: int) -> list["EntityTask"]:
+        """
+        Returns at most `limit` tasks to run, marked as claimed. Tasks
+        claimed for longer than `ENTITY_TASKS_CLAIM_TIMEOUT_SECONDS`, whose
+        worker probably stopped, can be claimed again.
+        """
+        now = timezone.now()
+        claim_timeout = timedelta(seconds=settings.ENTITY_TASKS_CLAIM_TIMEOUT_SECONDS)
+        with transaction.atomic():
+            tasks = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(run_after__lte=now)
+                .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - claim_timeout))
+                .order_by("run_after")[:limit]
+            )
+            for task in tasks:
+                task.claimed_at = now
+            cls.objects.bulk_update(tasks, fields=["claimed_at"])
+        return tasks
+
+    def complete(self):
+        """Removes the task, unless it has been queued again since it was claimed"""
+        EntityTask.objects.filter(pk=self.pk, claimed_at=self.claimed_at).delete()
+
+    def fail(self):
+        """Schedules the task to be retried later, or removes it after too many attempts"""
+        if self.attempts + 1 >= settings.ENTITY_TASKS_MAX_ATTEMPTS:
+            self.complete()
+            return
+        EntityTask.objects.filter(pk=self.pk, claimed_at=self.claimed_at).update(
+            attempts=self.attempts + 1,
+            claimed_at=None,
+            run_after=timezone.now() + timedelta(
+                seconds=self.RETRY_DELAY_SECONDS * 2 ** self.attempts
+            ),
+        )
+
+    def run(self):
+        if self.kind == EntityTask.REFRESH_METADATA:
+            self.entity.inner.refresh_metadata()
+        elif self.kind == EntityTask.AUTO_REMOVE_RATE_LATER:
+            self.entity.auto_remove_from_rate_later(poll=self.poll, user=self.user)
+        else:
+            raise ValueError(f"Unknown task kind {self.kind!r}")
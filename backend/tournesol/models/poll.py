@@ -36,6 +36,18 @@ class Poll(models.Model):
         help_text="On an inactive poll, entity scores are not updated"
         " and comparisons can't be created, updated or deleted by users.",
     )
+    ml_last_run_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Start time of the last ML run which updated the scores of all criteria."
+        " Used by incremental runs to find the comparisons edited since then.",
+    )
+    ml_scores_saved_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="End time of the last ML run, on any criteria."
+        " Used to reload the scores kept in memory by the recommendations.",
+    )
 
     def __str__(self) -> str:
         return f'Poll "{self.name}"'
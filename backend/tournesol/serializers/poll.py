@@ -147,3 +147,35 @@ class RecommendationsRandomFilterSerializer(serializers.Serializer):
     )
     date_lte = serializers.DateTimeField(default=None)
     date_gte = serializers.DateTimeField(default=None)
+    weighted = serializers.BooleanField(
+        default=False,
+        help_text="If true, entities with a higher tournesol score are more likely to be"
+        " returned.",
+    )
+
+
+class AutocompleteFilterSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200, help_text="The text typed by the user")
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=20)
+    unsafe = serializers.BooleanField(
+        default=False,
+        help_text="If true, entities considered as unsafe recommendations because of a"
+        " low score or due to too few contributions will be included.",
+    )
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    """
+    An entity matching the text typed by the user.
+    """
+    entity = RelatedEntitySerializer(source="*", read_only=True)
+    relevance = serializers.FloatField(read_only=True)
+    tournesol_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        fields = [
+            "entity",
+            "relevance",
+            "tournesol_score",
+        ]
+        read_only_fields = fields
@@ -1,7 +1,20 @@
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
-from tournesol.models import Comparison, ContributorRating
+from core.models import User
+from tournesol.lib.random_pool import clear_random_pools
+from tournesol.lib.score_matrix import loaded_score_matrices
+from tournesol.models import (
+    Comparison,
+    ComparisonDeletion,
+    ContributorRating,
+    Entity,
+    EntityPollRating,
+    Poll,
+)
+from tournesol.models.entity_context import EntityContext
 
 
 # pylint: disable=unused-argument
@@ -30,3 +43,94 @@ def initialize_ratings_on_comparison_creation(sender, instance, created, **kwarg
         entity_id=comparison.entity_2_id,
         defaults={"entity_seen": True},
     )
+
+
+@receiver(post_save, sender=Comparison)
+def count_created_comparison(sender, instance, created, **kwargs):
+    """
+    Update the number of comparisons and contributors of the compared
+    entities after each Comparison creation.
+    """
+    if created:
+        EntityPollRating.add_comparison_to_n_ratings(instance)
+
+
+@receiver(post_delete, sender=Comparison)
+def uncount_deleted_comparison(sender, instance, **kwargs):
+    """
+    Update the number of comparisons and contributors of the compared
+    entities after each Comparison deletion.
+    """
+    EntityPollRating.remove_comparison_from_n_ratings(instance)
+
+
+@receiver(post_delete, sender=Comparison)
+def record_comparison_deletion(sender, instance, origin=None, **kwargs):
+    """
+    Record the deletion of a comparison by its user, so that the next
+    incremental ML run learns the user's individual scores again.
+    """
+    deleted_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if deleted_model in (User, Poll):
+        # Deleted in cascade with the user or the poll
+        return
+    ComparisonDeletion.objects.update_or_create(
+        poll_id=instance.poll_id,
+        user_id=instance.user_id,
+        defaults={"datetime_deleted": timezone.now()},
+    )
+
+
+@receiver(pre_delete, sender=User)
+def uncount_deleted_user_comparisons(sender, instance, **kwargs):
+    """
+    Update the number of comparisons and contributors of the entities
+    compared by a user before the user's deletion.
+
+    The user's EntityPollContributor are deleted in cascade before the
+    post_delete signals of the user's comparisons, which can't uncount them
+    one by one.
+    """
+    EntityPollRating.remove_user_from_n_ratings(instance.pk)
+
+
+@receiver(post_save, sender=Entity)
+def update_filter_indexes_on_entity_save(sender, instance, **kwargs):
+    """
+    Update the metadata of the entity in the recommendation filter indexes
+    loaded by this process.
+    """
+    for matrix in loaded_score_matrices():
+        matrix.filter_index.update_entity(instance)
+
+
+@receiver(post_save, sender=EntityPollRating)
+def update_filter_indexes_on_rating_save(sender, instance, **kwargs):
+    """
+    Update the safety of the entity in the recommendation filter indexes of
+    the poll loaded by this process.
+    """
+    for matrix in loaded_score_matrices(instance.poll_id):
+        matrix.filter_index.update_safety([instance.entity_id])
+
+
+@receiver(post_save, sender=EntityContext)
+@receiver(post_delete, sender=EntityContext)
+def update_filter_indexes_on_context_change(sender, instance, **kwargs):
+    """
+    Update the safety of all entities in the recommendation filter indexes
+    of the poll loaded by this process, as contexts can mark entities as
+    unsafe.
+    """
+    for matrix in loaded_score_matrices(instance.poll_id):
+        matrix.filter_index.update_safety()
+
+
+@receiver(post_save, sender=EntityContext)
+@receiver(post_delete, sender=EntityContext)
+def clear_random_pools_on_context_change(sender, instance, **kwargs):
+    """
+    Clear the pool of random recommendations of the poll loaded by this
+    process, as contexts can mark entities as unsafe.
+    """
+    clear_random_pools(instance.poll_id)
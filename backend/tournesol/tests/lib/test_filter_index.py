@@ -0,0 +1,51 @@
+from datetime import date
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from tournesol.lib.filter_index import CategoricalColumn, CompressedBitmap, DateColumn
+
+
+class CompressedBitmapTestCase(SimpleTestCase):
+    def test_sparse_bitmap(self):
+        bitmap = CompressedBitmap.from_rows(100, [3, 50])
+        self.assertIsNotNone(bitmap._rows)
+
+        bitmap.set(10, True)
+        bitmap.set(50, False)
+        bitmap.set(60, False)
+        np.testing.assert_array_equal(np.flatnonzero(bitmap.to_mask()), [3, 10])
+
+    def test_dense_bitmap(self):
+        bitmap = CompressedBitmap.from_rows(100, range(0, 100, 2))
+        self.assertIsNotNone(bitmap._bits)
+
+        bitmap.set(1, True)
+        bitmap.set(2, False)
+        bitmap.set(99, True)
+        expected_rows = [0, 1, *range(4, 100, 2), 99]
+        np.testing.assert_array_equal(np.flatnonzero(bitmap.to_mask()), expected_rows)
+
+
+class CategoricalColumnTestCase(SimpleTestCase):
+    def test_set_updates_the_bitmaps(self):
+        column = CategoricalColumn(["en", "fr", None, "en"])
+        np.testing.assert_array_equal(np.flatnonzero(column.mask(["en"])), [0, 3])
+
+        column.set(0, "de")
+        column.set(2, "fr")
+        np.testing.assert_array_equal(np.flatnonzero(column.mask(["en"])), [3])
+        np.testing.assert_array_equal(np.flatnonzero(column.mask(["de", "fr"])), [0, 1, 2])
+        self.assertFalse(column.mask(["it"]).any())
+
+
+class DateColumnTestCase(SimpleTestCase):
+    def test_range_mask(self):
+        column = DateColumn(["2021-01-01", None, "2023-06-30"])
+        column.set(1, "2022-03-04T10:00:00Z")
+        np.testing.assert_array_equal(
+            column.range_mask(date_lte=None, date_gte=date(2022, 1, 1)), [False, True, True]
+        )
+        np.testing.assert_array_equal(
+            column.range_mask(date_lte=date(2022, 12, 31), date_gte=None), [True, True, False]
+        )
@@ -0,0 +1,27 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from tournesol.lib.random_pool import RandomCandidates
+
+
+class RandomCandidatesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_sample_returns_distinct_entities(self):
+        candidates = RandomCandidates(np.arange(1000), np.ones(1000))
+        for weighted in (False, True):
+            sample = candidates.sample(50, weighted, self.rng)
+            self.assertEqual(len(sample), 50)
+            self.assertEqual(len(set(sample.tolist())), 50)
+
+    def test_sample_returns_all_entities_if_not_enough(self):
+        candidates = RandomCandidates(np.arange(5), np.ones(5))
+        self.assertSetEqual(set(candidates.sample(10, True, self.rng).tolist()), set(range(5)))
+
+    def test_weighted_sample_favors_high_weights(self):
+        weights = np.ones(100)
+        weights[:10] = 1000
+        candidates = RandomCandidates(np.arange(100), weights)
+        sample = candidates.sample(10, True, self.rng)
+        self.assertGreaterEqual(np.count_nonzero(sample < 10), 8)
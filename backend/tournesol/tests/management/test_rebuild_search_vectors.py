@@ -0,0 +1,124 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from tournesol.entities.candidate import TYPE_CANDIDATE
+from tournesol.models import Entity
+from tournesol.tests.factories.entity import EntityFactory, VideoFactory
+
+
+class RebuildSearchVectorsMixin:
+    def create_entities(self):
+        self.videos = [
+            VideoFactory(metadata__language="fr", metadata__name="Les abeilles"),
+            VideoFactory(metadata__language="en", metadata__name="The bees"),
+            VideoFactory(metadata__language=None, metadata__name="Untitled"),
+            VideoFactory(metadata__language="xx", metadata__name="Unknown language"),
+        ]
+        self.candidate = EntityFactory(
+            type=TYPE_CANDIDATE,
+            uid="wd:Q0",
+            metadata={"name": "Une candidate", "frwiki_title": "Une candidate"},
+        )
+        self.expected_vectors = self.get_vectors()
+        Entity.objects.update(search_config_name="generic", search_vector=None)
+
+    @staticmethod
+    def get_vectors():
+        return {
+            entity_id: (search_config_name, search_vector)
+            for entity_id, search_config_name, search_vector in Entity.objects.values_list(
+                "id", "search_config_name", "search_vector"
+            )
+        }
+
+
+class RebuildSearchVectorsTestCase(RebuildSearchVectorsMixin, TestCase):
+    def setUp(self):
+        self.create_entities()
+
+    def test_vectors_are_rebuilt_like_after_a_save(self):
+        output = StringIO()
+        call_command("rebuild_search_vectors", "--chunk-size", "2", stdout=output)
+
+        self.assertEqual(self.get_vectors(), self.expected_vectors)
+        self.assertEqual(
+            [
+                self.expected_vectors[entity.id][0]
+                for entity in [*self.videos, self.candidate]
+            ],
+            [
+                "customized_french",
+                "customized_english",
+                "generic",
+                "generic",
+                "customized_french",
+            ],
+        )
+        self.assertIn(
+            f"{Entity.objects.count()} search vectors rebuilt", output.getvalue()
+        )
+
+    def test_rebuild_can_be_limited_to_an_entity_type(self):
+        call_command("rebuild_search_vectors", "--type", TYPE_CANDIDATE, stdout=StringIO())
+        self.assertEqual(
+            set(Entity.objects.filter(search_vector__isnull=False).values_list("type", flat=True)),
+            {TYPE_CANDIDATE},
+        )
+        self.assertEqual(
+            self.get_vectors()[self.candidate.id], self.expected_vectors[self.candidate.id]
+        )
+
+    def test_rebuild_is_resumed_from_the_progress_file(self):
+        entity_ids = sorted(self.expected_vectors)
+        first_id = entity_ids[0]
+        n_chunks = (entity_ids[-1] - first_id) // 2 + 1
+        with TemporaryDirectory() as directory:
+            progress_file = Path(directory) / "progress.json"
+            progress_file.write_text(json.dumps({"chunk_size": 2, "done": [first_id]}))
+            output = StringIO()
+            call_command(
+                "rebuild_search_vectors",
+                "--chunk-size", "2",
+                "--progress-file", str(progress_file),
+                stdout=output,
+            )
+            self.assertIn(
+                f"Rebuilding {n_chunks - 1} chunks of 2 ids (1 chunks already rebuilt)",
+                output.getvalue(),
+            )
+            self.assertEqual(
+                json.loads(progress_file.read_text()),
+                {"chunk_size": 2, "done": list(range(first_id, entity_ids[-1] + 1, 2))},
+            )
+
+            with self.assertRaises(CommandError):
+                call_command(
+                    "rebuild_search_vectors",
+                    "--chunk-size", "3",
+                    "--progress-file", str(progress_file),
+                    stdout=StringIO(),
+                )
+
+        vectors = self.get_vectors()
+        for entity_id in entity_ids:
+            if entity_id < first_id + 2:
+                self.assertIsNone(vectors[entity_id][1])
+            else:
+                self.assertEqual(vectors[entity_id], self.expected_vectors[entity_id])
+
+
+class RebuildSearchVectorsConcurrentlyTestCase(RebuildSearchVectorsMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_entities()
+
+    def test_chunks_are_rebuilt_by_several_workers(self):
+        call_command(
+            "rebuild_search_vectors", "--chunk-size", "1", "--workers", "3", stdout=StringIO()
+        )
+        self.assertEqual(self.get_vectors(), self.expected_vectors)
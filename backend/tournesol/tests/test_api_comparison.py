@@ -1,8 +1,9 @@
 import datetime
 from copy import deepcopy
-from unittest import skip
 from unittest.mock import patch
 
+import numpy as np
+from django.apps import apps
 from django.core.management import call_command
 from django.db.models import ObjectDoesNotExist, Q
 from django.test import TestCase, TransactionTestCase, override_settings
@@ -12,11 +13,13 @@ from rest_framework.test import APIClient
 
 from core.tests.factories.user import UserFactory
 from core.utils.time import time_ago, time_ahead
+from ml.online_updates import get_online_pipeline
 from tournesol.models import (
     Comparison,
     ComparisonCriteriaScore,
     ContributorRating,
     ContributorRatingCriteriaScore,
+    ContributorScaling,
     Entity,
     EntityCriteriaScore,
     EntityPollRating,
@@ -1382,6 +1385,8 @@ class ComparisonApiTestCase(TestCase):
 
 
 class ComparisonWithMehestanTest(TransactionTestCase):
+    serialized_rollback = True
+
     def setUp(self):
         self.poll = PollFactory(algorithm=ALGORITHM_MEHESTAN)
         CriteriaRankFactory(poll=self.poll, criteria__name="criteria1")
@@ -1406,7 +1411,6 @@ class ComparisonWithMehestanTest(TransactionTestCase):
 
         self.client = APIClient()
 
-    @skip("Online updates not implemented in Solidago")
     @override_settings(
         UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
         MEHESTAN_MULTIPROCESSING=False,
@@ -1457,6 +1461,83 @@ class ComparisonWithMehestanTest(TransactionTestCase):
         self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 6)
         self.assertEqual(EntityCriteriaScore.objects.filter(score_mode="default").count(), 4)
 
+    @override_settings(
+        UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
+        MEHESTAN_MULTIPROCESSING=False,
+    )
+    def test_online_updates_apply_the_user_scaling(self):
+        call_command("ml_train")
+        user1_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=self.user1
+        )
+        self.assertEqual(user1_scores.count(), 4)
+
+        self.client.force_authenticate(self.user1)
+        resp = self.client.post(
+            f"/users/me/comparisons/{self.poll.name}",
+            data={
+                "entity_a": {"uid": self.entities[1].uid},
+                "entity_b": {"uid": self.entities[2].uid},
+                "criteria_scores": [{"criteria": "criteria1", "score": 5, "score_max": 10}],
+            },
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(user1_scores.filter(criteria="criteria1").count(), 3)
+        self.assertEqual(user1_scores.filter(criteria="criteria2").count(), 2)
+
+        # Individual scores are the raw scores, scaled by the last ML run and squashed
+        scaling = ContributorScaling.objects.get(user=self.user1, criteria="criteria1")
+        for user_score in user1_scores.filter(criteria="criteria1"):
+            scaled_score = scaling.scale * user_score.raw_score + scaling.translation
+            self.assertAlmostEqual(
+                user_score.score, 100 * scaled_score / np.sqrt(1 + scaled_score ** 2)
+            )
+
+        # Deleting a comparison removes the scores which are no longer compared
+        resp = self.client.delete(
+            f"/users/me/comparisons/{self.poll.name}"
+            f"/{self.entities[0].uid}/{self.entities[1].uid}/"
+        )
+        self.assertEqual(resp.status_code, 204, resp.content)
+        self.assertEqual(
+            set(user1_scores.values_list("criteria", "contributor_rating__entity")),
+            {("criteria1", self.entities[1].pk), ("criteria1", self.entities[2].pk)},
+        )
+
+    @override_settings(
+        UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
+        MEHESTAN_MULTIPROCESSING=False,
+    )
+    def test_online_updates_reuse_the_same_pipeline(self):
+        call_command("ml_train")
+        pipeline = get_online_pipeline()
+
+        self.client.force_authenticate(self.user2)
+        for entity in self.entities[1:]:
+            resp = self.client.post(
+                f"/users/me/comparisons/{self.poll.name}",
+                data={
+                    "entity_a": {"uid": self.entities[0].uid},
+                    "entity_b": {"uid": entity.uid},
+                    "criteria_scores": [{"criteria": "criteria1", "score": 3, "score_max": 10}],
+                },
+                format="json",
+            )
+            self.assertEqual(resp.status_code, 201, resp.content)
+            self.assertIs(get_online_pipeline(), pipeline)
+
+    def test_online_pipeline_is_built_at_startup(self):
+        ml_config = apps.get_app_config("ml")
+        with patch("ml.online_updates.get_online_pipeline") as get_pipeline:
+            with override_settings(UPDATE_MEHESTAN_SCORES_ON_COMPARISON=False):
+                ml_config.ready()
+            get_pipeline.assert_not_called()
+
+            with override_settings(UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True):
+                ml_config.ready()
+            get_pipeline.assert_called_once_with()
+
 
 class ComparisonApiWithInactivePoll(TestCase):
     def setUp(self):
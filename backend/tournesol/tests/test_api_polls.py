@@ -7,6 +7,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import User
+from tournesol.lib.score_matrix import clear_score_matrices
 from tournesol.models import Poll
 from tournesol.models.entity_context import EntityContext, EntityContextLocale
 from tournesol.tests.factories.comparison import ComparisonFactory
@@ -668,6 +669,74 @@ class PollsRecommendationsTestCase(TestCase):
         self.assertEqual(response.data["results"][1]["entity"]["uid"], self.video_2.uid)
 
 
+@override_settings(RECOMMENDATIONS_SCORE_MATRIX=True)
+class PollsRecommendationsWithScoreMatrixTestCase(PollsRecommendationsTestCase):
+    """
+    TestCase of the PollsRecommendationsView API, with the recommendations
+    ranked by the in-memory matrix of the criteria scores.
+    """
+
+    def setUp(self):
+        super().setUp()
+        clear_score_matrices()
+
+    def test_matrix_is_loaded_again_after_ml_train(self):
+        response = self.client.get("/polls/videos/recommendations/?unsafe=true")
+        self.assertEqual(response.data["count"], 4)
+
+        video_5 = VideoFactory(tournesol_score=55, make_safe_for_poll=False)
+        VideoCriteriaScoreFactory(entity=video_5, criteria="importance", score=0.5)
+        cache.clear()
+        response = self.client.get("/polls/videos/recommendations/?unsafe=true")
+        self.assertEqual(response.data["count"], 4)
+
+        self.poll.ml_scores_saved_at = timezone.now()
+        self.poll.save(update_fields=["ml_scores_saved_at"])
+        cache.clear()
+        response = self.client.get("/polls/videos/recommendations/?unsafe=true")
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(response.data["results"][0]["entity"]["uid"], video_5.uid)
+
+    def test_filter_index_is_updated_with_the_entities(self):
+        response = self.client.get("/polls/videos/recommendations/?metadata[language]=fr")
+        self.assertEqual(
+            [result["entity"]["uid"] for result in response.data["results"]],
+            [self.video_2.uid],
+        )
+
+        self.video_3.metadata["language"] = "fr"
+        self.video_3.save()
+        cache.clear()
+        response = self.client.get("/polls/videos/recommendations/?metadata[language]=fr")
+        self.assertEqual(
+            [result["entity"]["uid"] for result in response.data["results"]],
+            [self.video_3.uid, self.video_2.uid],
+        )
+
+        rating = self.video_3.all_poll_ratings.get(poll=self.poll)
+        rating.tournesol_score = 10
+        rating.save()
+        cache.clear()
+        response = self.client.get("/polls/videos/recommendations/?metadata[language]=fr")
+        self.assertEqual(
+            [result["entity"]["uid"] for result in response.data["results"]],
+            [self.video_2.uid],
+        )
+
+    def test_equal_total_scores_are_sorted_by_decreasing_id(self):
+        videos = [VideoFactory(tournesol_score=50) for _ in range(5)]
+        for video in videos:
+            VideoCriteriaScoreFactory(entity=video, criteria="importance", score=1.0)
+
+        uids = []
+        for offset in range(5):
+            response = self.client.get(
+                f"/polls/videos/recommendations/?weights[importance]=10&limit=1&offset={offset}"
+            )
+            uids.extend(result["entity"]["uid"] for result in response.data["results"])
+        self.assertEqual(uids, [video.uid for video in reversed(videos)])
+
+
 class PollsRecommendationsFilterRatedEntitiesTestCase(TestCase):
     """
     TestCase of the PollsRecommendationsView API.
@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tournesol.models import EntitySearchToken
+from tournesol.tests.factories.entity import VideoFactory
+
+
+class PollsAutocompleteTestCase(TestCase):
+    """
+    TestCase of the PollsAutocompleteView view.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url_path = "/polls/videos/autocomplete/"
+
+        self.video_science = VideoFactory(
+            metadata__name="The science of sleep",
+            metadata__uploader="Kurzgesagt - In a Nutshell",
+            metadata__tags=["biology"],
+            tournesol_score=30,
+        )
+        self.video_scientific = VideoFactory(
+            metadata__name="The scientific method",
+            metadata__uploader="Science Etonnante",
+            metadata__tags=[],
+            tournesol_score=60,
+        )
+        self.video_unsafe = VideoFactory(
+            metadata__name="Science fiction",
+            metadata__uploader="unsafe",
+            metadata__tags=[],
+            tournesol_score=-10,
+            make_safe_for_poll=False,
+        )
+
+    def get_uids(self, query: str) -> list[str]:
+        response = self.client.get(self.url_path, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result["entity"]["uid"] for result in response.data]
+
+    def test_anon_can_list_entities_matching_a_prefix(self):
+        response = self.client.get(self.url_path, {"q": "sci"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["entity"]["uid"] for result in response.data],
+            [self.video_scientific.uid, self.video_science.uid],
+        )
+        self.assertEqual(response.data[0]["tournesol_score"], 60)
+        self.assertEqual(response.data[0]["relevance"], 0.5)
+
+    def test_exact_words_are_more_relevant(self):
+        self.assertEqual(
+            self.get_uids("science"),
+            [self.video_science.uid, self.video_scientific.uid],
+        )
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.get_uids("sci sleep"), [self.video_science.uid])
+        self.assertEqual(self.get_uids("sci unknown"), [])
+
+    def test_uploaders_and_tags_are_searched(self):
+        self.assertEqual(self.get_uids("kurzg"), [self.video_science.uid])
+        self.assertEqual(self.get_uids("etonn"), [self.video_scientific.uid])
+        self.assertEqual(self.get_uids("biolog"), [self.video_science.uid])
+
+    def test_unsafe_entities_are_excluded_by_default(self):
+        self.assertNotIn(self.video_unsafe.uid, self.get_uids("fiction"))
+
+        response = self.client.get(self.url_path, {"q": "fiction", "unsafe": "true"})
+        self.assertEqual(response.data[0]["entity"]["uid"], self.video_unsafe.uid)
+
+    def test_short_words_match_identical_tokens_only(self):
+        self.assertEqual(self.get_uids("s"), [])
+        self.assertEqual(self.get_uids("of"), [self.video_science.uid])
+
+    def test_search_tokens_are_updated_with_the_metadata(self):
+        self.video_science.metadata["name"] = "A new name"
+        self.video_science.save(update_fields=["metadata"])
+
+        self.assertEqual(self.get_uids("sleep"), [])
+        self.assertEqual(self.get_uids("new"), [self.video_science.uid])
+        self.assertEqual(
+            EntitySearchToken.objects.get(entity=self.video_science, token="nutshell").weight,
+            0.8,
+        )
+
+    def test_candidates_are_limited(self):
+        with patch("tournesol.lib.autocomplete.MAX_CANDIDATES", 1):
+            self.assertEqual(len(self.get_uids("scie")), 1)
+            self.assertEqual(self.get_uids("scientifi"), [self.video_scientific.uid])
+            self.assertEqual(self.get_uids("scie method"), [self.video_scientific.uid])
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url_path)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url_path, {"q": "sci", "limit": 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get("/polls/unknown/autocomplete/", {"q": "sci"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_benchmark_command(self):
+        output = StringIO()
+        call_command("benchmark_autocomplete", "--entities", "2", stdout=output)
+        self.assertIn("2 entity names typed", output.getvalue())
+        self.assertIn("search-as-you-type: 2/2", output.getvalue())
+
+
+class EntitySearchTokenTestCase(SimpleTestCase):
+    def test_tokenize(self):
+        self.assertEqual(
+            EntitySearchToken.tokenize("Où est Charlie ? L'ÉCOLE_42"),
+            ["ou", "est", "charlie", "l", "ecole_42"],
+        )
+        self.assertEqual(EntitySearchToken.tokenize(" - "), [])
@@ -1,9 +1,11 @@
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from tournesol.lib.random_pool import clear_random_pools
 from tournesol.models import Poll
+from tournesol.models.entity_context import EntityContext
 from tournesol.tests.factories.entity import VideoFactory
 
 
@@ -13,6 +15,7 @@ class RandomRecommendationTestCase(TestCase):
     """
 
     def setUp(self):
+        clear_random_pools()
         self.client = APIClient()
         self.poll = Poll.default_poll()
         self.url_path = "/polls/videos/recommendations/random/"
@@ -189,3 +192,92 @@ class RandomRecommendationTestCase(TestCase):
         self.assertIn(self.video_2.uid, uids)
         self.assertIn(self.video_3.uid, uids)
         self.assertIn(self.video_4.uid, uids)
+
+    def test_anon_can_list_videos_filtered_by_language(self):
+        resp = self.client.get(f"{self.url_path}?metadata[language]=fr")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["count"], 1)
+        self.assertEqual(resp.data["results"][0]["entity"]["uid"], self.video_2.uid)
+
+        resp = self.client.get(f"{self.url_path}?metadata[language]=fr&metadata[language]=it")
+        uids = [res["entity"]["uid"] for res in resp.data["results"]]
+        self.assertEqual(resp.data["count"], 2)
+        self.assertSetEqual(set(uids), {self.video_2.uid, self.video_4.uid})
+
+        # The unsafe entities are never returned
+        resp = self.client.get(f"{self.url_path}?metadata[language]=es")
+        self.assertEqual(resp.data["count"], 0)
+        self.assertEqual(resp.data["results"], [])
+
+    def test_anon_can_list_videos_filtered_by_pub_date_and_language(self):
+        resp = self.client.get(
+            f"{self.url_path}?date_gte=2021-01-03&metadata[language]=fr&metadata[language]=pt"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["count"], 1)
+        self.assertEqual(resp.data["results"][0]["entity"]["uid"], self.video_3.uid)
+
+        resp = self.client.get(
+            f"{self.url_path}?date_lte=2021-01-03&date_gte=2021-01-01&metadata[language]=fr"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["count"], 1)
+        self.assertEqual(resp.data["results"][0]["entity"]["uid"], self.video_2.uid)
+
+        # The unsafe entities are never returned
+        resp = self.client.get(f"{self.url_path}?date_lte=2021-01-03&metadata[language]=es")
+        self.assertEqual(resp.data["count"], 0)
+
+        # The date filters are combined with the filters evaluated by the database
+        resp = self.client.get(
+            f"{self.url_path}?date_gte=2021-01-03&metadata[language]=pt"
+            "&metadata[uploader]=_test_uploader_2"
+        )
+        self.assertEqual(resp.data["count"], 1)
+        self.assertEqual(resp.data["results"][0]["entity"]["uid"], self.video_3.uid)
+
+    def test_anon_can_list_weighted_by_score(self):
+        other_poll = Poll.objects.create(name="other")
+        other_path = "/polls/other/recommendations/random/"
+        videos = [
+            VideoFactory(
+                tournesol_score=settings.RECOMMENDATIONS_MIN_TOURNESOL_SCORE + 1 + i,
+                make_safe_for_poll=other_poll,
+            )
+            for i in range(20)
+        ]
+
+        resp = self.client.get(f"{other_path}?weighted=true&limit=5")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["count"], 20)
+        uids = [res["entity"]["uid"] for res in resp.data["results"]]
+        self.assertEqual(len(set(uids)), 5)
+        self.assertTrue(set(uids).issubset({video.uid for video in videos}))
+
+    def test_unsafe_context_is_taken_into_account(self):
+        resp = self.client.get(self.url_path)
+        self.assertEqual(resp.data["count"], 3)
+
+        EntityContext.objects.create(
+            name="context_video2_unsafe",
+            origin=EntityContext.ASSOCIATION,
+            predicate={"video_id": self.video_2.metadata["video_id"]},
+            unsafe=True,
+            enabled=True,
+            poll=self.poll,
+        )
+        resp = self.client.get(f"{self.url_path}?bundle=1")
+        uids = [res["entity"]["uid"] for res in resp.data["results"]]
+        self.assertEqual(resp.data["count"], 2)
+        self.assertNotIn(self.video_2.uid, uids)
+
+    @override_settings(RECOMMENDATIONS_RANDOM_POOL_MAX_AGE_SECONDS=0)
+    def test_new_safe_entities_are_listed_after_max_age(self):
+        resp = self.client.get(self.url_path)
+        self.assertEqual(resp.data["count"], 3)
+
+        video_5 = VideoFactory(tournesol_score=55)
+        resp = self.client.get(f"{self.url_path}?bundle=1&limit=10")
+        uids = [res["entity"]["uid"] for res in resp.data["results"]]
+        self.assertEqual(resp.data["count"], 4)
+        self.assertIn(video_5.uid, uids)
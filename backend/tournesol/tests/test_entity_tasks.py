@@ -0,0 +1,162 @@
+"""
+All test cases of the `EntityTask` queue, and of the command `run_entity_tasks`.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.tests.factories.user import UserFactory
+from tournesol.metrics import EntityTasksCollector
+from tournesol.models import EntityPollRating, EntityTask, Poll, RateLater
+from tournesol.tests.factories.comparison import ComparisonFactory
+from tournesol.tests.factories.entity import VideoFactory
+
+
+@override_settings(YOUTUBE_API_KEY=None, ENTITY_TASKS_DELAY_SECONDS=0)
+class EntityTaskTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.default_poll()
+        self.user = UserFactory()
+        self.comparison = ComparisonFactory(poll=self.poll, user=self.user)
+
+    def test_enqueue_coalesces_pending_tasks(self):
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        run_after = EntityTask.objects.values_list("run_after", flat=True).first()
+
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        self.assertEqual(EntityTask.objects.count(), 4)
+        self.assertTrue(EntityTask.objects.filter(run_after=run_after).exists())
+
+        # The metadata of an entity are refreshed once, whatever the poll and the user.
+        other_comparison = ComparisonFactory(
+            poll=self.poll, entity_1=self.comparison.entity_1
+        )
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(other_comparison))
+        self.assertEqual(
+            EntityTask.objects.filter(
+                kind=EntityTask.REFRESH_METADATA, entity=self.comparison.entity_1
+            ).count(),
+            1,
+        )
+
+    def test_run_entity_tasks(self):
+        RateLater.objects.create(
+            poll=self.poll, user=self.user, entity=self.comparison.entity_1
+        )
+        self.user.settings = {self.poll.name: {"rate_later__auto_remove": 1}}
+        self.user.save()
+
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        call_command("run_entity_tasks", "--once")
+
+        self.assertEqual(EntityTask.objects.count(), 0)
+        self.assertFalse(RateLater.objects.filter(user=self.user).exists())
+
+    @override_settings(ENTITY_TASKS_DELAY_SECONDS=60)
+    def test_tasks_are_not_run_before_the_delay(self):
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        call_command("run_entity_tasks", "--once")
+        self.assertEqual(EntityTask.objects.count(), 4)
+
+    def test_task_queued_again_while_running_is_kept(self):
+        task = EntityTask.build(
+            EntityTask.AUTO_REMOVE_RATE_LATER,
+            self.comparison.entity_1_id,
+            poll=self.poll,
+            user=self.user,
+        )
+        EntityTask.enqueue([task])
+        [claimed] = EntityTask.claim(limit=10)
+        self.assertEqual(EntityTask.claim(limit=10), [])
+
+        EntityTask.enqueue([
+            EntityTask.build(
+                EntityTask.AUTO_REMOVE_RATE_LATER,
+                self.comparison.entity_1_id,
+                poll=self.poll,
+                user=self.user,
+            )
+        ])
+        claimed.run()
+        claimed.complete()
+
+        self.assertEqual(EntityTask.objects.count(), 1)
+        self.assertEqual(len(EntityTask.claim(limit=10)), 1)
+
+    @override_settings(ENTITY_TASKS_CLAIM_TIMEOUT_SECONDS=60)
+    def test_tasks_claimed_for_too_long_are_claimed_again(self):
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        self.assertEqual(len(EntityTask.claim(limit=10)), 4)
+        EntityTask.objects.update(claimed_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(len(EntityTask.claim(limit=10)), 4)
+
+    @override_settings(ENTITY_TASKS_MAX_ATTEMPTS=2)
+    def test_failed_tasks_are_retried(self):
+        EntityTask.enqueue([
+            EntityTask.build(
+                EntityTask.AUTO_REMOVE_RATE_LATER,
+                self.comparison.entity_1_id,
+                poll=self.poll,
+                user=self.user,
+            )
+        ])
+        with patch(
+            "tournesol.models.Entity.auto_remove_from_rate_later", side_effect=ValueError
+        ):
+            call_command("run_entity_tasks", "--once")
+            task = EntityTask.objects.get()
+            self.assertEqual(task.attempts, 1)
+            self.assertIsNone(task.claimed_at)
+            self.assertGreater(task.run_after, timezone.now())
+
+            EntityTask.objects.update(run_after=timezone.now())
+            call_command("run_entity_tasks", "--once")
+            self.assertFalse(EntityTask.objects.exists())
+
+    def test_metrics(self):
+        EntityTask.enqueue(EntityTask.build_comparison_tasks(self.comparison))
+        EntityTask.objects.update(run_after=timezone.now() - timedelta(seconds=30))
+
+        depth, lag = EntityTasksCollector().collect()
+        self.assertEqual(
+            {sample.labels["kind"]: sample.value for sample in depth.samples},
+            {
+                EntityTask.REFRESH_METADATA: 2,
+                EntityTask.AUTO_REMOVE_RATE_LATER: 2,
+            },
+        )
+        self.assertGreaterEqual(lag.samples[0].value, 30)
+
+
+@override_settings(COMPARISON_SIDE_EFFECTS_ASYNC=True, YOUTUBE_API_KEY=None)
+class ComparisonSideEffectsAsyncTestCase(TestCase):
+    def test_creating_comparison_queues_the_entity_updates(self):
+        user = UserFactory()
+        video_1, video_2 = VideoFactory.create_batch(2)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(
+            "/users/me/comparisons/videos",
+            {
+                "entity_a": {"uid": video_1.uid},
+                "entity_b": {"uid": video_2.uid},
+                "criteria_scores": [
+                    {"criteria": "largely_recommended", "score": 10, "score_max": 10}
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(EntityTask.objects.count(), 4)
+        # The counters are updated with the comparison.
+        self.assertEqual(EntityPollRating.objects.get(entity=video_1).n_comparisons, 1)
+
+        EntityTask.objects.update(run_after=timezone.now())
+        call_command("run_entity_tasks", "--once")
+        self.assertFalse(EntityTask.objects.exists())
@@ -0,0 +1,135 @@
+"""
+Test cases of the inputs read by "ml_train".
+"""
+
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import EmailDomain
+from core.tests.factories.user import UserFactory
+from ml.inputs import MlInputFromDb, MlInputFromSnapshot
+from tournesol.models import (
+    Comparison,
+    ComparisonCriteriaScore,
+    ContributorRating,
+    ContributorRatingCriteriaScore,
+)
+from vouch.models import Voucher
+
+from .factories.comparison import ComparisonCriteriaScoreFactory, ComparisonFactory
+
+
+class MlInputFromSnapshotTestCase(TestCase):
+    def setUp(self):
+        EmailDomain.objects.create(domain="@verified.test", status=EmailDomain.STATUS_ACCEPTED)
+        self.user1 = UserFactory(email="user1@verified.test")
+        self.user2 = UserFactory(email="user2@example.test")
+        self.inactive_user = UserFactory(is_active=False)
+        Voucher.objects.create(by=self.user1, to=self.user2, value=1.0)
+
+        for user in [self.user1, self.user2, self.inactive_user]:
+            for comparison in ComparisonFactory.create_batch(3, user=user):
+                for criterion in ["reliability", "importance"]:
+                    ComparisonCriteriaScoreFactory(
+                        comparison=comparison, criteria=criterion, score=2.5, weight=0.5,
+                    )
+        self.last_run_started_at = timezone.now() - timedelta(hours=1)
+        Comparison.objects.filter(user=self.user1).update(
+            datetime_lastedit=timezone.now() - timedelta(days=1)
+        )
+
+        rating = ContributorRating.objects.filter(user=self.user2).first()
+        rating.is_public = False
+        rating.save(update_fields=["is_public"])
+        ContributorRatingCriteriaScore.objects.create(
+            contributor_rating=rating, criteria="reliability", raw_score=1.5, raw_uncertainty=0.5,
+        )
+
+    @staticmethod
+    def sorted_frame(dtf: pd.DataFrame) -> pd.DataFrame:
+        dtf = dtf.reset_index(drop=dtf.index.name is None)
+        # The categories of the criteria depend on the source and on the filters
+        dtf = dtf.astype({
+            column: object for column, dtype in dtf.dtypes.items() if dtype == "category"
+        })
+        return dtf.sort_values(list(dtf.columns)).reset_index(drop=True)
+
+    def assert_same_inputs(self, db_input: MlInputFromDb, snapshot_input: MlInputFromSnapshot):
+        for criterion in [None, "reliability", "importance", "largely_recommended"]:
+            pd.testing.assert_frame_equal(
+                self.sorted_frame(snapshot_input.get_comparisons(criterion=criterion)),
+                self.sorted_frame(db_input.get_comparisons(criterion=criterion)),
+                check_dtype=False,
+            )
+            pd.testing.assert_frame_equal(
+                self.sorted_frame(snapshot_input.get_individual_scores(criterion=criterion)),
+                self.sorted_frame(db_input.get_individual_scores(criterion=criterion)),
+                check_dtype=False,
+            )
+            db_new_comparisons = db_input.get_new_comparisons(criterion=criterion)
+            snapshot_new_comparisons = snapshot_input.get_new_comparisons(criterion=criterion)
+            if db_new_comparisons is None:
+                self.assertIsNone(snapshot_new_comparisons)
+            else:
+                pd.testing.assert_frame_equal(
+                    self.sorted_frame(snapshot_new_comparisons),
+                    self.sorted_frame(db_new_comparisons),
+                    check_dtype=False,
+                )
+
+        pd.testing.assert_frame_equal(
+            self.sorted_frame(snapshot_input.get_comparisons(user_id=self.user1.id)),
+            self.sorted_frame(db_input.get_comparisons(user_id=self.user1.id)),
+        )
+        pd.testing.assert_frame_equal(
+            self.sorted_frame(snapshot_input.ratings_properties),
+            self.sorted_frame(db_input.ratings_properties),
+        )
+        pd.testing.assert_frame_equal(
+            self.sorted_frame(snapshot_input.get_users()),
+            self.sorted_frame(db_input.get_users().astype({"trust_score": float})),
+            check_dtype=False,
+        )
+        pd.testing.assert_frame_equal(
+            self.sorted_frame(snapshot_input.get_vouches()),
+            self.sorted_frame(db_input.get_vouches()),
+            check_dtype=False,
+        )
+
+    def test_snapshot_matches_db_input(self):
+        for last_run_started_at in [None, self.last_run_started_at]:
+            db_input = MlInputFromDb(
+                poll_name="videos", last_run_started_at=last_run_started_at
+            )
+            with tempfile.TemporaryDirectory() as directory:
+                self.assert_same_inputs(db_input, db_input.save_snapshot(directory))
+
+    def test_comparisons_are_read_by_chunks(self):
+        db_input = MlInputFromDb(poll_name="videos")
+        comparisons = db_input.get_comparisons()
+        with patch("ml.inputs.QUERY_CHUNK_SIZE", 5):
+            chunked_comparisons = db_input.get_comparisons()
+        self.assertEqual(len(chunked_comparisons), 12)
+        pd.testing.assert_frame_equal(
+            self.sorted_frame(chunked_comparisons), self.sorted_frame(comparisons)
+        )
+        self.assertEqual(
+            list(chunked_comparisons["criterion"].cat.categories), ["importance", "reliability"]
+        )
+
+    def test_snapshot_of_empty_poll(self):
+        db_input = MlInputFromDb(poll_name="videos")
+        ComparisonCriteriaScore.objects.all().delete()
+        ContributorRatingCriteriaScore.objects.all().delete()
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_input = db_input.save_snapshot(directory)
+            self.assertEqual(len(snapshot_input.get_comparisons(criterion="reliability")), 0)
+            self.assertEqual(len(snapshot_input.get_individual_scores()), 0)
+            self.assertEqual(list(snapshot_input.get_comparisons().columns), [
+                "user_id", "entity_a", "entity_b", "criterion", "score", "score_max", "weight",
+            ])
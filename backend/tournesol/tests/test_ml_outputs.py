@@ -0,0 +1,279 @@
+"""
+Test cases of the outputs written by "ml_train".
+"""
+
+import pandas as pd
+from django.test import TestCase
+
+from core.models import User
+from core.tests.factories.user import UserFactory
+from ml.outputs import ScoresSaveOptions, TournesolPollOutput, save_tournesol_scores
+from tournesol.models import (
+    ContributorRating,
+    ContributorRatingCriteriaScore,
+    EntityCriteriaScore,
+    EntityPollRating,
+    Poll,
+)
+from tournesol.models.poll import ALGORITHM_LICCHAVI, ALGORITHM_MEHESTAN
+
+from .factories.entity import VideoFactory
+
+
+class TournesolPollOutputTestCase(TestCase):
+    def setUp(self):
+        self.users = UserFactory.create_batch(2)
+        self.videos = VideoFactory.create_batch(3)
+        # Existing rating, with a stale score which is expected to be removed
+        stale_rating = ContributorRating.objects.create(
+            poll_id=1, user=self.users[1], entity=self.videos[2], is_public=True,
+        )
+        ContributorRatingCriteriaScore.objects.create(
+            contributor_rating=stale_rating, criteria="reliability", score=-3.0,
+        )
+        EntityCriteriaScore.objects.create(
+            poll_id=1, entity=self.videos[2], criteria="reliability", score=-3.0,
+        )
+
+        self.individual_scores = pd.DataFrame({
+            "user_id": [self.users[0].id, self.users[0].id, self.users[1].id],
+            "entity_id": [self.videos[0].id, self.videos[1].id, self.videos[0].id],
+            "score": [1.5, -2.25, 0.1],
+            "uncertainty": [0.5, 1.0, 2.0],
+            "raw_score": [3.0, -4.5, 0.2],
+            "raw_uncertainty": [1.0, 2.0, 4.0],
+            "voting_right": [1.0, 0.5, 0.25],
+        })
+        self.entity_scores = pd.DataFrame({
+            "entity_id": [self.videos[0].id, self.videos[1].id],
+            "score": [12.5, -7.0],
+            "uncertainty": [1.25, 3.0],
+        })
+
+    def saved_scores(self):
+        individual_scores = set(
+            ContributorRatingCriteriaScore.objects.filter(criteria="reliability").values_list(
+                "contributor_rating__user_id",
+                "contributor_rating__entity_id",
+                "score",
+                "uncertainty",
+                "raw_score",
+                "raw_uncertainty",
+                "voting_right",
+            )
+        )
+        entity_scores = set(
+            EntityCriteriaScore.objects.filter(criteria="reliability").values_list(
+                "entity_id", "score", "uncertainty", "score_mode"
+            )
+        )
+        return individual_scores, entity_scores
+
+    def save_scores(self, save_scores_with_copy: bool, score_update_tolerance: float = 0.0):
+        output = TournesolPollOutput(
+            poll_name="videos",
+            criterion="reliability",
+            save_options=ScoresSaveOptions(
+                with_copy=save_scores_with_copy, score_update_tolerance=score_update_tolerance
+            ),
+        )
+        output.save_individual_scores(self.individual_scores.copy())
+        output.save_entity_scores(self.entity_scores)
+        return self.saved_scores()
+
+    def test_copy_saves_the_same_scores(self):
+        expected_scores = self.save_scores(save_scores_with_copy=False)
+        ContributorRatingCriteriaScore.objects.all().delete()
+        EntityCriteriaScore.objects.all().delete()
+        ContributorRating.objects.exclude(user=self.users[1], entity=self.videos[2]).delete()
+        self.assertEqual(self.save_scores(save_scores_with_copy=True), expected_scores)
+
+    def test_copy_saves_scores(self):
+        individual_scores, entity_scores = self.save_scores(save_scores_with_copy=True)
+        self.assertEqual(individual_scores, set(self.individual_scores.itertuples(index=False)))
+        self.assertEqual(entity_scores, {
+            (entity_id, score, uncertainty, "default")
+            for entity_id, score, uncertainty in self.entity_scores.itertuples(index=False)
+        })
+        self.assertEqual(ContributorRating.objects.count(), 4)
+        # Saving again updates the existing scores
+        self.individual_scores["score"] += 1.0
+        individual_scores, _ = self.save_scores(save_scores_with_copy=True)
+        self.assertEqual(individual_scores, set(self.individual_scores.itertuples(index=False)))
+        self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 3)
+
+    def test_copy_saves_scores_of_single_user(self):
+        self.save_scores(save_scores_with_copy=True)
+        output = TournesolPollOutput(
+            poll_name="videos",
+            criterion="reliability",
+            save_options=ScoresSaveOptions(with_copy=True),
+        )
+        user_scores = self.individual_scores[self.individual_scores["user_id"] == self.users[0].id]
+        output.save_individual_scores(
+            user_scores.iloc[:1].drop(columns="voting_right"), single_user_id=self.users[0].id
+        )
+        individual_scores, _ = self.saved_scores()
+        self.assertEqual(individual_scores, {
+            (self.users[0].id, self.videos[0].id, 1.5, 0.5, 3.0, 1.0, 0.0),
+            (self.users[1].id, self.videos[0].id, 0.1, 2.0, 0.2, 4.0, 0.25),
+        })
+
+    def test_copy_only_writes_changed_scores(self):
+        self.save_scores(save_scores_with_copy=True)
+        saved_scores = self.individual_scores.copy()
+
+        self.individual_scores.loc[0, "score"] += 1e-4
+        self.individual_scores.loc[1, "raw_uncertainty"] += 1.0
+        self.individual_scores = self.individual_scores.iloc[:2]
+        self.entity_scores.loc[0, "uncertainty"] += 1e-4
+        with self.assertLogs("ml.outputs", level="INFO") as logs:
+            individual_scores, entity_scores = self.save_scores(
+                save_scores_with_copy=True, score_update_tolerance=1e-3
+            )
+        self.assertIn("0 inserted, 1 updated, 1 deleted, 1 unchanged", logs.output[0])
+        self.assertIn("0 inserted, 0 updated, 0 deleted, 2 unchanged", logs.output[1])
+
+        # Changes below the tolerance are not written
+        saved_scores.loc[1, "raw_uncertainty"] += 1.0
+        self.assertEqual(individual_scores, set(saved_scores.iloc[:2].itertuples(index=False)))
+        self.assertIn((self.videos[0].id, 12.5, 1.25, "default"), entity_scores)
+
+    def test_copy_tracks_the_entities_with_changed_raters(self):
+        output = TournesolPollOutput(
+            poll_name="videos",
+            criterion="reliability",
+            save_options=ScoresSaveOptions(with_copy=True),
+        )
+        output.save_individual_scores(self.individual_scores.copy())
+        self.assertEqual(
+            output.entities_with_changed_raters, {video.id for video in self.videos}
+        )
+
+        output = TournesolPollOutput(
+            poll_name="videos",
+            criterion="reliability",
+            save_options=ScoresSaveOptions(with_copy=True),
+        )
+        self.individual_scores["score"] += 1.0
+        output.save_individual_scores(self.individual_scores.copy())
+        self.assertEqual(output.entities_with_changed_raters, set())
+
+        output = TournesolPollOutput(poll_name="videos", criterion="reliability")
+        output.save_individual_scores(self.individual_scores.copy())
+        self.assertIsNone(output.entities_with_changed_raters)
+
+
+class SaveTrustScoresTestCase(TestCase):
+    def setUp(self):
+        self.users = [
+            UserFactory(trust_score=0.5),
+            UserFactory(trust_score=0.2),
+            UserFactory(trust_score=None),
+        ]
+        self.videos = VideoFactory.create_batch(2)
+        for user in self.users:
+            for video in self.videos:
+                rating = ContributorRating.objects.create(poll_id=1, user=user, entity=video)
+                if user != self.users[1] or video == self.videos[0]:
+                    ContributorRatingCriteriaScore.objects.create(
+                        contributor_rating=rating, criteria="reliability", score=1.0
+                    )
+            EntityPollRating.objects.get_or_create(poll_id=1, entity=video)
+        EntityPollRating.bulk_update_sum_trust_scores(Poll.default_poll())
+
+    def test_save_trust_scores_applies_the_deltas(self):
+        output = TournesolPollOutput(
+            poll_name="videos",
+            criterion="reliability",
+            save_options=ScoresSaveOptions(trust_score_update_tolerance=1e-3),
+        )
+        with self.assertLogs("ml.outputs", level="INFO") as logs:
+            output.save_trust_scores(pd.DataFrame(
+                {"trust_score": [0.5001, 0.7, 0.3]},
+                index=[user.id for user in self.users],
+            ))
+        self.assertIn("Saved the trust scores of 2 users, out of 3", logs.output[0])
+
+        # The change below the tolerance is not saved.
+        self.assertEqual(
+            [user.trust_score for user in User.objects.filter(pk__in=[u.pk for u in self.users])
+             .order_by("pk")],
+            [0.5, 0.7, 0.3],
+        )
+        sums = dict(EntityPollRating.objects.values_list("entity_id", "sum_trust_scores"))
+        self.assertAlmostEqual(sums[self.videos[0].id], 1.5)
+        self.assertAlmostEqual(sums[self.videos[1].id], 0.8)
+
+        EntityPollRating.bulk_update_sum_trust_scores(Poll.default_poll())
+        for entity_id, sum_trust_scores in EntityPollRating.objects.values_list(
+            "entity_id", "sum_trust_scores"
+        ):
+            self.assertAlmostEqual(sums[entity_id], sum_trust_scores)
+
+
+class SaveTournesolScoresTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.default_poll()
+        self.videos = VideoFactory.create_batch(4, tournesol_score=5.0)
+        # This entity has no EntityPollRating yet
+        self.videos.append(VideoFactory(make_safe_for_poll=False))
+        scores = [
+            (self.videos[0], "largely_recommended", "default", 12.0),
+            (self.videos[0], "reliability", "default", -3.0),
+            (self.videos[0], "largely_recommended", "all_equal", 40.0),
+            (self.videos[1], "reliability", "default", 7.0),
+            (self.videos[2], "largely_recommended", "trusted_only", 25.0),
+            (self.videos[4], "largely_recommended", "default", 33.0),
+        ]
+        for entity, criterion, score_mode, score in scores:
+            EntityCriteriaScore.objects.create(
+                poll=self.poll,
+                entity=entity,
+                criteria=criterion,
+                score_mode=score_mode,
+                score=score,
+            )
+
+    def expected_tournesol_scores(self):
+        """The tournesol scores computed entity by entity"""
+        expected_scores = {}
+        for entity in self.videos:
+            all_scores = EntityCriteriaScore.objects.filter(poll=self.poll, entity=entity)
+            if not all_scores.exists():
+                continue
+            scores = all_scores.filter(score_mode="default")
+            if self.poll.algorithm == ALGORITHM_MEHESTAN:
+                expected_scores[entity.pk] = next(
+                    (s.score for s in scores if s.criteria == self.poll.main_criteria), None
+                )
+            else:
+                expected_scores[entity.pk] = 10 * sum(s.score for s in scores)
+        return expected_scores
+
+    def tournesol_scores(self):
+        return dict(
+            EntityPollRating.objects.filter(
+                poll=self.poll, entity__in=self.videos
+            ).values_list("entity_id", "tournesol_score")
+        )
+
+    def test_save_tournesol_scores_mehestan(self):
+        save_tournesol_scores(self.poll)
+        expected_scores = self.expected_tournesol_scores()
+        self.assertEqual(expected_scores[self.videos[0].pk], 12.0)
+        self.assertIsNone(expected_scores[self.videos[1].pk])
+        self.assertEqual(self.tournesol_scores(), {
+            **expected_scores,
+            # The score of an entity without criteria score is left unchanged
+            self.videos[3].pk: 5.0,
+        })
+
+    def test_save_tournesol_scores_licchavi(self):
+        self.poll.algorithm = ALGORITHM_LICCHAVI
+        self.poll.save(update_fields=["algorithm"])
+        save_tournesol_scores(self.poll)
+        expected_scores = self.expected_tournesol_scores()
+        self.assertEqual(expected_scores[self.videos[0].pk], 90.0)
+        self.assertEqual(expected_scores[self.videos[2].pk], 0.0)
+        self.assertEqual(self.tournesol_scores(), {**expected_scores, self.videos[3].pk: 5.0})
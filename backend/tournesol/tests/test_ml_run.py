@@ -18,12 +18,16 @@ initial state of the database after each test.
 Find more details on https://docs.djangoproject.com/en/4.0/topics/testing/overview/#rollback-emulation
 """
 
+import tempfile
+from pathlib import Path
+
 from django.core.management import call_command
 from django.test import TransactionTestCase, override_settings
 
 from core.models import EmailDomain
 from core.tests.factories.user import UserFactory
 from tournesol.models import (
+    Comparison,
     ContributorRating,
     ContributorRatingCriteriaScore,
     EntityCriteriaScore,
@@ -157,6 +161,11 @@ class TestMlTrain(TransactionTestCase):
 
         call_command("ml_train", "--main-criterion-only")
 
+        # The run is a new version of the scores, but not of all criteria
+        poll = Poll.default_poll()
+        self.assertIsNotNone(poll.ml_scores_saved_at)
+        self.assertIsNone(poll.ml_last_run_started_at)
+
         self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 60)
         self.assertEqual(ContributorScaling.objects.count(), 2)
 
@@ -174,6 +183,93 @@ class TestMlTrain(TransactionTestCase):
         self.assertAlmostEqual(scaling.scale_uncertainty, 1.51, places=2)
         self.assertAlmostEqual(scaling.translation_uncertainty, 1.9, places=1)
 
+    def test_ml_train_incremental(self):
+        user1 = UserFactory(email="user1@verified.test")
+        user2 = UserFactory(email="user2@verified.test")
+        for user in [user1, user2]:
+            ComparisonCriteriaScoreFactory.create_batch(5, comparison__user=user)
+
+        poll = Poll.default_poll()
+        self.assertIsNone(poll.ml_last_run_started_at)
+        call_command("ml_train")
+        poll.refresh_from_db()
+        self.assertIsNotNone(poll.ml_last_run_started_at)
+
+        # The raw scores of user1 are reused as is by the incremental run,
+        # as user1 has not edited any comparison since the last run.
+        user1_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=user1
+        )
+        user1_scores.update(raw_score=4.2)
+        ComparisonCriteriaScoreFactory(comparison__user=user2)
+
+        call_command("ml_train", "--incremental")
+        self.assertEqual(user1_scores.count(), 10)
+        self.assertTrue(all(score.raw_score == 4.2 for score in user1_scores))
+        user2_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=user2
+        )
+        self.assertEqual(user2_scores.count(), 12)
+        self.assertTrue(all(score.raw_score != 4.2 for score in user2_scores))
+
+        # The sums of trust scores, updated with deltas, match their full recomputation.
+        sum_trust_scores = dict(
+            EntityPollRating.objects.values_list("entity_id", "sum_trust_scores")
+        )
+        EntityPollRating.bulk_update_sum_trust_scores(poll)
+        for entity_id, expected_sum in EntityPollRating.objects.values_list(
+            "entity_id", "sum_trust_scores"
+        ):
+            self.assertAlmostEqual(sum_trust_scores[entity_id], expected_sum)
+
+    def test_ml_train_incremental_with_deleted_comparison(self):
+        user1 = UserFactory(email="user1@verified.test")
+        user2 = UserFactory(email="user2@verified.test")
+        video_a, video_b, video_c = VideoFactory.create_batch(3)
+        for entity_1, entity_2 in [(video_a, video_b), (video_b, video_c), (video_a, video_c)]:
+            ComparisonCriteriaScoreFactory(
+                comparison__user=user1,
+                comparison__entity_1=entity_1,
+                comparison__entity_2=entity_2,
+            )
+        ComparisonCriteriaScoreFactory.create_batch(5, comparison__user=user2)
+        call_command("ml_train")
+
+        # The deleted comparison leaves user1's compared entities unchanged,
+        # but the raw scores of user1 are learned again.
+        Comparison.objects.get(user=user1, entity_1=video_a, entity_2=video_c).delete()
+        ContributorRatingCriteriaScore.objects.update(raw_score=4.2)
+        call_command("ml_train", "--incremental")
+        user1_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=user1
+        )
+        self.assertEqual(user1_scores.count(), 3)
+        self.assertTrue(all(score.raw_score != 4.2 for score in user1_scores))
+        user2_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=user2
+        )
+        self.assertTrue(all(score.raw_score == 4.2 for score in user2_scores))
+
+    def test_ml_train_with_checkpoints(self):
+        user1 = UserFactory(email="user1@verified.test")
+        ComparisonCriteriaScoreFactory.create_batch(5, comparison__user=user1)
+        poll = Poll.default_poll()
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            call_command("ml_train", "--checkpoint-dir", checkpoint_dir)
+            criterion_dir = Path(checkpoint_dir) / poll.name / poll.main_criteria
+            self.assertTrue((criterion_dir / "preference_learning.npz").exists())
+            self.assertTrue((criterion_dir / "aggregation.npz").exists())
+            main_scores = EntityCriteriaScore.objects.filter(
+                criteria=poll.main_criteria, score_mode="default"
+            )
+            scores = dict(main_scores.values_list("entity_id", "score"))
+
+            # Resumed from the checkpoints, the run saves the same scores
+            EntityCriteriaScore.objects.all().delete()
+            call_command("ml_train", "--checkpoint-dir", checkpoint_dir)
+            self.assertEqual(dict(main_scores.values_list("entity_id", "score")), scores)
+
     def test_tournesol_scores_different_trust(self):
         # 10 pretrusted users
         verified_users = [UserFactory(email=f"user_{n}@verified.test") for n in range(10)]
@@ -6,7 +6,7 @@ import random
 from django.test import TestCase
 
 from core.tests.factories.user import UserFactory
-from tournesol.models import Comparison, EntityPollRating
+from tournesol.models import Comparison, EntityPollContributor, EntityPollRating
 from tournesol.models.entity_context import EntityContext
 from tournesol.tests.factories.entity import VideoFactory
 from tournesol.tests.factories.poll import PollFactory
@@ -99,6 +99,89 @@ class EntityPollRatingTestCase(TestCase):
         self.assertEqual(updated_rating_2.n_comparisons, 1)
         self.assertEqual(updated_rating_2.n_contributors, 1)
 
+    def test_n_ratings_are_updated_with_the_comparisons(self):
+        """
+        The counters are maintained when comparisons are created and
+        deleted, without calling update_n_ratings().
+        """
+        user_2 = UserFactory(username="username_2")
+        video_3 = VideoFactory()
+        comparison_13 = Comparison.objects.create(
+            entity_1=self.video_1, entity_2=video_3, poll=self.poll, user=self.user
+        )
+        Comparison.objects.create(
+            entity_1=self.video_1, entity_2=video_3, poll=self.poll, user=user_2
+        )
+        Comparison.objects.create(
+            entity_1=self.video_1, entity_2=self.video_2, poll=self.poll, user=user_2
+        )
+
+        self.entity_poll_rating_1.refresh_from_db()
+        self.entity_poll_rating_2.refresh_from_db()
+        rating_3 = EntityPollRating.objects.get(entity=video_3, poll=self.poll)
+        self.assertEqual(self.entity_poll_rating_1.n_comparisons, 4)
+        self.assertEqual(self.entity_poll_rating_1.n_contributors, 2)
+        self.assertEqual(self.entity_poll_rating_2.n_comparisons, 2)
+        self.assertEqual(self.entity_poll_rating_2.n_contributors, 2)
+        self.assertEqual(rating_3.n_comparisons, 2)
+        self.assertEqual(rating_3.n_contributors, 2)
+
+        comparison_13.delete()
+        self.entity_poll_rating_1.refresh_from_db()
+        rating_3.refresh_from_db()
+        self.assertEqual(self.entity_poll_rating_1.n_comparisons, 3)
+        self.assertEqual(self.entity_poll_rating_1.n_contributors, 2)
+        self.assertEqual(rating_3.n_comparisons, 1)
+        self.assertEqual(rating_3.n_contributors, 1)
+
+        # The user compared video_1 twice: the deletion of the user and of
+        # their comparisons in cascade uncounts them as one contributor.
+        user_2_id = user_2.pk
+        user_2.delete()
+        self.entity_poll_rating_1.refresh_from_db()
+        self.entity_poll_rating_2.refresh_from_db()
+        rating_3.refresh_from_db()
+        self.assertEqual(self.entity_poll_rating_1.n_comparisons, 1)
+        self.assertEqual(self.entity_poll_rating_1.n_contributors, 1)
+        self.assertEqual(self.entity_poll_rating_2.n_comparisons, 1)
+        self.assertEqual(self.entity_poll_rating_2.n_contributors, 1)
+        self.assertEqual(rating_3.n_comparisons, 0)
+        self.assertEqual(rating_3.n_contributors, 0)
+        self.assertFalse(EntityPollContributor.objects.filter(user_id=user_2_id).exists())
+        self.assertEqual(EntityPollRating.reconcile_n_ratings(self.poll), (0, 0))
+
+    def test_reconcile_n_ratings(self):
+        video_3 = VideoFactory()
+        Comparison.objects.create(
+            entity_1=self.video_1, entity_2=video_3, poll=self.poll, user=self.user
+        )
+        self.assertEqual(EntityPollRating.reconcile_n_ratings(self.poll), (0, 0))
+
+        # Drift of the counters, and comparisons created without signals
+        EntityPollRating.objects.filter(entity=self.video_2).update(
+            n_comparisons=10, n_contributors=10
+        )
+        EntityPollRating.objects.filter(entity=video_3).delete()
+        EntityPollContributor.objects.filter(entity=self.video_1).delete()
+        video_4 = VideoFactory()
+        Comparison.objects.bulk_create([
+            Comparison(entity_1=self.video_2, entity_2=video_4, poll=self.poll, user=self.user)
+        ])
+
+        n_contributors, n_ratings = EntityPollRating.reconcile_n_ratings(self.poll)
+        self.assertEqual(n_contributors, 3)
+        self.assertEqual(n_ratings, 3)
+        for entity, n_comparisons in [
+            (self.video_1, 2), (self.video_2, 2), (video_3, 1), (video_4, 1)
+        ]:
+            rating = EntityPollRating.objects.get(entity=entity, poll=self.poll)
+            self.assertEqual(rating.n_comparisons, n_comparisons)
+            self.assertEqual(rating.n_contributors, 1)
+        self.assertEqual(
+            EntityPollContributor.objects.get(entity=self.video_2).n_comparisons, 2
+        )
+        self.assertEqual(EntityPollRating.reconcile_n_ratings(self.poll), (0, 0))
+
     def test_unsafe_recommendation_reasons(self):
         entity = VideoFactory()
         entity_poll_rating = EntityPollRating.objects.create(
@@ -236,6 +319,26 @@ class EntityPollRatingBulkTrustScoreUpdate(TestCase):
         EntityPollRating.bulk_update_sum_trust_scores(self.poll)
         self.check_sum_trust_scores_are_correctly_updated()
 
+    def test_update_sum_trust_of_some_entities(self):
+        EntityPollRating.bulk_update_sum_trust_scores(self.poll, entity_ids=[self.video_2.id])
+        self.entity_poll_rating_1.refresh_from_db()
+        self.entity_poll_rating_2.refresh_from_db()
+        self.assertEqual(self.entity_poll_rating_1.sum_trust_scores, 0.0)
+        self.assertAlmostEqual(self.entity_poll_rating_2.sum_trust_scores, 0.01)
+
+    def test_apply_trust_score_deltas(self):
+        EntityPollRating.bulk_update_sum_trust_scores(self.poll)
+        # user_c has no individual scores: their delta is not applied
+        EntityPollRating.apply_trust_score_deltas({
+            self.user_a.id: 0.1, self.user_b.id: -0.5, self.user_c.id: 1.0
+        })
+        self.entity_poll_rating_1.refresh_from_db()
+        self.assertAlmostEqual(self.entity_poll_rating_1.sum_trust_scores, 0.51)
+        self.entity_poll_rating_2.refresh_from_db()
+        self.assertAlmostEqual(self.entity_poll_rating_2.sum_trust_scores, 0.11)
+        self.entity_poll_rating_3.refresh_from_db()
+        self.assertAlmostEqual(self.entity_poll_rating_3.sum_trust_scores, 0.)
+
 
 class EntityPollRatingBulkTrustScoreUpdateOnRandomData(TestCase):
     """
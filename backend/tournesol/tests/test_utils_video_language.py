@@ -1,7 +1,12 @@
 from django.test import TestCase
 
 from tournesol.tests.factories.entity import VideoFactory
-from tournesol.utils.video_language import compute_video_language
+from tournesol.utils.video_language import (
+    DEFAULT_SEARCH_CONFIG,
+    compute_video_language,
+    language_to_postgres_config,
+    postgres_config_to_language_codes,
+)
 
 
 class VideoLanguageUtilsTestCase(TestCase):
@@ -21,3 +26,12 @@ class VideoLanguageUtilsTestCase(TestCase):
 
         for input_, output in test_details:
             self.assertEqual(compute_video_language(*input_), output)
+
+    def test_postgres_config_to_language_codes(self):
+        language_codes = postgres_config_to_language_codes()
+        self.assertIn("fr", language_codes["customized_french"])
+        self.assertIn("en", language_codes["customized_english"])
+        self.assertNotIn(DEFAULT_SEARCH_CONFIG, language_codes)
+        for config, codes in language_codes.items():
+            for code in codes:
+                self.assertEqual(language_to_postgres_config(code), config)
@@ -28,6 +28,7 @@ from .views.polls import (
     PollsRecommendationsView,
     PollsView,
 )
+from .views.polls_autocomplete import PollsAutocompleteView
 from .views.polls_reco_random import RandomRecommendationList
 from .views.previews import (
     DynamicWebsitePreviewComparison,
@@ -207,6 +208,11 @@ urlpatterns = [
         RandomRecommendationList.as_view(),
         name="polls_recommendations_random",
     ),
+    path(
+        "polls/<str:name>/autocomplete/",
+        PollsAutocompleteView.as_view(),
+        name="polls_autocomplete",
+    ),
     path(
         "polls/<str:name>/entities/<str:uid>",
         PollsEntityView.as_view(),
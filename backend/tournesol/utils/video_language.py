@@ -105,3 +105,17 @@ def language_to_postgres_config(language_code):
             return postgres_config_name
 
     return DEFAULT_SEARCH_CONFIG
+
+
+def postgres_config_to_language_codes() -> dict[str, list[str]]:
+    """
+    Group the language codes in settings.LANGUAGES by Postgres configuration
+    name, except those using the default configuration.
+    e.g. {"customized_english": ["en"], "customized_norwegian": ["nb", "nn", "no"], ...}
+    """
+    language_codes: dict[str, list[str]] = {}
+    for language_code in LANGUAGE_CODE_TO_NAME_MATCHING:
+        config = language_to_postgres_config(language_code)
+        if config != DEFAULT_SEARCH_CONFIG:
+            language_codes.setdefault(config, []).append(language_code)
+    return language_codes
@@ -2,13 +2,15 @@
 API endpoints to interact with the contributor's comparisons.
 """
 
+from django.conf import settings
 from django.db.models import ObjectDoesNotExist, Q
 from django.http import Http404
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema
 from rest_framework import exceptions, generics, mixins
 
-from tournesol.models import Comparison
+from ml.online_updates import update_user_scores
+from tournesol.models import Comparison, EntityTask
 from tournesol.serializers.comparison import ComparisonSerializer, ComparisonUpdateSerializer
 from tournesol.views.mixins.poll import PollScopedViewMixin
 
@@ -115,17 +117,23 @@ class ComparisonListApi(mixins.CreateModelMixin, ComparisonListBaseApi):
             )
         comparison: Comparison = serializer.save()
 
-        comparison.entity_1.update_entity_poll_rating(poll=poll)
-        comparison.entity_1.inner.refresh_metadata()
-        comparison.entity_1.auto_remove_from_rate_later(poll=poll, user=self.request.user)
-
-        comparison.entity_2.update_entity_poll_rating(poll=poll)
-        comparison.entity_2.inner.refresh_metadata()
-        comparison.entity_2.auto_remove_from_rate_later(poll=poll, user=self.request.user)
-
-        # TODO: online updates are to be implemented in Solidago
-        # if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
-        #     update_user_scores(poll, user=self.request.user)
+        if settings.COMPARISON_SIDE_EFFECTS_ASYNC:
+            # Run by the command `run_entity_tasks`
+            EntityTask.enqueue(EntityTask.build_comparison_tasks(comparison))
+        else:
+            comparison.entity_1.inner.refresh_metadata()
+            comparison.entity_1.auto_remove_from_rate_later(poll=poll, user=self.request.user)
+
+            comparison.entity_2.inner.refresh_metadata()
+            comparison.entity_2.auto_remove_from_rate_later(poll=poll, user=self.request.user)
+
+        if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
+            update_user_scores(
+                poll,
+                user=self.request.user,
+                criteria=comparison.criteria_scores.values_list("criteria", flat=True),
+                updated_entities={comparison.entity_1_id, comparison.entity_2_id},
+            )
 
 
 class ComparisonListFilteredApi(ComparisonListBaseApi):
@@ -213,19 +221,25 @@ class ComparisonDetailApi(
         ctx["partial_update"] = self.request.method == 'PATCH'
         return ctx
 
-    # TODO: online updates are to be implemented in Solidago
-    # def perform_update(self, serializer):
-    #     super().perform_update(serializer)
-    #     poll = self.poll_from_url
-    #     if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
-    #         update_user_scores(poll, user=self.request.user)
-
-    # TODO: online updates are to be implemented in Solidago
-    # def perform_destroy(self, instance):
-    #     super().perform_destroy(instance)
-    #     poll = self.poll_from_url
-    #     if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
-    #         update_user_scores(poll, user=self.request.user)
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
+            # Criteria may have been removed from the comparison: all criteria are updated
+            comparison = serializer.instance
+            update_user_scores(
+                self.poll_from_url,
+                user=self.request.user,
+                updated_entities={comparison.entity_1_id, comparison.entity_2_id},
+            )
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON:
+            update_user_scores(
+                self.poll_from_url,
+                user=self.request.user,
+                updated_entities={instance.entity_1_id, instance.entity_2_id},
+            )
 
     def get(self, request, *args, **kwargs):
         """Retrieve a comparison made by the logged user, in the given poll."""
@@ -1,5 +1,6 @@
 import logging
 
+from django.conf import settings
 from django.db.models import Case, F, Prefetch, Sum, When
 from django.shortcuts import get_object_or_404
 from django.utils.cache import patch_cache_control, patch_vary_headers
@@ -14,6 +15,7 @@ from drf_spectacular.utils import (
 from rest_framework import serializers
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
+from tournesol.lib.score_matrix import get_score_matrix, rank_entities
 from tournesol.models import Comparison, CriteriaRank, Entity, Poll
 from tournesol.models.entity_score import ScoreMode
 from tournesol.models.poll import ALGORITHM_MEHESTAN
@@ -100,17 +102,31 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         """
         return metadata_filter.split("[")[1][:-1]
 
+    def _compared_entities(self, poll: Poll, user) -> set[int]:
+        comparison_qs = Comparison.objects.filter(user=user, poll=poll)
+        return set(
+            entity_id
+            for comparison in comparison_qs
+            for entity_id in [comparison.entity_1_id, comparison.entity_2_id]
+        )
+
     def _exclude_compared_entities(self, queryset, exclude_compared, poll: Poll, user):
         if exclude_compared and user.is_authenticated:
-            comparison_qs = Comparison.objects.filter(user=user, poll=poll)
-            compared_entities = set(
-                entity_id
-                for comparison in comparison_qs
-                for entity_id in [comparison.entity_1_id, comparison.entity_2_id]
-            )
-            return queryset.exclude(id__in=compared_entities)
+            return queryset.exclude(id__in=self._compared_entities(poll, user))
         return queryset
 
+    def _get_filters(self, request):
+        filter_serializer = self.query_params_serializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        return filter_serializer.validated_data
+
+    def _get_metadata_filters(self, request) -> list[tuple[str, list[str]]]:
+        return [
+            (self._metadata_from_filter(key), values)
+            for (key, values) in request.query_params.lists()
+            if key.startswith("metadata[")
+        ]
+
     def filter_by_parameters(self, request, queryset, poll: Poll):
         """
         Filter the queryset according to the URL parameters.
@@ -118,10 +134,7 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         The `unsafe` parameter is not processed by this method.
         """
         user = self.request.user
-
-        filter_serializer = self.query_params_serializer(data=request.query_params)
-        filter_serializer.is_valid(raise_exception=True)
-        filters = filter_serializer.validated_data
+        filters = self._get_filters(request)
 
         date_lte = filters["date_lte"]
         if date_lte:
@@ -131,12 +144,7 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         if date_gte:
             queryset = poll.entity_cls.filter_date_gte(queryset, date_gte)
 
-        metadata_filters = [
-            (self._metadata_from_filter(key), values)
-            for (key, values) in request.query_params.lists()
-            if key.startswith("metadata[")
-        ]
-
+        metadata_filters = self._get_metadata_filters(request)
         if metadata_filters:
             queryset = poll.entity_cls.filter_metadata(queryset, metadata_filters)
 
@@ -200,31 +208,36 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
 
         return queryset.order_by("-total_score", "-pk")
 
-    def _build_criteria_weight_condition(
-        self, request, poll: Poll, when="criteria_scores__criteria"
-    ):
+    def _get_criteria_weights(self, request, poll: Poll) -> dict[str, float]:
         """
-        Return a `Case()` expression associating for each criterion the weight
-        provided in the URL parameters.
+        Return the weight of each criterion provided in the URL parameters.
         """
         any_weight_in_request = False
-        criteria_cases = []
-        weights_sum = 0.0
+        weights = {}
 
         for crit in poll.criterias_list:
             weight = self._get_raw_weight(request, crit)
             if weight != CRITERIA_DEFAULT_WEIGHT:
                 any_weight_in_request = True
-            criteria_cases.append(When(**{when: crit}, then=weight))
-            weights_sum += weight
+            weights[crit] = weight
 
         if not any_weight_in_request and poll.algorithm == ALGORITHM_MEHESTAN:
-            criteria_cases = [
-                When(**{when: poll.main_criteria}, then=1)
-            ]
-            weights_sum = 1.0
+            weights = {poll.main_criteria: 1}
 
-        self._weights_sum = weights_sum
+        self._weights_sum = float(sum(weights.values()))
+        return weights
+
+    def _build_criteria_weight_condition(
+        self, request, poll: Poll, when="criteria_scores__criteria"
+    ):
+        """
+        Return a `Case()` expression associating for each criterion the weight
+        provided in the URL parameters.
+        """
+        criteria_cases = [
+            When(**{when: crit}, then=weight)
+            for crit, weight in self._get_criteria_weights(request, poll).items()
+        ]
         return Case(*criteria_cases, default=0)
 
     def _get_raw_weight(self, request, criteria):
@@ -296,15 +309,17 @@ class PollsRecommendationsView(PollRecommendationsBaseAPIView):
             patch_cache_control(response, public=True)
         return response
 
-    def annotate_and_prefetch_scores(self, queryset, request, poll: Poll):
+    def _get_score_mode(self, request) -> ScoreMode:
         raw_score_mode = request.query_params.get("score_mode", ScoreMode.DEFAULT)
         try:
-            score_mode = ScoreMode(raw_score_mode)
+            return ScoreMode(raw_score_mode)
         except ValueError as error:
             raise serializers.ValidationError(
                 {"score_mode": f"Accepted values are: {','.join(ScoreMode.values)}"}
             ) from error
 
+    def annotate_and_prefetch_scores(self, queryset, request, poll: Poll):
+        score_mode = self._get_score_mode(request)
         criteria_weight = self._build_criteria_weight_condition(
             request, poll, when="all_criteria_scores__criteria"
         )
@@ -331,8 +346,42 @@ class PollsRecommendationsView(PollRecommendationsBaseAPIView):
             .with_prefetched_poll_ratings(poll_name=poll.name)
         )
 
+    def rank_with_score_matrix(self, request, filters, poll: Poll):
+        """
+        Rank the entities with the in-memory matrix of their criteria scores.
+
+        The filters are evaluated with the filter index of the matrix. The
+        filters it doesn't index are evaluated by the database instead, with
+        a single query returning the ids of the matching entities. Only the
+        entities of the requested page are fetched.
+        """
+        score_mode = self._get_score_mode(request)
+        weights = self._get_criteria_weights(request, poll)
+        matrix = get_score_matrix(poll, score_mode)
+
+        rows = matrix.filter_index.filter_rows(filters, self._get_metadata_filters(request))
+        if rows is None:
+            queryset, filters = self.filter_by_parameters(request, Entity.objects.all(), poll)
+            queryset = self.filter_unsafe(queryset, filters)
+            rows = matrix.rows_of(queryset.values_list("id", flat=True))
+        elif filters["exclude_compared_entities"] and request.user.is_authenticated:
+            rows &= ~matrix.rows_of(self._compared_entities(poll, request.user))
+
+        def fetch_entities(ids):
+            return (
+                Entity.objects.filter(id__in=ids)
+                .with_prefetched_scores(poll_name=poll.name, mode=score_mode)
+                .with_prefetched_poll_ratings(poll_name=poll.name)
+            )
+
+        return rank_entities(matrix, weights, fetch_entities=fetch_entities, rows=rows)
+
     def get_queryset(self):
         poll = self.poll_from_url
+        if settings.RECOMMENDATIONS_SCORE_MATRIX:
+            filters = self._get_filters(self.request)
+            if not filters["search"]:
+                return self.rank_with_score_matrix(self.request, filters, poll)
         queryset = Entity.objects.all()
         queryset, filters = self.filter_by_parameters(self.request, queryset, poll)
         queryset = self.annotate_and_prefetch_scores(queryset, self.request, poll)
@@ -0,0 +1,44 @@
+from django.utils.decorators import method_decorator
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework.generics import ListAPIView
+
+from tournesol.lib.autocomplete import autocomplete_entities
+from tournesol.serializers.poll import AutocompleteFilterSerializer, AutocompleteSerializer
+from tournesol.utils.cache import cache_page_no_i18n
+from tournesol.views import PollScopedViewMixin
+
+
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[AutocompleteFilterSerializer],
+    )
+)
+class PollsAutocompleteView(PollScopedViewMixin, ListAPIView):
+    """
+    List the entities of a given poll whose words start with the words typed
+    by the user, sorted by decreasing relevance and tournesol score.
+
+    Designed to be called at each keystroke: the entities are matched with the
+    prefix index of their name and of a few other metadata, instead of the
+    full-text search of their whole metadata.
+    """
+
+    permission_classes = []
+    pagination_class = None
+    serializer_class = AutocompleteSerializer
+    poll_parameter = "name"
+
+    @method_decorator(cache_page_no_i18n(60 * 10, public=True))
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        filter_serializer = AutocompleteFilterSerializer(data=self.request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+        return autocomplete_entities(
+            self.poll_from_url,
+            filters["q"],
+            limit=filters["limit"],
+            unsafe=filters["unsafe"],
+        )
@@ -7,6 +7,7 @@ from drf_spectacular.utils import (
     extend_schema_view,
 )
 
+from tournesol.lib.random_pool import PollRandomPool, RandomSample, get_random_pool
 from tournesol.models import Entity
 from tournesol.serializers.poll import (
     RecommendationBaseSerializer,
@@ -21,23 +22,45 @@ class RandomRecommendationBaseAPIView(PollRecommendationsBaseAPIView):
 
     def get_queryset(self):
         """
-        Return a queryset of random recommended entities.
+        Return a random sample of recommended entities.
 
-        This queryset is designed to be more performant than the queryset
-        of the regular recommendations view. For this reason, it doesn't allow
-        to:
+        The entities are drawn among the safe entities of the poll kept in
+        memory, so that only the entities of the sample are fetched from the
+        database. For this reason, it doesn't allow to:
             - filter entities by text
             - filter entities by weighted criteria score
             - or anything involving a SQL JOIN on EntityCriteriaScore
+
+        The languages and the publication dates are filtered in memory. The
+        other filters are evaluated by the database, which returns the ids of
+        the matching safe entities.
         """
         poll = self.poll_from_url
-        queryset = Entity.objects.all()
-        queryset, _ = self.filter_by_parameters(self.request, queryset, poll)
-        queryset = queryset.with_prefetched_scores(poll_name=poll.name)
-        queryset = queryset.with_prefetched_poll_ratings(poll_name=poll.name)
-        queryset = queryset.filter_safe_for_poll(poll)
-        queryset = queryset.order_by("?")
-        return queryset
+        filters = self._get_filters(self.request)
+        metadata_filters = self._get_metadata_filters(self.request)
+        pool = get_random_pool(poll)
+
+        if any(operation != "language" for operation, _ in metadata_filters) or (
+            (filters["date_lte"] or filters["date_gte"])
+            and not PollRandomPool.filters_dates_of(poll)
+        ):
+            queryset, _ = self.filter_by_parameters(
+                self.request, Entity.objects.filter_safe_for_poll(poll), poll
+            )
+            candidates = pool.candidates(entity_ids=queryset.values_list("id", flat=True))
+        else:
+            candidates = pool.candidates(
+                languages=metadata_filters[0][1] if metadata_filters else None,
+                date_lte=filters["date_lte"],
+                date_gte=filters["date_gte"],
+            )
+
+        def fetch_entities(entity_ids):
+            queryset = Entity.objects.filter(id__in=entity_ids)
+            queryset = queryset.with_prefetched_scores(poll_name=poll.name)
+            return queryset.with_prefetched_poll_ratings(poll_name=poll.name)
+
+        return RandomSample(candidates, fetch_entities, weighted=filters["weighted"])
 
 
 @extend_schema_view(
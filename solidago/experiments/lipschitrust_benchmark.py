@@ -0,0 +1,76 @@
+""" Benchmarks LipschiTrust on synthetic vouch graphs.
+
+Usage:
+    python3 experiments/lipschitrust_benchmark.py [n_edges ...]
+
+By default, graphs of 10k, 100k and 1M vouches are generated,
+with on average 10 vouches per user and 10% of pretrusted users.
+For the smallest graphs, the output is also compared to a sequential propagation,
+which iterates over the vouches one by one.
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from solidago.trust_propagation import LipschiTrust
+
+
+SEQUENTIAL_MAX_EDGES = 10_000
+
+
+def synthetic_vouch_graph(n_edges: int, vouches_per_user: int = 10, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n_users = max(2, n_edges // vouches_per_user)
+    users = pd.DataFrame({"is_pretrusted": rng.random(n_users) < 0.1})
+    users.index.name = "user_id"
+    vouches = pd.DataFrame({
+        "voucher": rng.integers(n_users, size=n_edges),
+        "vouchee": rng.integers(n_users, size=n_edges),
+        "vouch": 1.0,
+    })
+    return users, vouches
+
+
+def sequential_trusts(trust_propagation: LipschiTrust, users, vouches) -> np.ndarray:
+    total_vouches = vouches["voucher"].value_counts() + trust_propagation.sink_vouch
+    pretrusts = users["is_pretrusted"] * trust_propagation.pretrust_value
+    trusts = pretrusts.copy()
+    n_iterations = -np.log(len(users) / trust_propagation.error) / np.log(trust_propagation.decay)
+    for _ in range(int(np.ceil(n_iterations))):
+        new_trusts = pretrusts.copy()
+        for row in vouches.itertuples():
+            discount = trust_propagation.decay * row.vouch / total_vouches[row.voucher]
+            new_trusts[row.vouchee] += discount * trusts[row.voucher]
+        new_trusts = new_trusts.clip(upper=1.0)
+        delta = np.linalg.norm(new_trusts - trusts, ord=1)
+        trusts = new_trusts
+        if delta < trust_propagation.error:
+            break
+    return trusts.to_numpy()
+
+
+def benchmark(n_edges: int, trust_propagation: LipschiTrust):
+    users, vouches = synthetic_vouch_graph(n_edges)
+    start = timeit.default_timer()
+    trusts = trust_propagation(users, vouches)["trust_score"].to_numpy()
+    duration = timeit.default_timer() - start
+    print(f"{n_edges:>9} vouches, {len(users):>8} users: {duration:.3f} seconds")
+
+    if n_edges <= SEQUENTIAL_MAX_EDGES:
+        start = timeit.default_timer()
+        expected = sequential_trusts(trust_propagation, users, vouches)
+        duration = timeit.default_timer() - start
+        identical = np.array_equal(trusts, expected)
+        print(f"{'':>9} sequential propagation: {duration:.3f} seconds, identical={identical}")
+
+
+if __name__ == "__main__":
+    edge_counts = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    trust_propagation = LipschiTrust()
+    # Compile the jitted propagation before timing
+    trust_propagation(*synthetic_vouch_graph(10))
+    for n_edges in edge_counts:
+        benchmark(n_edges, trust_propagation)
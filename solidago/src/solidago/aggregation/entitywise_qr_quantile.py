@@ -4,13 +4,16 @@ import numpy as np
 from .base import Aggregation
 
 from solidago.voting_rights import VotingRights
-from solidago.scoring_model import ScoringModel, DirectScoringModel
+from solidago.scoring_model import ScoringModel, DirectScoringModel, scores_frame
 
-from solidago.primitives import qr_quantile, qr_uncertainty
+from solidago.primitives import (
+    grouped_qr_quantile_and_uncertainty,
+    parallel_grouped_qr_quantile_and_uncertainty,
+)
 
 
 class EntitywiseQrQuantile(Aggregation):
-    def __init__(self, quantile=0.2, lipschitz=0.1, error=1e-5):
+    def __init__(self, quantile=0.2, lipschitz=0.1, error=1e-5, parallel=False):
         """Aggregates the scores per entity with [`qr_quantile`][solidago.primitives.qr_quantile].
         
         Parameters
@@ -18,10 +21,14 @@ class EntitywiseQrQuantile(Aggregation):
         quantile: float
         lipschitz: float
         error: float
+        parallel: bool
+            Whether entities are solved in parallel threads.
+            With numba's TBB threading layer, the process cannot safely fork afterwards.
         """
         self.quantile = quantile
         self.lipschitz = lipschitz
         self.error = error
+        self.parallel = parallel
  
     def __call__(
         self, 
@@ -52,29 +59,27 @@ class EntitywiseQrQuantile(Aggregation):
             Returns a global scoring model
         """
         df = _get_user_scores(voting_rights, user_models, entities)
-        global_scores = DirectScoringModel()
-        
-        for entity_id, dfe in df.groupby("entity_id"):
-            score = qr_quantile(
-                self.lipschitz, 
-                self.quantile, 
-                np.array(dfe["scores"]), 
-                np.array(dfe["voting_rights"]), 
-                np.array(dfe["left_uncertainties"]),
-                np.array(dfe["right_uncertainties"]),
-                self.error
-            )
-            uncertainty = qr_uncertainty(
-                self.lipschitz, 
-                np.array(dfe["scores"]), 
-                np.array(dfe["voting_rights"]), 
-                np.array(dfe["left_uncertainties"]),
-                np.array(dfe["right_uncertainties"]),
-                default_dev = 1.0,
-                error = self.error,
-                median = score if self.quantile == 0.5 else None,
-            )
-            global_scores[entity_id] = score, uncertainty
+        # Scores are sorted by entity, so that each entity's scores are a contiguous slice.
+        # The sort is stable, to preserve the order of scores within each entity.
+        order = np.argsort(df["entity_id"].to_numpy(), kind="stable")
+        entity_ids, starts = np.unique(df["entity_id"].to_numpy()[order], return_index=True)
+        grouped_qr = (
+            parallel_grouped_qr_quantile_and_uncertainty if self.parallel
+            else grouped_qr_quantile_and_uncertainty
+        )
+        scores, uncertainties = grouped_qr(
+            self.lipschitz,
+            self.quantile,
+            *(df[column].to_numpy(dtype=np.float64)[order] for column in (
+                "scores", "voting_rights", "left_uncertainties", "right_uncertainties"
+            )),
+            group_indptr=np.append(starts, len(order)),
+            default_dev=1.0,
+            error=self.error,
+        )
+        global_scores = DirectScoringModel.from_arrays(
+            entity_ids, scores, uncertainties, uncertainties
+        )
                 
         return user_models, global_scores
         
@@ -93,20 +98,9 @@ def _get_user_scores(
     user_models: dict[int, ScoringModel],
     entities: pd.DataFrame
 ):
-    user_list, entity_list, voting_right_list = list(), list(), list()
-    scores, lefts, rights = list(), list(), list()
-    for user in user_models:
-        for entity in user_models[user].scored_entities(entities):
-            user_list.append(user)
-            entity_list.append(entity)
-            voting_right_list.append(voting_rights[user, entity])
-            output = user_models[user](entity, entities.loc[entity])
-            scores.append(output[0])
-            lefts.append(output[1])
-            rights.append(output[2])
-                
-    return pd.DataFrame(dict(
-        user_id=user_list, entity_id=entity_list, voting_rights=voting_right_list, 
-        scores=scores, left_uncertainties=lefts, right_uncertainties=rights
-    ))    
+    df = scores_frame(user_models, entities)
+    df.insert(2, "voting_rights", np.nan_to_num(
+        voting_rights.get_many(df["user_id"].to_numpy(), df["entity_id"].to_numpy())
+    ))
+    return df
     
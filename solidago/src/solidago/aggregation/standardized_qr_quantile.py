@@ -4,7 +4,9 @@ import numpy as np
 from .base import Aggregation
 
 from solidago.voting_rights import VotingRights
-from solidago.scoring_model import ScoringModel, DirectScoringModel, ScaledScoringModel
+from solidago.scoring_model import (
+    ScoringModel, DirectScoringModel, ScaledScoringModel, scores_frame
+)
 
 from solidago.primitives import qr_quantile, qr_standard_deviation, qr_uncertainty
 
@@ -120,25 +122,8 @@ class StandardizedQrQuantile(Aggregation):
 def _get_user_scores(
     voting_rights: VotingRights, user_models: dict[int, ScoringModel], entities: pd.DataFrame
 ):
-    return pd.DataFrame(
-        (
-            dict(
-                user_id=user_id,
-                entity_id=entity_id,
-                voting_rights=voting_rights[user_id, entity_id],
-                scores=score,
-                left_uncertainties=left,
-                right_uncertainties=right,
-            )
-            for user_id, user_model in user_models.items()
-            for entity_id, (score, left, right) in user_model.iter_entities(entities)
-        ),
-        columns=[
-            "user_id",
-            "entity_id",
-            "voting_rights",
-            "scores",
-            "left_uncertainties",
-            "right_uncertainties",
-        ],
-    )
+    df = scores_frame(user_models, entities)
+    df.insert(2, "voting_rights", np.nan_to_num(
+        voting_rights.get_many(df["user_id"].to_numpy(), df["entity_id"].to_numpy())
+    ))
+    return df
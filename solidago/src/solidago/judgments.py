@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 class Judgments(ABC):
@@ -26,7 +27,9 @@ class DataFrameJudgments(Judgments):
         comparisons: Optional[pd.DataFrame] = None,
         assessments: Optional[pd.DataFrame] = None,
     ):
-        """ Instantiates judgments from all contributors, based on dataframes
+        """ Instantiates judgments from all contributors, based on dataframes.
+        Dataframes are sorted by `user_id` once and for all, so that each user's
+        judgments are a contiguous slice, which is retrieved in constant time.
         
         Parameters
         ----------
@@ -55,15 +58,56 @@ class DataFrameJudgments(Judgments):
             ])
         else:
             self.assessments = assessments
+
+    @property
+    def comparisons(self) -> pd.DataFrame:
+        return self._comparisons
+
+    @comparisons.setter
+    def comparisons(self, comparisons: pd.DataFrame):
+        self._comparisons, self._comparisons_offsets = _partition_by_user(comparisons)
+
+    @property
+    def assessments(self) -> pd.DataFrame:
+        return self._assessments
+
+    @assessments.setter
+    def assessments(self, assessments: pd.DataFrame):
+        self._assessments, self._assessments_offsets = _partition_by_user(assessments)
         
     def __getitem__(self, user: int):
-        comparisons = self.comparisons[self.comparisons["user_id"] == user]
-        assessments = self.assessments[self.assessments["user_id"] == user]
+        comparisons = _user_slice(self._comparisons, self._comparisons_offsets, user)
+        assessments = _user_slice(self._assessments, self._assessments_offsets, user)
         if len(comparisons) == 0 and len(assessments) == 0:
             return None
         return dict(
             comparisons=comparisons,
             assessments=assessments,
-        )        
-        
+        )
+
+
+def _partition_by_user(df: pd.DataFrame) -> tuple[pd.DataFrame, dict[int, tuple[int, int]]]:
+    """ Sorts df by `user_id`, preserving the order of each user's rows.
+    
+    Returns
+    -------
+    df: DataFrame
+        The sorted dataframe
+    offsets: dict[int, tuple[int, int]]
+        offsets[user] = (start, end) are the positions of user's rows in the sorted dataframe
+    """
+    if len(df) == 0:
+        return df, dict()
+    df = df.sort_values("user_id", kind="stable")
+    users, starts = np.unique(df["user_id"].to_numpy(), return_index=True)
+    ends = np.append(starts[1:], len(df))
+    return df, { user: (start, end) for user, start, end in zip(users, starts, ends) }
+
 
+def _user_slice(
+    df: pd.DataFrame, 
+    offsets: dict[int, tuple[int, int]], 
+    user: int
+) -> pd.DataFrame:
+    start, end = offsets.get(user, (0, 0))
+    return df.iloc[start:end]
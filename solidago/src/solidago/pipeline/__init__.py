@@ -1,5 +1,6 @@
+from .checkpoints import CheckpointStore
 from .inputs import PipelineInput
 from .outputs import PipelineOutput
 from .pipeline import DefaultPipeline, Pipeline
 
-__all__ = ["PipelineInput", "DefaultPipeline", "Pipeline", "PipelineOutput"]
+__all__ = ["CheckpointStore", "PipelineInput", "DefaultPipeline", "Pipeline", "PipelineOutput"]
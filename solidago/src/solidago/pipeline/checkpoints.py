@@ -0,0 +1,275 @@
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import Callable, Mapping, Optional, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+from solidago.judgments import DataFrameJudgments
+from solidago.scoring_model import ScoringModel, DirectScoringModel, ScaledScoringModel, scores_frame
+from solidago.user_entity_table import UserEntityTable
+from solidago.voting_rights import VotingRights
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_KEY = "__key__"
+_SCALING_PARAMETERS = (
+    "multiplicator",
+    "translation",
+    "multiplicator_left_uncertainty",
+    "multiplicator_right_uncertainty",
+    "translation_left_uncertainty",
+    "translation_right_uncertainty",
+)
+
+
+class UnsupportedCheckpoint(ValueError):
+    """ Raised when a stage input or output cannot be hashed or serialized """
+
+
+class CheckpointStore:
+    def __init__(self, directory: Union[str, Path]):
+        """ Stores the outputs of the pipeline stages in a local directory,
+        so that an interrupted run can be resumed, and that stages whose inputs
+        and configuration are unchanged are not run again.
+
+        Each stage output is saved as a file `<stage>.npz` of numpy arrays,
+        one per column, along with the key of the inputs it was computed from.
+        A stage is loaded only if its stored key matches the expected key.
+
+        Parameters
+        ----------
+        directory: str or Path
+            Directory of the checkpoints, created if needed
+        """
+        self.directory = Path(directory)
+
+    def subdirectory(self, name: str) -> "CheckpointStore":
+        """ Returns a store in a subdirectory, e.g. for each criterion """
+        return CheckpointStore(self.directory / name)
+
+    def path(self, stage: str) -> Path:
+        return self.directory / f"{stage}.npz"
+
+    def load(self, stage: str, key: str) -> Optional[dict[str, np.ndarray]]:
+        """ Returns the arrays saved for `stage`, or None if they are missing,
+        unreadable, or were computed from other inputs than `key`.
+        """
+        path = self.path(stage)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if str(npz[_KEY]) != key:
+                    return None
+                return { name: npz[name] for name in npz.files if name != _KEY }
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile) as error:
+            logger.warning(f"Ignoring the unreadable checkpoint {path}: {error}")
+            return None
+
+    def save(self, stage: str, key: str, arrays: Mapping[str, np.ndarray]):
+        """ Saves the arrays of `stage`. The file is replaced atomically,
+        so that a crash while saving leaves the previous checkpoint untouched.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(stage)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{ _KEY: np.array(key) }, **arrays)
+        os.replace(tmp_path, path)
+
+    def run_stage(
+        self,
+        stage: str,
+        key: str,
+        compute: Callable[[], T],
+        encode: Callable[[T], Mapping[str, np.ndarray]],
+        decode: Callable[[dict[str, np.ndarray]], T],
+    ) -> T:
+        """ Returns the output of `stage` loaded from its checkpoint if it is valid,
+        or computes and saves it otherwise.
+        """
+        arrays = self.load(stage, key)
+        if arrays is not None:
+            logger.info(f"Loaded {stage} from checkpoint {self.path(stage)}")
+            return decode(arrays)
+        result = compute()
+        try:
+            encoded = encode(result)
+        except UnsupportedCheckpoint as error:
+            logger.warning(f"No checkpoint saved for {stage}: {error}")
+        else:
+            self.save(stage, key, encoded)
+        return result
+
+
+def stage_key(previous_key: str, component, *inputs) -> str:
+    """ Returns the key of a stage, which depends on the key of the previous stage,
+    on the stage's configuration `component.to_json()` and on its additional inputs.
+    """
+    hasher = hashlib.sha256(previous_key.encode())
+    hasher.update(json.dumps(component.to_json(), sort_keys=True, default=str).encode())
+    for value in inputs:
+        _update_hash(hasher, value)
+    return hasher.hexdigest()
+
+
+def _update_hash(hasher, value):
+    if value is None:
+        hasher.update(b"None")
+    elif isinstance(value, pd.DataFrame):
+        columns = [str(column) for column in value.columns]
+        hasher.update(json.dumps([str(value.index.name), columns]).encode())
+        try:
+            hashes = pd.util.hash_pandas_object(value, index=True)
+        except TypeError as error:
+            raise UnsupportedCheckpoint(f"Cannot hash frame with columns {columns}") from error
+        hasher.update(hashes.to_numpy().tobytes())
+    elif isinstance(value, UserEntityTable):
+        _update_hash(hasher, value.to_frame())
+    elif isinstance(value, DataFrameJudgments):
+        _update_hash(hasher, value.comparisons)
+        _update_hash(hasher, value.assessments)
+    elif isinstance(value, Mapping):
+        hasher.update(np.array(list(value.keys())).tobytes())
+        _update_hash(hasher, scores_frame(value))
+    else:
+        raise UnsupportedCheckpoint(f"Cannot hash input of type {type(value).__name__}")
+
+
+def encode_frame(df: pd.DataFrame, prefix: str) -> dict[str, np.ndarray]:
+    arrays = {
+        f"{prefix}:index": df.index.to_numpy(),
+        f"{prefix}:columns": np.array([str(column) for column in df.columns], dtype=str),
+    }
+    if df.index.name is not None:
+        arrays[f"{prefix}:index_name"] = np.array(str(df.index.name))
+    for column in df.columns:
+        arrays[f"{prefix}:column:{column}"] = df[column].to_numpy()
+    for name, array in arrays.items():
+        if array.dtype == object:
+            # e.g. booleans or strings stored as python objects
+            array = np.array(array.tolist())
+            if array.dtype == object:
+                raise UnsupportedCheckpoint(f"{name} has values of type object")
+            arrays[name] = array
+    return arrays
+
+
+def decode_frame(arrays: dict[str, np.ndarray], prefix: str) -> pd.DataFrame:
+    index_name = arrays.get(f"{prefix}:index_name")
+    return pd.DataFrame(
+        {
+            column: arrays[f"{prefix}:column:{column}"]
+            for column in arrays[f"{prefix}:columns"].tolist()
+        },
+        index=pd.Index(
+            arrays[f"{prefix}:index"],
+            name=None if index_name is None else str(index_name),
+        ),
+    )
+
+
+def encode_user_models(user_models: Mapping[int, ScoringModel]) -> dict[str, np.ndarray]:
+    """ Encodes models which directly assign scores to entities, such as raw user models """
+    for user_id, model in user_models.items():
+        if not isinstance(model, DirectScoringModel):
+            raise UnsupportedCheckpoint(f"Model of user {user_id} is a {type(model).__name__}")
+    scores = scores_frame(user_models)
+    return {
+        "user_ids": np.array(list(user_models.keys()), dtype=np.int64),
+        **{ f"scores:{column}": scores[column].to_numpy() for column in scores.columns },
+    }
+
+
+def decode_user_models(arrays: dict[str, np.ndarray]) -> dict[int, DirectScoringModel]:
+    score_user_ids = arrays["scores:user_id"]
+    order = np.argsort(score_user_ids, kind="stable")
+    sorted_user_ids = score_user_ids[order]
+    columns = [
+        arrays[f"scores:{column}"][order]
+        for column in ("entity_id", "scores", "left_uncertainties", "right_uncertainties")
+    ]
+    user_models = dict()
+    for user_id in arrays["user_ids"].tolist():
+        start = np.searchsorted(sorted_user_ids, user_id, side="left")
+        end = np.searchsorted(sorted_user_ids, user_id, side="right")
+        user_models[user_id] = DirectScoringModel.from_arrays(
+            *(column[start:end] for column in columns)
+        )
+    return user_models
+
+
+def encode_scaled_models(
+    user_models: Mapping[int, ScoringModel],
+    raw_user_models: Mapping[int, ScoringModel],
+) -> dict[str, np.ndarray]:
+    """ Encodes the scaling parameters of models which scale the raw user models.
+    Raw models are not saved again, and unscaled models are flagged as such.
+    """
+    is_scaled = np.zeros(len(user_models), dtype=bool)
+    parameters = np.zeros((len(_SCALING_PARAMETERS), len(user_models)))
+    for index, (user_id, model) in enumerate(user_models.items()):
+        raw_model = raw_user_models.get(user_id)
+        if isinstance(model, ScaledScoringModel) and model.base_model is raw_model:
+            is_scaled[index] = True
+            parameters[:, index] = model._direct_scaling_parameters()
+        elif model is not raw_model:
+            raise UnsupportedCheckpoint(f"Model of user {user_id} does not scale its raw model")
+    return {
+        "user_ids": np.array(list(user_models.keys()), dtype=np.int64),
+        "is_scaled": is_scaled,
+        **{ name: values for name, values in zip(_SCALING_PARAMETERS, parameters) },
+    }
+
+
+def decode_scaled_models(
+    arrays: dict[str, np.ndarray],
+    raw_user_models: Mapping[int, ScoringModel],
+) -> dict[int, ScoringModel]:
+    user_models = dict()
+    for index, user_id in enumerate(arrays["user_ids"].tolist()):
+        if arrays["is_scaled"][index]:
+            user_models[user_id] = ScaledScoringModel(raw_user_models[user_id], **{
+                name: float(arrays[name][index]) for name in _SCALING_PARAMETERS
+            })
+        else:
+            user_models[user_id] = raw_user_models[user_id]
+    return user_models
+
+
+def encode_voting_rights(
+    voting_rights: VotingRights,
+    entities: pd.DataFrame,
+) -> dict[str, np.ndarray]:
+    return {
+        **encode_frame(voting_rights.to_frame(), "voting_rights"),
+        **encode_frame(entities, "entities"),
+    }
+
+
+def decode_voting_rights(arrays: dict[str, np.ndarray]) -> tuple[VotingRights, pd.DataFrame]:
+    frame = decode_frame(arrays, "voting_rights")
+    voting_rights = VotingRights.from_arrays(
+        frame["user_id"].to_numpy(), frame["entity_id"].to_numpy(), frame["voting_right"].to_numpy()
+    )
+    return voting_rights, decode_frame(arrays, "entities")
+
+
+def encode_global_model(global_model: ScoringModel) -> dict[str, np.ndarray]:
+    return {
+        f"global:{name}": array
+        for name, array in zip(("entity_id", "score", "left", "right"), global_model.to_arrays())
+    }
+
+
+def decode_global_model(arrays: dict[str, np.ndarray]) -> DirectScoringModel:
+    return DirectScoringModel.from_arrays(
+        *(arrays[f"global:{name}"] for name in ("entity_id", "score", "left", "right"))
+    )
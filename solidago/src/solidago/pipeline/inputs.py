@@ -47,6 +47,18 @@ class PipelineInput(ABC):
         """
         raise NotImplementedError
 
+    def get_new_comparisons(self, criterion: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Fetch the comparisons submitted or edited since the previous pipeline run,
+        and all the comparisons of the users who deleted comparisons since then,
+        so that the models of these users are learned again.
+
+        Returns:
+        - None if these comparisons are unknown, in which case all users' models
+          are learned again. Otherwise, a DataFrame with the same columns as
+          `get_comparisons()`.
+        """
+        return None
+
     @property
     @abstractmethod
     def ratings_properties(self) -> pd.DataFrame:
@@ -75,6 +87,7 @@ class PipelineInput(ABC):
             * `criterion`: str
             * `score`: float
             * `raw_score`: float (optional column, used to initialize preference learning)
+            * `raw_uncertainty`: float (optional column, used to reuse unchanged users' models)
         """
         raise NotImplementedError
 
@@ -110,30 +123,38 @@ class PipelineInput(ABC):
         )
         entities = pd.DataFrame(index=list(entities_ids))
 
-        privacy = PrivacySettings()
-        for rating in ratings_properties.itertuples():
-            privacy[(rating.user_id, rating.entity_id)] = not rating.is_public
-
-        judgments = DataFrameJudgments(
-            comparisons=comparisons.rename(
-                columns={
-                    "score": "comparison",
-                    "score_max": "comparison_max",
-                }
-            )
+        privacy = PrivacySettings.from_arrays(
+            ratings_properties["user_id"].to_numpy(),
+            ratings_properties["entity_id"].to_numpy(),
+            ~ratings_properties["is_public"].to_numpy(dtype=bool),
         )
 
+        comparisons_columns = {"score": "comparison", "score_max": "comparison_max"}
+        judgments = DataFrameJudgments(comparisons=comparisons.rename(columns=comparisons_columns))
+
         individual_scores = self.get_individual_scores(criterion=criterion)
         if "raw_score" in individual_scores:
+            if "raw_uncertainty" not in individual_scores:
+                individual_scores = individual_scores.assign(raw_uncertainty=0.0)
+            # The raw uncertainty is the sum of the left and right uncertainties
             init_user_models = {
-                user_id: DirectScoringModel(
-                    {row.entity_id: (row.raw_score, 0.0, 0.0) for row in user_df.itertuples()}
-                )
+                user_id: DirectScoringModel({
+                    row.entity_id: (row.raw_score, row.raw_uncertainty / 2, row.raw_uncertainty / 2)
+                    for row in user_df.itertuples()
+                })
                 for (user_id, user_df) in individual_scores.groupby("user_id")
             }
         else:
             init_user_models = None
 
+        new_comparisons = self.get_new_comparisons(criterion=criterion)
+        if init_user_models is not None and new_comparisons is not None:
+            new_judgments = DataFrameJudgments(
+                comparisons=new_comparisons.rename(columns=comparisons_columns)
+            )
+        else:
+            new_judgments = None
+
         return {
             "users": users,
             "vouches": vouches,
@@ -141,6 +162,7 @@ class PipelineInput(ABC):
             "privacy": privacy,
             "judgments": judgments,
             "init_user_models": init_user_models,
+            "new_judgments": new_judgments,
         }
 
     def get_comparisons_counts(
@@ -158,7 +180,8 @@ class PipelineInput(ABC):
                     ),
                 ]
             )
-            .groupby(["user_id", "entity_id", "criterion"])
+            # Criteria may be categorical: only the observed triples are counted
+            .groupby(["user_id", "entity_id", "criterion"], observed=True)
             .size()
             .reset_index(name="n_comparisons")
         )
@@ -7,7 +7,7 @@ import logging
 import timeit
 
 from solidago import PrivacySettings, Judgments
-from solidago.scoring_model import ScoringModel, ScaledScoringModel
+from solidago.scoring_model import ScoringModel, ScaledScoringModel, scores_frame
 
 from solidago.trust_propagation import TrustPropagation, TrustAll, LipschiTrust, NoTrustPropagation
 from solidago.preference_learning import PreferenceLearning, UniformGBT
@@ -18,6 +18,8 @@ from solidago.post_process import PostProcess, Squash, NoPostProcess
 
 from solidago.pipeline.inputs import PipelineInput
 from solidago.pipeline.outputs import PipelineOutput
+from solidago.pipeline import checkpoints as ckpt
+from solidago.pipeline.checkpoints import CheckpointStore, UnsupportedCheckpoint
 
 logger = logging.getLogger(__name__)
 
@@ -125,7 +127,8 @@ class Pipeline:
         self,
         input: PipelineInput,
         criterion: str,
-        output: Optional[PipelineOutput] = None
+        output: Optional[PipelineOutput] = None,
+        checkpoints: Optional[CheckpointStore] = None,
     ):
         """
         Executes the pipeline with the given input and criterion.
@@ -138,11 +141,14 @@ class Pipeline:
             The criterion used for the pipeline execution.
         output : Optional[PipelineOutput], optional
             The output object to store results, by default None
+        checkpoints : Optional[CheckpointStore], optional
+            Store of the stages outputs, in a subdirectory per criterion, by default None
         """
         # TODO: `criterion` should be managed by PipelineInput ?
         return self(
             **input.get_pipeline_kwargs(criterion),
             output=output,
+            checkpoints=None if checkpoints is None else checkpoints.subdirectory(criterion),
         )
 
     def __call__(
@@ -153,7 +159,9 @@ class Pipeline:
         privacy: PrivacySettings,
         judgments: Judgments,
         init_user_models : Optional[dict[int, ScoringModel]] = None,
+        new_judgments: Optional[Judgments] = None,
         output: Optional[PipelineOutput] = None,
+        checkpoints: Optional[CheckpointStore] = None,
     ) -> tuple[pd.DataFrame, VotingRights, Mapping[int, ScoringModel], ScoringModel]:
         """ Run Pipeline 
         
@@ -174,6 +182,16 @@ class Pipeline:
             judgments[user] must yield the judgment data provided by the user
         init_user_models: dict[int, ScoringModel]
             user_models[user] is the user's model
+        new_judgments: Judgments or None
+            Judgments submitted since init_user_models were learned.
+            If provided, the initial models of users without new judgments are reused,
+            and only the other users' models are learned again.
+        output: PipelineOutput or None
+            If provided, trust scores, scalings and scores are saved to output
+        checkpoints: CheckpointStore or None
+            If provided, the outputs of stages 1 to 5 are loaded from the store
+            when their inputs and configurations are unchanged since they were saved,
+            and are saved to the store otherwise.
             
         Returns
         -------
@@ -191,56 +209,132 @@ class Pipeline:
             
         logger.info("Starting the full Solidago pipeline")
         start_step1 = timeit.default_timer()
+        stage_keys = self._stage_keys(
+            checkpoints, users, vouches, entities, privacy, judgments,
+            init_user_models, new_judgments,
+        )
+        if stage_keys is None:
+            checkpoints = None
     
         logger.info(f"Pipeline 1. Propagating trust with {str(self.trust_propagation)}")
-        users = self.trust_propagation(users, vouches)
+        users = self._run_stage(
+            checkpoints, stage_keys, "trust_propagation",
+            compute=lambda: self.trust_propagation(users, vouches),
+            encode=lambda users: ckpt.encode_frame(users, "users"),
+            decode=lambda arrays: ckpt.decode_frame(arrays, "users"),
+        )
         start_step2 = timeit.default_timer()
         logger.info(f"Pipeline 1. Terminated in {np.round(start_step2 - start_step1, 2)} seconds")
         if output is not None:
             output.save_trust_scores(trusts=users)
         
         logger.info(f"Pipeline 2. Learning preferences with {str(self.preference_learning)}")
-        user_models = self.preference_learning(judgments, users, entities, init_user_models)
+        user_models = self._run_stage(
+            checkpoints, stage_keys, "preference_learning",
+            compute=lambda: self.preference_learning(
+                judgments, users, entities, init_user_models, new_judgments
+            ),
+            encode=ckpt.encode_user_models,
+            decode=ckpt.decode_user_models,
+        )
         start_step3 = timeit.default_timer()
         logger.info(f"Pipeline 2. Terminated in {np.round(start_step3 - start_step2, 2)} seconds")
         raw_scorings = user_models
             
         logger.info(f"Pipeline 3. Computing voting rights with {str(self.voting_rights)}")
-        voting_rights, entities = self.voting_rights(users, entities, vouches, privacy, user_models)
+        voting_rights, entities = self._run_stage(
+            checkpoints, stage_keys, "voting_rights",
+            compute=lambda: self.voting_rights(users, entities, vouches, privacy, user_models),
+            encode=lambda result: ckpt.encode_voting_rights(*result),
+            decode=ckpt.decode_voting_rights,
+        )
         start_step4 = timeit.default_timer()
         logger.info(f"Pipeline 3. Terminated in {np.round(start_step4 - start_step3, 2)} seconds")
         
         logger.info(f"Pipeline 4. Collaborative scaling with {str(self.scaling)}")
-        user_models = self.scaling(user_models, users, entities, voting_rights, privacy)
+        user_models = self._run_stage(
+            checkpoints, stage_keys, "scaling",
+            compute=lambda: self.scaling(user_models, users, entities, voting_rights, privacy),
+            encode=lambda scaled_models: ckpt.encode_scaled_models(scaled_models, raw_scorings),
+            decode=lambda arrays: ckpt.decode_scaled_models(arrays, raw_scorings),
+        )
         start_step5 = timeit.default_timer()
         logger.info(f"Pipeline 4. Terminated in {int(start_step5 - start_step4)} seconds")
         if output is not None:
             self.save_individual_scalings(user_models, output)
                 
         logger.info(f"Pipeline 5. Score aggregation with {str(self.aggregation)}")
-        user_models, global_model = self.aggregation(voting_rights, user_models, users, entities)
+        user_models, global_model = self._run_stage(
+            checkpoints, stage_keys, "aggregation",
+            compute=lambda: self.aggregation(voting_rights, user_models, users, entities),
+            encode=lambda result: {
+                **ckpt.encode_scaled_models(result[0], raw_scorings),
+                **ckpt.encode_global_model(result[1]),
+            },
+            decode=lambda arrays: (
+                ckpt.decode_scaled_models(arrays, raw_scorings),
+                ckpt.decode_global_model(arrays),
+            ),
+        )
         start_step6 = timeit.default_timer()
         logger.info(f"Pipeline 5. Terminated in {int(start_step6 - start_step5)} seconds")
 
         logger.info(f"Pipeline 6. Post-processing scores {str(self.post_process)}")
         user_models, global_model = self.post_process(user_models, global_model, entities)
-        end = timeit.default_timer()
+        start_step7 = end = timeit.default_timer()
         logger.info(f"Pipeline 6. Terminated in {np.round(end - start_step6, 2)} seconds")
         if output is not None:
+            logger.info(f"Pipeline 7. Saving scores with {type(output).__name__}")
             self.save_individual_scores(user_models, raw_scorings, voting_rights, output)
-            output.save_entity_scores(pd.DataFrame(
-                data=[
-                    dict(
-                        entity_id=entity_id,
-                        score=score,
-                        uncertainty=left_unc+right_unc
-                    )
-                    for (entity_id, (score, left_unc, right_unc)) in global_model.iter_entities()
-                ]
-            ))
+            entity_ids, scores, lefts, rights = global_model.to_arrays()
+            output.save_entity_scores(pd.DataFrame(dict(
+                entity_id=entity_ids,
+                score=scores,
+                uncertainty=lefts + rights,
+            )))
+            end = timeit.default_timer()
+            logger.info(f"Pipeline 7. Terminated in {np.round(end - start_step7, 2)} seconds")
         logger.info(f"Successful pipeline run, in {int(end - start_step1)} seconds")
         return users, voting_rights, user_models, global_model
         
+    def _stage_keys(
+        self,
+        checkpoints: Optional[CheckpointStore],
+        users: pd.DataFrame,
+        vouches: pd.DataFrame,
+        entities: pd.DataFrame,
+        privacy: PrivacySettings,
+        judgments: Judgments,
+        init_user_models: Optional[dict[int, ScoringModel]],
+        new_judgments: Optional[Judgments],
+    ) -> Optional[dict[str, str]]:
+        """ Returns the checkpoint keys of stages 1 to 5. Each key depends on the key
+        of the previous stage, so that a stage is run again when any upstream
+        input or configuration changes. Returns None if the inputs cannot be hashed.
+        """
+        if checkpoints is None:
+            return None
+        try:
+            key = ckpt.stage_key("", self.trust_propagation, users, vouches)
+            keys = dict(trust_propagation=key)
+            key = ckpt.stage_key(
+                key, self.preference_learning, entities, judgments, init_user_models, new_judgments
+            )
+            keys["preference_learning"] = key
+            keys["voting_rights"] = key = ckpt.stage_key(key, self.voting_rights, privacy)
+            keys["scaling"] = key = ckpt.stage_key(key, self.scaling)
+            keys["aggregation"] = ckpt.stage_key(key, self.aggregation)
+        except UnsupportedCheckpoint as error:
+            logger.warning(f"Pipeline checkpoints are disabled: {error}")
+            return None
+        return keys
+
+    @staticmethod
+    def _run_stage(checkpoints, stage_keys, stage, compute, encode, decode):
+        if checkpoints is None:
+            return compute()
+        return checkpoints.run_stage(stage, stage_keys[stage], compute, encode, decode)
+
     def to_json(self):
         return dict(
             trust_propagation=self.trust_propagation.to_json(),
@@ -280,22 +374,22 @@ class Pipeline:
         voting_rights: VotingRights,
         output: PipelineOutput,
     ):
-        scores_df = pd.DataFrame(
-            data=[
-                dict(
-                    user_id=user_id,
-                    entity_id=entity_id,
-                    score=score,
-                    uncertainty=left_unc+right_unc,
-                    voting_right=voting_rights[user_id, entity_id],
-                    raw_score=raw_scoring[0],
-                    raw_uncertainty=raw_scoring[1] + raw_scoring[2]
-                )
-                for (user_id, scoring) in user_scorings.items()
-                for (entity_id, (score, left_unc, right_unc)) in scoring.iter_entities()
-                if (raw_scoring := raw_user_scorings[user_id](entity_id)) is not None
-            ]
+        # Only the entities which are also scored by the raw models are saved
+        scores = scores_frame(user_scorings).merge(
+            scores_frame({ user_id: raw_user_scorings[user_id] for user_id in user_scorings }),
+            on=["user_id", "entity_id"],
+            suffixes=("", "_raw"),
         )
+        user_ids, entity_ids = scores["user_id"].to_numpy(), scores["entity_id"].to_numpy()
+        scores_df = pd.DataFrame(dict(
+            user_id=user_ids,
+            entity_id=entity_ids,
+            score=scores["scores"],
+            uncertainty=scores["left_uncertainties"] + scores["right_uncertainties"],
+            voting_right=np.nan_to_num(voting_rights.get_many(user_ids, entity_ids)),
+            raw_score=scores["scores_raw"],
+            raw_uncertainty=scores["left_uncertainties_raw"] + scores["right_uncertainties_raw"],
+        ))
 
         if len(scores_df) > 0:
             output.save_individual_scores(scores_df)
@@ -351,16 +445,8 @@ def post_process_from_json(json):
     
 
 def get_scorings_as_df(user_models: dict[int, ScoringModel]):
-    return pd.DataFrame(
-        data=[
-            dict(
-                user_id=user_id,
-                entity_id=entity_id,
-                score=score,
-                uncertainty_left=left_unc,
-                uncertainty_right=right_unc,
-            )
-            for (user_id, scoring) in user_models.items()
-            for (entity_id, (score, left_unc, right_unc)) in scoring.iter_entities()
-        ]
-    )
+    return scores_frame(user_models).rename(columns={
+        "scores": "score",
+        "left_uncertainties": "uncertainty_left",
+        "right_uncertainties": "uncertainty_right",
+    })
@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 import logging
+import zlib
 
 from solidago.judgments import Judgments
-from solidago.scoring_model import ScoringModel
+from solidago.scoring_model import ScoringModel, DirectScoringModel, scores_frame
 
 
 logger = logging.getLogger(__name__)
@@ -13,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 class PreferenceLearning(ABC):
     MAX_UNCERTAINTY = 1000.0
+    # Number of worker processes among which users are sharded.
+    # Users' models are learned sequentially in the current process if n_jobs <= 1.
+    n_jobs: int = 1
 
     def __call__(
         self,
@@ -36,8 +43,12 @@ class PreferenceLearning(ABC):
             Starting models, added to facilitate optimization
             It is not supposed to affect the output of the training
         new_judgments:
-            New judgments
-            This allows to prioritize coordinate descent, starting with newly evaluated entities
+            Judgments submitted since the initialization was learned
+            This allows to prioritize coordinate descent, starting with newly evaluated entities.
+            Moreover, the initial model of a user without new judgments is then reused as is,
+            unless the user's judgments no longer involve the same entities.
+            The judgments of a user who deleted judgments must all be included,
+            as their deletion may leave the judged entities unchanged.
 
         Returns
         -------
@@ -47,21 +58,84 @@ class PreferenceLearning(ABC):
         assert isinstance(judgments, Judgments)
 
         user_models = dict() if initialization is None else initialization
-        for n_user, user in enumerate(users.index):
-            if n_user % 100 == 0:
-                logger.info(f"  Preference learning for user {n_user} out of {len(users)}")
-            else:
-                logger.debug(f"  Preference learning for user {n_user} out of {len(users)}")
-            init_model = None
-            if initialization is not None:
-                init_model = initialization.get(user)
-            new_judg = None if new_judgments is None else new_judgments[user]
+        tasks, n_reused = list(), 0
+        for user in users.index:
             user_judgments = judgments[user]
             if user_judgments is None:
                 continue
-            user_models[user] = self.user_learn(user_judgments, entities, init_model, new_judg)
+            init_model = None if initialization is None else initialization.get(user)
+            new_judg = None if new_judgments is None else new_judgments[user]
+            if new_judgments is not None and new_judg is None and init_model is not None:
+                if self.is_up_to_date(init_model, user_judgments):
+                    n_reused += 1
+                    continue
+            tasks.append((user, user_judgments, init_model, new_judg))
+
+        if n_reused > 0:
+            logger.info(f"  Reusing the models of {n_reused} users without new judgments")
+
+        if self.n_jobs <= 1 or len(tasks) <= 1:
+            user_models |= self._learn_shard(tasks, entities, len(users))
+            return user_models
+
+        n_shards = min(len(tasks), 4 * self.n_jobs)
+        shards = [list(shard) for shard in np.array_split(np.arange(len(tasks)), n_shards)]
+        logger.info(f"  Preference learning for {len(tasks)} users in {n_shards} shards")
+        with ProcessPoolExecutor(
+            max_workers=self.n_jobs,
+            initializer=_init_worker,
+            initargs=(self, entities),
+        ) as executor:
+            results = executor.map(
+                _learn_shard_in_worker,
+                ([tasks[index] for index in shard] for shard in shards),
+            )
+            # Shards are collected in order, so that user_models do not depend on n_jobs
+            for n_shard, shard_arrays in enumerate(results):
+                logger.info(f"  Preference learning for shard {n_shard + 1} out of {n_shards}")
+                user_models |= _models_from_arrays(*shard_arrays)
+        return user_models
+
+    def _learn_shard(
+        self,
+        tasks: list[tuple[int, dict, Optional[ScoringModel], Optional[dict]]],
+        entities: pd.DataFrame,
+        n_users: int,
+    ) -> dict[int, ScoringModel]:
+        """ Learns the models of a list of users.
+        Each user's learning is seeded by the user id, so that the learned models
+        do not depend on how users are sharded between processes.
+        The state of numpy's global random generator is restored afterwards.
+        """
+        user_models = dict()
+        random_state = np.random.get_state()
+        try:
+            for n_user, (user, user_judgments, init_model, new_judg) in enumerate(tasks):
+                if n_user % 100 == 0:
+                    logger.info(f"  Preference learning for user {n_user} out of {n_users}")
+                else:
+                    logger.debug(f"  Preference learning for user {n_user} out of {n_users}")
+                np.random.seed(zlib.crc32(str(user).encode()))
+                user_models[user] = self.user_learn(user_judgments, entities, init_model, new_judg)
+        finally:
+            np.random.set_state(random_state)
         return user_models
 
+    def is_up_to_date(self, model: ScoringModel, user_judgments: dict[str, pd.DataFrame]) -> bool:
+        """ Whether a previously learned model can be reused as is, for a user without
+        new judgments. This is a safeguard against judgments deleted since the model
+        was learned, detected only if they no longer involve the same entities as the
+        model: the users who deleted judgments are expected among `new_judgments`.
+        """
+        judged_entities = set()
+        comparisons = user_judgments.get("comparisons")
+        if comparisons is not None:
+            judged_entities |= set(comparisons["entity_a"]) | set(comparisons["entity_b"])
+        assessments = user_judgments.get("assessments")
+        if assessments is not None:
+            judged_entities |= set(assessments["entity_id"])
+        return judged_entities == set(model.scored_entities())
+
     @abstractmethod
     def user_learn(
         self,
@@ -98,3 +172,53 @@ class PreferenceLearning(ABC):
 
     def __str__(self):
         return type(self).__name__
+
+    def __getstate__(self):
+        # Cached properties typically hold jitted functions,
+        # which are rather compiled once in each worker process
+        return {
+            key: value for key, value in self.__dict__.items()
+            if not isinstance(getattr(type(self), key, None), cached_property)
+        }
+
+
+_worker_preference_learning: Optional[PreferenceLearning] = None
+_worker_entities: Optional[pd.DataFrame] = None
+
+
+def _init_worker(preference_learning: PreferenceLearning, entities: pd.DataFrame):
+    global _worker_preference_learning, _worker_entities
+    _worker_preference_learning = preference_learning
+    _worker_entities = entities
+
+
+def _learn_shard_in_worker(
+    tasks: list[tuple[int, dict, Optional[ScoringModel], Optional[dict]]]
+) -> tuple[list[int], np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Learns the models of a shard of users, and returns them as flat arrays
+    (user ids, entity ids, scores, left uncertainties, right uncertainties),
+    which are much cheaper to send back to the main process than scoring models.
+    """
+    assert _worker_preference_learning is not None
+    user_models = _worker_preference_learning._learn_shard(tasks, _worker_entities, len(tasks))
+    scores = scores_frame(user_models)
+    return list(user_models), *(scores[column].to_numpy() for column in scores.columns)
+
+
+def _models_from_arrays(
+    users: list[int],
+    user_ids: np.ndarray,
+    entity_ids: np.ndarray,
+    scores: np.ndarray,
+    lefts: np.ndarray,
+    rights: np.ndarray,
+) -> dict[int, DirectScoringModel]:
+    # Each user's rows are contiguous, as they are gathered model by model
+    user_models = { user: DirectScoringModel() for user in users }
+    boundaries = np.flatnonzero(user_ids[1:] != user_ids[:-1]) + 1
+    for start, end in zip(np.append(0, boundaries), np.append(boundaries, len(user_ids))):
+        if end > start:
+            user_models[user_ids[start]] = DirectScoringModel.from_arrays(
+                entity_ids[start:end], scores[start:end], lefts[start:end], rights[start:end]
+            )
+    return user_models
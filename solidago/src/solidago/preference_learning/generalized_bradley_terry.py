@@ -19,6 +19,7 @@ class GeneralizedBradleyTerry(ComparisonBasedPreferenceLearning):
         prior_std_dev: float=7.0,
         convergence_error: float=1e-5,
         high_likelihood_range_threshold = 1.0,
+        n_jobs: int = 1,
     ):
         """
         
@@ -28,10 +29,13 @@ class GeneralizedBradleyTerry(ComparisonBasedPreferenceLearning):
             previously computed entity scores
         error: float
             tolerated error
+        n_jobs: int
+            Number of worker processes used to learn users' models in parallel
         """
         self.prior_std_dev = prior_std_dev
         self.convergence_error = convergence_error
         self.high_likelihood_range_threshold = high_likelihood_range_threshold
+        self.n_jobs = n_jobs
 
     @property
     @abstractmethod
@@ -112,7 +116,7 @@ class GeneralizedBradleyTerry(ComparisonBasedPreferenceLearning):
         entities: DataFrame
             This parameter is not used
         """
-        entities = list(set(comparisons["entity_a"]) | set(comparisons["entity_b"]))
+        entities = sorted(set(comparisons["entity_a"]) | set(comparisons["entity_b"]))
         entity_coordinates = { entity: c for c, entity in enumerate(entities) }
 
         comparisons_dict = self.comparisons_dict(comparisons, entity_coordinates)
@@ -143,77 +147,50 @@ class GeneralizedBradleyTerry(ComparisonBasedPreferenceLearning):
             error=self.convergence_error,
         )
 
-        comparisons = comparisons.assign(
-            entity_a_coord=comparisons["entity_a"].map(entity_coordinates),
-            entity_b_coord=comparisons['entity_b'].map(entity_coordinates),
-        )
-        score_diff = solution[comparisons["entity_a_coord"]] - solution[comparisons["entity_b_coord"]]
+        entity_a_coords = comparisons["entity_a"].map(entity_coordinates).to_numpy()
+        entity_b_coords = comparisons["entity_b"].map(entity_coordinates).to_numpy()
+        score_diff = solution[entity_a_coords] - solution[entity_b_coords]
         r_actual = (comparisons["comparison"] / comparisons["comparison_max"]).to_numpy()
 
-        uncertainties_left = np.empty_like(solution)
-        uncertainties_right = np.empty_like(solution)
-        ll_actual = self.log_likelihood_function(score_diff, r_actual)
-
-        for coordinate in range(len(solution)):
-            comparison_indicator = (
-                (comparisons["entity_a_coord"] == coordinate).astype(int)
-                - (comparisons["entity_b_coord"] == coordinate).astype(int)
-            ).to_numpy()
-            try:
-                uncertainties_left[coordinate] = -1 * njit_brentq(
-                    self.translated_negative_log_likelihood,
-                    args=(score_diff, r_actual, comparison_indicator, ll_actual),
-                    xtol=1e-2,
-                    a=-self.MAX_UNCERTAINTY,
-                    b=0.0,
-                    extend_bounds="no",
-                )
-            except ValueError:
-                uncertainties_left[coordinate] = self.MAX_UNCERTAINTY
-
-            try:
-                uncertainties_right[coordinate] = njit_brentq(
-                    self.translated_negative_log_likelihood,
-                    args=(score_diff, r_actual, comparison_indicator, ll_actual),
-                    xtol=1e-2,
-                    a=0.0,
-                    b=self.MAX_UNCERTAINTY,
-                    extend_bounds="no",
-                )
-            except ValueError:
-                uncertainties_right[coordinate] = self.MAX_UNCERTAINTY
+        uncertainties_left, uncertainties_right = _coordinate_uncertainties(
+            self.translated_negative_log_likelihood,
+            self.log_likelihood_function,
+            entity_a_coords,
+            entity_b_coords,
+            score_diff,
+            r_actual,
+            len(solution),
+            self.MAX_UNCERTAINTY,
+        )
 
-        model = DirectScoringModel()
-        for coord in range(len(solution)):
-            model[entities[coord]] = solution[coord], uncertainties_left[coord], uncertainties_right[coord]
-        return model
+        return DirectScoringModel.from_arrays(
+            np.array(entities), solution, uncertainties_left, uncertainties_right
+        )
 
     def comparisons_dict(self, comparisons, entity_coordinates) -> dict[int, tuple[npt.NDArray, npt.NDArray]]:
-        comparisons = comparisons[["entity_a","entity_b","comparison", "comparison_max"]]
-        comparisons_sym = pd.concat(
-            [
-                comparisons,
-                 pd.DataFrame(
-                    {
-                        "entity_a": comparisons.entity_b,
-                        "entity_b": comparisons.entity_a,
-                        "comparison": -1 * comparisons.comparison,
-                        "comparison_max": comparisons.comparison_max,
-                    }
-                ),
-            ]
-        )
-        comparisons_sym.entity_a = comparisons_sym.entity_a.map(entity_coordinates)
-        comparisons_sym.entity_b = comparisons_sym.entity_b.map(entity_coordinates)
-        comparisons_sym.comparison = -1 * np.where(
-            np.isfinite(comparisons_sym.comparison_max),
-            comparisons_sym.comparison / comparisons_sym.comparison_max,
-            comparisons_sym.comparison
+        """ Gathers, for each entity coordinate, the coordinates of the entities it was
+        compared to, and the normalized comparison values from the viewpoint of these entities.
+        Comparisons are symmetrized, and grouped by coordinate with a stable sort.
+        """
+        entity_a_coords = comparisons["entity_a"].map(entity_coordinates).to_numpy()
+        entity_b_coords = comparisons["entity_b"].map(entity_coordinates).to_numpy()
+        comparison = comparisons["comparison"].to_numpy(dtype=np.float64)
+        comparison_max = comparisons["comparison_max"].to_numpy(dtype=np.float64)
+        normalized = np.where(
+            np.isfinite(comparison_max), comparison / comparison_max, comparison
         )
+
+        coords = np.concatenate([entity_a_coords, entity_b_coords])
+        other_coords = np.concatenate([entity_b_coords, entity_a_coords])
+        values = np.concatenate([-normalized, normalized])
+        order = np.argsort(coords, kind="stable")
+        coords, other_coords, values = coords[order], other_coords[order], values[order]
+        unique_coords, starts = np.unique(coords, return_index=True)
+        ends = np.append(starts[1:], len(coords))
         return {
-            coord: (group["entity_b"].to_numpy(),  group["comparison"].to_numpy())
-            for (coord, group) in comparisons_sym.groupby("entity_a")
-        }  # type: ignore
+            coord: (other_coords[start:end], values[start:end])
+            for coord, start, end in zip(unique_coords.tolist(), starts, ends)
+        }
 
     @cached_property
     def partial_derivative(self):
@@ -243,6 +220,83 @@ class GeneralizedBradleyTerry(ComparisonBasedPreferenceLearning):
         return njit_partial_derivative
 
 
+@njit
+def _coordinate_uncertainties(
+    translated_negative_log_likelihood,
+    log_likelihood_function,
+    entity_a_coords: npt.NDArray,
+    entity_b_coords: npt.NDArray,
+    score_diff: npt.NDArray,
+    r_actual: npt.NDArray,
+    n_coordinates: int,
+    max_uncertainty: float,
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """ Computes the left and right uncertainties of all coordinates.
+    Moving a coordinate only modifies the likelihood of the comparisons
+    which involve it. Each coordinate's root-finding is thus restricted
+    to these comparisons, which are gathered once by a counting sort.
+    """
+    n_comparisons = len(entity_a_coords)
+    indptr = np.zeros(n_coordinates + 1, dtype=np.int64)
+    for i in range(n_comparisons):
+        indptr[entity_a_coords[i] + 1] += 1
+        if entity_b_coords[i] != entity_a_coords[i]:
+            indptr[entity_b_coords[i] + 1] += 1
+    indptr = np.cumsum(indptr)
+
+    comparison_indices = np.empty(indptr[-1], dtype=np.int64)
+    next_index = indptr[:-1].copy()
+    for i in range(n_comparisons):
+        comparison_indices[next_index[entity_a_coords[i]]] = i
+        next_index[entity_a_coords[i]] += 1
+        if entity_b_coords[i] != entity_a_coords[i]:
+            comparison_indices[next_index[entity_b_coords[i]]] = i
+            next_index[entity_b_coords[i]] += 1
+
+    uncertainties_left = np.empty(n_coordinates)
+    uncertainties_right = np.empty(n_coordinates)
+    for coordinate in range(n_coordinates):
+        indices = comparison_indices[indptr[coordinate]:indptr[coordinate + 1]]
+        theta_diff = score_diff[indices]
+        r = r_actual[indices]
+        comparison_indicator = (
+            (entity_a_coords[indices] == coordinate).astype(np.int64)
+            - (entity_b_coords[indices] == coordinate).astype(np.int64)
+        )
+        args = (theta_diff, r, comparison_indicator, log_likelihood_function(theta_diff, r))
+
+        # Without a sign change on the interval, uncertainty is considered maximal
+        f_min = translated_negative_log_likelihood(-max_uncertainty, *args)
+        f_zero = translated_negative_log_likelihood(0.0, *args)
+        f_max = translated_negative_log_likelihood(max_uncertainty, *args)
+
+        if f_min * f_zero > 0:
+            uncertainties_left[coordinate] = max_uncertainty
+        else:
+            uncertainties_left[coordinate] = -1 * njit_brentq(
+                translated_negative_log_likelihood,
+                args=args,
+                xtol=1e-2,
+                a=-max_uncertainty,
+                b=0.0,
+                extend_bounds="no",
+            )
+
+        if f_zero * f_max > 0:
+            uncertainties_right[coordinate] = max_uncertainty
+        else:
+            uncertainties_right[coordinate] = njit_brentq(
+                translated_negative_log_likelihood,
+                args=args,
+                xtol=1e-2,
+                a=0.0,
+                b=max_uncertainty,
+                extend_bounds="no",
+            )
+
+    return uncertainties_left, uncertainties_right
+
+
 class UniformGBT(GeneralizedBradleyTerry):
     def __init__(
         self,
@@ -250,6 +304,7 @@ class UniformGBT(GeneralizedBradleyTerry):
         convergence_error: float = 1e-5,
         cumulant_generating_function_error: float = 1e-5,
         high_likelihood_range_threshold: float = 1.0,
+        n_jobs: int = 1,
     ):
         """
 
@@ -259,7 +314,8 @@ class UniformGBT(GeneralizedBradleyTerry):
         super().__init__(
             prior_std_dev,
             convergence_error,
-            high_likelihood_range_threshold=high_likelihood_range_threshold
+            high_likelihood_range_threshold=high_likelihood_range_threshold,
+            n_jobs=n_jobs,
         )
         self.cumulant_generating_function_error = cumulant_generating_function_error
 
@@ -2,7 +2,7 @@ from typing import Union, Optional
 
 import numpy as np
 import numpy.typing as npt
-from numba import njit
+from numba import njit, prange
 
 from solidago.solvers.optimize import njit_brentq as brentq
 
@@ -245,6 +245,81 @@ def qr_uncertainty(
         right_uncertainties, default_dev, error, median)
 
 
+@njit
+def grouped_qr_quantile_and_uncertainty(
+    lipschitz: float,
+    quantile: float,
+    values: npt.NDArray,
+    voting_rights: npt.NDArray,
+    left_uncertainties: npt.NDArray,
+    right_uncertainties: npt.NDArray,
+    group_indptr: npt.NDArray,
+    default_value: float = 0.0,
+    default_dev: float = 1.0,
+    error: float = 1e-5,
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """ Computes the [qr_quantile][solidago.primitives.qr_quantile] and the
+    [qr_uncertainty][solidago.primitives.qr_uncertainty] of many groups of values
+    in a single call. Groups are solved independently, and in parallel threads
+    with `parallel_grouped_qr_quantile_and_uncertainty`.
+    
+    Parameters
+    ----------
+    lipschitz: float
+        Resilience parameters. Larger values are more resilient, but less accurate. 
+    quantile: float
+        Between 0 and 1.
+    values: npt.NDArray
+        Values of all groups, sorted by group
+    voting_rights: npt.NDArray
+        Voting rights, aligned with values
+    left_uncertainties: npt.NDArray
+        Left uncertainties, aligned with values
+    right_uncertainties: npt.NDArray
+        Right uncertainties, aligned with values
+    group_indptr: npt.NDArray
+        The values of group g are values[group_indptr[g]:group_indptr[g+1]]
+    default_value: float
+        Default quantile in the absence of data
+    default_dev: float
+        Default uncertainty in the absence of data
+    error: float
+        Approximation error
+    
+    Returns
+    --------
+    quantiles: npt.NDArray
+        quantiles[g] is the qr_quantile of group g
+    uncertainties: npt.NDArray
+        uncertainties[g] is the qr_uncertainty of group g
+    """
+    n_groups = len(group_indptr) - 1
+    quantiles, uncertainties = np.empty(n_groups), np.empty(n_groups)
+    for group in prange(n_groups):
+        start, end = group_indptr[group], group_indptr[group + 1]
+        group_values = values[start:end]
+        group_voting_rights = voting_rights[start:end]
+        group_lefts = left_uncertainties[start:end]
+        group_rights = right_uncertainties[start:end]
+        quantiles[group] = qr_quantile(lipschitz, quantile, group_values, group_voting_rights,
+            group_lefts, group_rights, default_value, error)
+        # The quantile is the median needed by qr_uncertainty if quantile == 0.5
+        if quantile == 0.5:
+            uncertainties[group] = qr_uncertainty(lipschitz, group_values, group_voting_rights,
+                group_lefts, group_rights, default_dev, error, quantiles[group])
+        else:
+            uncertainties[group] = qr_uncertainty(lipschitz, group_values, group_voting_rights,
+                group_lefts, group_rights, default_dev, error, None)
+    return quantiles, uncertainties
+
+
+# Compiled on first use only. Note that with numba's TBB threading layer,
+# processes which use it cannot safely fork worker processes afterwards.
+parallel_grouped_qr_quantile_and_uncertainty = njit(parallel=True)(
+    grouped_qr_quantile_and_uncertainty.py_func
+)
+
+
 @njit
 def clip(values: np.ndarray, center: float, radius: float):
     return values.clip(center - radius, center + radius)
@@ -1,53 +1,33 @@
 from typing import Optional
 
-class PrivacySettings:
-    def __init__(self, dct=None):
-        self._dict = dict() if dct is None else dct
-        
-    def __getitem__(self, user_entity_tuple: tuple[int, int]) -> Optional[bool]:
-        """ Returns the user's privacy setting for a given entity.  
-        
-        Parameters
-        ----------
-        user_entity_tuple:
-            (user_id, entity_id)
-        
-        Returns
-        -------
-        Optional[bool]
-            True (private), False (public) or None (undefined)
+import numpy as np
+
+from solidago.user_entity_table import UserEntityTable
+
+
+class PrivacySettings(UserEntityTable):
+    """ Privacy settings of users on entities, stored column-wise.
+    self[user, entity] is True (private), False (public) or None (undefined),
+    and setting it to None deletes the user's privacy setting for the entity.
+    """
+    value_name = "is_private"
+    default_value = None
+
+    def __init__(self, dct: Optional[dict[int, dict[int, bool]]] = None):
         """
-        user, entity = user_entity_tuple
-        entity_settings = self._dict.get(entity)
-        if entity_settings is None:
-            return None
-        return entity_settings.get(user)
-    
-    def __setitem__(self, user_entity_tuple: tuple[int, int], is_private: Optional[bool]):
-        """ Store the user's privacy setting for a given entity.
-        
         Parameters
         ----------
-        user_entity_tuple:
-            (user_id, entity_id)
-        is_private:
-            True (private), False (public) or None (undefined)
+        dct: dict[int, dict[int, bool]]
+            dct[entity][user] is the privacy setting of user for entity
         """
-        user, entity = user_entity_tuple
-        if is_private is None:
-            self._dict[entity].pop(user, None)
-            return
-        self._dict.setdefault(entity, {})[user] = is_private
-
-    def entities(self, user: Optional[int] = None) -> set[int]:
-        if user is None:
-            return set(self._dict.keys())
-        return { e for e in self._dict if user in self._dict[e] }
-
-    def users(self, entity: Optional[int] = None) -> set[int]:
-        if entity is None:
-            return set().union(*(self.users(e) for e in self.entities()))
-        return set(self._dict.get(entity, {}).keys())
+        super().__init__(dct)
+
+    @staticmethod
+    def _decode(values: np.ndarray) -> list[bool]:
+        return values.astype(bool).tolist()
+
+    def to_frame(self):
+        return super().to_frame().astype({ self.value_name: bool })
 
     def __str__(self):
         return "{\n    " + ",\n    ".join([
@@ -57,4 +37,3 @@ class PrivacySettings:
             ]) + "\n    }"
             for user in self.users()
         ]) + "\n}"
-        
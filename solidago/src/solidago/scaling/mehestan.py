@@ -1,10 +1,16 @@
-from typing import Callable, Mapping, Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping, Optional
 
 import numpy as np
 import pandas as pd
 
+import itertools
 import logging
+import os
+import tempfile
 import timeit
+import zlib
 
 from .base import Scaling
 from .no_scaling import NoScaling
@@ -31,6 +37,8 @@ class Mehestan(Scaling):
         p_norm_for_multiplicative_resilience: float = 4.0,
         n_diffs_sample_max: int = 1000,
         error: float = 1e-5,
+        random_seed: Optional[int] = None,
+        n_jobs: int = 1,
     ):
         """ Mehestan performs Lipschitz-resilient ollaborative scaling.
         
@@ -57,8 +65,16 @@ class Mehestan(Scaling):
             when the model scores of a user are large.
             The infinite norm may be to sensitive to extreme values,
             thus we propose to use an l_p norm.
+        n_diffs_sample_max: int
+            Maximal number of pairs of entities sampled to compare two users,
+            when there are more than 100 entities
         error: float
             Error bound
+        random_seed: int, optional
+            Seed of the sampling of pairs of entities, for reproducibility
+        n_jobs: int
+            Number of worker processes among which scalees are sharded,
+            to solve their multiplicators and translations in parallel
         """
         self.lipschitz = lipschitz
         self.min_activity = min_activity
@@ -68,6 +84,8 @@ class Mehestan(Scaling):
         self.p_norm_for_multiplicative_resilience = p_norm_for_multiplicative_resilience
         self.n_diffs_sample_max = n_diffs_sample_max
         self.error = error
+        self.random_seed = random_seed
+        self.n_jobs = n_jobs
 
     def __call__(
         self, 
@@ -175,38 +193,18 @@ class Mehestan(Scaling):
     def scale_scalers(self, user_models, scalers, entities, privacy):
         start = timeit.default_timer()
         model_norms = self.compute_model_norms(user_models, scalers, entities, privacy)
+        scaler_matrix = _ScoreMatrix.from_models(user_models, entities, privacy)
+        scalee_scores = {
+            user: scaler_matrix.user_scores(row) for row, user in enumerate(scaler_matrix.users)
+        }
         end2a = timeit.default_timer()
-        logger.info(f"    Mehestan 2a. Model norms in {int(end2a - start)} seconds")
-
-        entity_ratios = self.compute_entity_ratios(user_models, user_models, entities, privacy)
-        end2b = timeit.default_timer()
-        logger.info(f"    Mehestan 2b. Entity ratios in {int(end2b - end2a)} seconds")
-        ratio_voting_rights, ratios, ratio_uncertainties = _aggregate_user_comparisons(
-            scalers, entity_ratios, 
-            error=self.error, lipschitz=self.user_comparison_lipschitz
-        )
-        end2c = timeit.default_timer()
-        logger.info(f"    Mehestan 2c. Aggregate ratios in {int(end2c - end2b)} seconds")
-        multiplicators = self.compute_multiplicators(
-            ratio_voting_rights, ratios, ratio_uncertainties, model_norms
-        )
-        end2d = timeit.default_timer()
-        logger.info(f"    Mehestan 2d. Multiplicators in {int(end2d - end2c)} seconds")
+        logger.info(f"    Mehestan 2a. Model norms and score matrix in {end2a - start:.1f} seconds")
 
-        entity_diffs = self.compute_entity_diffs(
-            user_models, user_models, entities, privacy, multiplicators
-        )
-        end2e = timeit.default_timer()
-        logger.info(f"    Mehestan 2e. Entity diffs in {int(end2e - end2d)} seconds")
-        diff_voting_rights, diffs, diff_uncertainties = _aggregate_user_comparisons(
-            scalers, entity_diffs, 
-            error=self.error, lipschitz=self.user_comparison_lipschitz
-        )
-        end2f = timeit.default_timer()
-        logger.info(f"    Mehestan 2f. Aggregate diffs in {int(end2f - end2e)} seconds")
-        translations = self.compute_translations(diff_voting_rights, diffs, diff_uncertainties)
-        end2g = timeit.default_timer()
-        logger.info(f"    Mehestan 2g. Translations in {int(end2g - end2f)} seconds")
+        with self._executor(scaler_matrix, scalers, len(entities)) as executor:
+            multiplicators = self._solve_scalees(executor, "2", _shard_multiplicators,
+                scalee_scores, scaler_matrix, scalers, len(entities), model_norms)
+            translations = self._solve_scalees(executor, "2", _shard_translations,
+                scalee_scores, scaler_matrix, scalers, len(entities), multiplicators)
 
         return { 
             u: ScaledScoringModel(
@@ -225,40 +223,20 @@ class Mehestan(Scaling):
     ):
         start = timeit.default_timer()
         model_norms = self.compute_model_norms(user_models, nonscalers, entities, privacy)
-        end2a = timeit.default_timer()
-        logger.info(f"    Mehestan 3a. Model norms in {int(end2a - start)} seconds")
-
-        end3a = timeit.default_timer()
         nonscaler_models = {u: m for (u, m) in user_models.items() if u in nonscalers.index}
-        entity_ratios = self.compute_entity_ratios(
-            nonscaler_models, scaled_models, entities, privacy
-        )
-        end3b = timeit.default_timer()
-        logger.info(f"    Mehestan 3b. Entity ratios in {int(end3b - end3a)} seconds")
-        ratio_voting_rights, ratios, ratio_uncertainties = _aggregate_user_comparisons(
-            scalers, entity_ratios, error=self.error, lipschitz=self.user_comparison_lipschitz
-        )
-        end3c = timeit.default_timer()
-        logger.info(f"    Mehestan 3c. Aggregate ratios in {int(end3c - end3b)} seconds")
-        multiplicators = self.compute_multiplicators(
-            ratio_voting_rights, ratios, ratio_uncertainties, model_norms
-        )
-        end3d = timeit.default_timer()
-        logger.info(f"    Mehestan 3d. Multiplicators in {int(end3d - end3c)} seconds")
+        scaler_matrix = _ScoreMatrix.from_models(scaled_models, entities, privacy)
+        scalee_scores = {
+            user: _user_scores(user, model, entities, privacy)
+            for user, model in nonscaler_models.items()
+        }
+        end3a = timeit.default_timer()
+        logger.info(f"    Mehestan 3a. Model norms and score matrix in {end3a - start:.1f} seconds")
 
-        entity_diffs = self.compute_entity_diffs(
-            nonscaler_models, scaled_models, entities, privacy, multiplicators
-        )
-        end3e = timeit.default_timer()
-        logger.info(f"    Mehestan 3e. Entity diffs in {int(end3e - end3d)} seconds")
-        diff_voting_rights, diffs, diff_uncertainties = _aggregate_user_comparisons(
-            scalers, entity_diffs, error=self.error, lipschitz=self.user_comparison_lipschitz
-        )
-        end3f = timeit.default_timer()
-        logger.info(f"    Mehestan 3f. Aggregate diffs in {int(end3f - end3e)} seconds")
-        translations = self.compute_translations(diff_voting_rights, diffs, diff_uncertainties)
-        end3g = timeit.default_timer()
-        logger.info(f"    Mehestan 3g. Translations in {int(end3g - end3f)} seconds")
+        with self._executor(scaler_matrix, scalers, len(entities)) as executor:
+            multiplicators = self._solve_scalees(executor, "3", _shard_multiplicators,
+                scalee_scores, scaler_matrix, scalers, len(entities), model_norms)
+            translations = self._solve_scalees(executor, "3", _shard_translations,
+                scalee_scores, scaler_matrix, scalers, len(entities), multiplicators)
 
         return scaled_models | {
             u: ScaledScoringModel(
@@ -273,6 +251,96 @@ class Mehestan(Scaling):
             for u, model in nonscaler_models.items()
         }
 
+    ############################################
+    ##  Per-scalee solves, possibly in        ##
+    ##  parallel worker processes             ##
+    ############################################
+
+    @contextmanager
+    def _executor(
+        self, 
+        scaler_matrix: "_ScoreMatrix", 
+        scalers: pd.DataFrame, 
+        n_entities: int,
+    ) -> Iterator[Optional[ProcessPoolExecutor]]:
+        """ Yields a pool of worker processes if n_jobs > 1, and None otherwise.
+        The scaler score matrix is saved to temporary files, which workers memory-map
+        read-only, rather than receiving a pickled copy of it with each shard.
+        """
+        if self.n_jobs <= 1:
+            yield None
+            return
+        with tempfile.TemporaryDirectory(prefix="mehestan_") as directory:
+            scaler_matrix.save(directory)
+            with ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self, directory, scaler_matrix.users, scalers, n_entities),
+            ) as executor:
+                yield executor
+
+    def _solve_scalees(
+        self,
+        executor: Optional[ProcessPoolExecutor],
+        step: str,
+        shard_function: Callable[..., tuple[dict[int, tuple[float, float]], list[float]]],
+        scalee_scores: dict[int, tuple],
+        scaler_matrix: "_ScoreMatrix",
+        scalers: pd.DataFrame,
+        n_entities: int,
+        parameters: dict[int, Any],
+    ) -> dict[int, tuple[float, float]]:
+        """ Solves the multiplicators or the translations of all scalees,
+        and logs the time spent in each phase of the solve.
+
+        Parameters
+        ----------
+        executor: ProcessPoolExecutor or None
+            If given, scalees are sharded among its workers
+        step: str
+            Step of Mehestan, used in logs
+        shard_function: callable
+            Either `_shard_multiplicators` or `_shard_translations`
+        parameters: dict[int, Any]
+            Model norms for multiplicators, multiplicators for translations
+        """
+        start = timeit.default_timer()
+        if executor is None or len(scalee_scores) <= 1:
+            results, durations = shard_function(
+                self, scalee_scores, scaler_matrix, scalers, n_entities, parameters
+            )
+            parallel_note = ""
+        else:
+            scalees = list(scalee_scores)
+            n_shards = min(len(scalees), 4 * self.n_jobs)
+            shards = [
+                [scalees[index] for index in shard] 
+                for shard in np.array_split(np.arange(len(scalees)), n_shards)
+            ]
+            # Translations of scalees also depend on the multiplicators of scalers
+            shared = { u: parameters[u] for u in scaler_matrix.users if u in parameters }
+            shard_results = executor.map(
+                _solve_shard_in_worker,
+                itertools.repeat(shard_function),
+                ({ u: scalee_scores[u] for u in shard } for shard in shards),
+                (shared | { u: parameters[u] for u in shard if u in parameters } for shard in shards),
+            )
+            results, durations = dict(), np.zeros(3)
+            # Shards are collected in order, so that results do not depend on n_jobs
+            for shard_result, shard_durations in shard_results:
+                results |= shard_result
+                durations += shard_durations
+            parallel_note = " (summed over workers)"
+
+        for (letter, phase), duration in zip(_SHARD_PHASES[shard_function], durations):
+            logger.info(f"    Mehestan {step}{letter}. {phase} in {duration:.1f} seconds{parallel_note}")
+        if executor is not None:
+            logger.info(
+                f"    Mehestan {step}. Solved {len(scalee_scores)} scalees with {self.n_jobs} "
+                f"workers in {timeit.default_timer() - start:.1f} seconds"
+            )
+        return results
+
     ############################################
     ##     Methods to esimate the scalers     ##
     ############################################
@@ -362,12 +430,15 @@ class Mehestan(Scaling):
         scaler_models: dict[int, ScoringModel],
         entities: pd.DataFrame,
         privacy: PrivacySettings
-    ) -> dict[int, dict[int, tuple[list[float], list[float], list[float], list[float]]]]:
+    ) -> dict[int, dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]:
         """ Computes the ratios of score differences, with uncertainties,
         for comparable entities of any pair of scalers ($s_{uvef}$ in paper),
         for $u$ in scalees and $v$ in scalers.
         Note that the output `ratios[u][v]` is given as a 1-dimensional np.ndarray
         without any reference to e and f.
+
+        The scores of scalers are gathered once in a dense matrix (scalers x entities),
+        so that each pair (u, v) is handled by array operations on their common entities.
         
         Parameters
         ----------
@@ -381,120 +452,110 @@ class Mehestan(Scaling):
         
         Returns
         -------
-        out: dict[int, dict[int, tuple[list[float], list[float], list[float], list[float]]]]
+        out: dict[int, dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]
             `out[user][user_bis]` is a tuple (ratios, voting_rights, lefts, rights),
-            where ratios is a list of ratios of score differences,
+            where ratios is an array of ratios of score differences,
             and left and right are the left and right ratio uncertainties.
         """
-        user_entity_ratios = dict()
-        entities_ids = set(entities.index)
+        return self._entity_ratios(
+            { u: _user_scores(u, model, entities, privacy) for u, model in scalee_models.items() },
+            _ScoreMatrix.from_models(scaler_models, entities, privacy),
+            len(entities),
+        )
 
-        for u, u_model in scalee_models.items():
+    def _entity_ratios(
+        self,
+        scalee_scores: dict[int, tuple],
+        scaler_matrix: "_ScoreMatrix",
+        n_entities: int,
+    ) -> dict[int, dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]:
+        user_entity_ratios = dict()
+        for u, u_scores in scalee_scores.items():
             user_entity_ratios[u] = dict()
-            u_entities = entities_ids & u_model.scored_entities()
-            if len(u_entities) == 0:
+            u_row = _ScoreMatrix.from_user_scores([u], n_entities, [u_scores])
+            if u_row.n_scores(0) == 0:
                 continue
+            # Each scalee's generator is derived from its id, so that sampled ratios
+            # do not depend on the order in which scalees are processed, nor on sharding
+            rng = np.random.default_rng(np.random.SeedSequence(
+                self.random_seed, spawn_key=(zlib.crc32(str(u).encode()),)
+            ))
 
-            for v, v_model in scaler_models.items():
+            for v_index, v in enumerate(scaler_matrix.users):
                 if u == v:
                     user_entity_ratios[u][v] = [1.], [1.], [0.], [0.]
                     continue
-
-                uv_entities = list(u_entities & v_model.scored_entities())
-                if len(entities) <= 1:
+                if n_entities <= 1:
                     continue
-                elif len(entities) <= 100:
-                    ratios = self.load_all_ratios(u, v, uv_entities, entities, 
-                        u_model, v_model, privacy)
-                    if ratios is not None:
-                        user_entity_ratios[u][v] = ratios
+
+                u_values, v_values = _common_scores(u_row, 0, scaler_matrix, v_index)
+                if n_entities <= 100:
+                    ratios = self.load_all_ratios(u_values, v_values)
                 else:
-                    ratios = self.sample_ratios(u, v, uv_entities, entities, 
-                        u_model, v_model, privacy)
-                    if ratios is not None:
-                        user_entity_ratios[u][v] = ratios
+                    ratios = self.sample_ratios(u_values, v_values, rng)
+                if ratios is not None:
+                    user_entity_ratios[u][v] = ratios
 
         return user_entity_ratios
 
     def load_all_ratios(
         self, 
-        u: int, 
-        v: int, 
-        uv_entities: list[int], 
-        entities: pd.DataFrame,
-        u_model: ScoringModel, 
-        v_model: ScoringModel, 
-        privacy: Optional[PrivacySettings]
-    ) -> Optional[tuple[
-        list[float],
-        list[float],
-        list[float],
-        list[float],
-    ]]:
-        ratios, voting_rights, lefts, rights = list(), list(), list(), list()
-        for e, f in UnorderedPairs(uv_entities):
-            output_u = _compute_abs_diff(u_model, e, f, entities)
-            if output_u is None:
-                continue
-            output_v = _compute_abs_diff(v_model, e, f, entities)
-            if output_v is None:
-                continue
+        u_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        v_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    ) -> Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """ Computes the ratios for all pairs of common entities of u and v
 
-            voting_right = 1.0
-            if privacy is not None:
-                if privacy[u, f]:
-                    voting_right *= self.privacy_penalty
-                if privacy[v, f]:
-                    voting_right *= self.privacy_penalty
-            voting_rights.append(voting_right)
-
-            diff_u, left_u, right_u = output_u
-            diff_v, left_v, right_v = output_v
-            ratio = np.abs(diff_v / diff_u)
-            ratios.append(ratio)
-            lefts.append(ratio - np.abs((diff_v - left_v) / (diff_u + right_u)))
-            rights.append(np.abs((diff_v + right_v) / (diff_u - left_u)) - ratio)
-
-        if len(voting_rights) == 0:
-            return None
+        Parameters
+        ----------
+        u_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            Aligned arrays (scores, lefts, rights, is_private) of u on common entities
+        v_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            Aligned arrays (scores, lefts, rights, is_private) of v on the same entities
 
-        return ratios, voting_rights, lefts, rights
+        Returns
+        -------
+        out: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] or None
+            (ratios, voting_rights, lefts, rights), or None if no pair is comparable
+        """
+        firsts, seconds = np.tril_indices(len(u_values[0]), k=-1)
+        ratios = _compute_ratios(u_values, v_values, firsts, seconds, self.privacy_penalty)
+        if len(ratios[0]) == 0:
+            return None
+        return ratios
 
     def sample_ratios(
         self, 
-        u: int, 
-        v: int, 
-        uv_entities: list[int], 
-        entities: pd.DataFrame,
-        u_model: ScoringModel, 
-        v_model: ScoringModel, 
-        privacy: Optional[PrivacySettings]
-    ) -> tuple[list[float], list[float], list[float], list[float]]:
-        ratios, voting_rights, lefts, rights = list(), list(), list(), list()
-
-        for e, f in UnorderedPairs(uv_entities).n_samples(self.n_diffs_sample_max):
-            output_u = _compute_abs_diff(u_model, e, f, entities)
-            if output_u is None:
-                continue
-            output_v = _compute_abs_diff(v_model, e, f, entities)
-            if output_v is None:
-                continue
+        u_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        v_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        rng: Optional[np.random.Generator] = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Computes the ratios for at most `n_diffs_sample_max` random pairs
+        of common entities of u and v, drawn without replacement.
 
-            voting_right = 1.0
-            if privacy is not None:
-                if privacy[u, f]:
-                    voting_right *= self.privacy_penalty
-                if privacy[v, f]:
-                    voting_right *= self.privacy_penalty
-            voting_rights.append(voting_right)
-
-            diff_u, left_u, right_u = output_u
-            diff_v, left_v, right_v = output_v
-            ratio = np.abs(diff_v / diff_u)
-            ratios.append(ratio)
-            lefts.append(ratio - np.abs((diff_v - left_v) / (diff_u + right_u)))
-            rights.append(np.abs((diff_v + right_v) / (diff_u - left_u)) - ratio)
-        return ratios, voting_rights, lefts, rights
+        Parameters
+        ----------
+        u_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            Aligned arrays (scores, lefts, rights, is_private) of u on common entities
+        v_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            Aligned arrays (scores, lefts, rights, is_private) of v on the same entities
+        rng: np.random.Generator, optional
+            Source of randomness. Defaults to a generator seeded with `random_seed`.
+
+        Returns
+        -------
+        out: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            (ratios, voting_rights, lefts, rights)
+        """
+        if rng is None:
+            rng = np.random.default_rng(self.random_seed)
+        pairs = UnorderedPairs(len(u_values[0]))
+        indices = rng.choice(pairs.n_pairs, size=min(self.n_diffs_sample_max, pairs.n_pairs), 
+            replace=False)
+        firsts, seconds = pairs.indices_to_pairs(indices)
+        # Pairs are randomly oriented, as privacy is accounted for on the second entity
+        swapped = rng.random(len(indices)) <= 0.5
+        firsts, seconds = np.where(swapped, seconds, firsts), np.where(swapped, firsts, seconds)
+        return _compute_ratios(u_values, v_values, firsts, seconds, self.privacy_penalty)
 
     def compute_multiplicators(
         self, 
@@ -538,7 +599,7 @@ class Mehestan(Scaling):
         entities: pd.DataFrame,
         privacy: PrivacySettings,
         multiplicators: dict[int, tuple[float, float]]
-    ) -> dict[int, dict[int, tuple[list[float], list[float], list[float], list[float]]]]:
+    ) -> dict[int, dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]:
         """ Computes the differences of scores, with uncertainties,
         for shared entities of any pair of scalers ($s_{uvef}$ in paper).
         Note that the output is given as a 1-dimensional np.ndarray
@@ -559,55 +620,44 @@ class Mehestan(Scaling):
         out: dict[int, dict[int, tuple[list[float], list[float], list[float]]]]
             `out[user][user_bis]` is a tuple (differences, voting_rights, lefts, rights).
         """
-        differences = dict()
-        entities_ids = set(entities.index)
+        return self._entity_diffs(
+            { u: _user_scores(u, model, entities, privacy) for u, model in scalee_models.items() },
+            _ScoreMatrix.from_models(scaler_models, entities, privacy),
+            len(entities),
+            multiplicators,
+        )
 
-        for u, u_model in scalee_models.items():
-            u_entities = entities_ids & u_model.scored_entities()
+    def _entity_diffs(
+        self,
+        scalee_scores: dict[int, tuple],
+        scaler_matrix: "_ScoreMatrix",
+        n_entities: int,
+        multiplicators: dict[int, tuple[float, float]],
+    ) -> dict[int, dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]:
+        differences = dict()
+        for u, u_scores in scalee_scores.items():
+            u_row = _ScoreMatrix.from_user_scores([u], n_entities, [u_scores])
+            u_multiplicator = multiplicators.get(u, (1., 0., 0.))
             differences[u] = dict()
-            for v, v_model in scaler_models.items():
+            for v_index, v in enumerate(scaler_matrix.users):
                 if u == v:
                     differences[u][v] = [0.], [1.], [0.], [0.]
                     continue
-
-                uv_entities = u_entities & v_model.scored_entities()
-                if len(entities) == 0:
+                if n_entities == 0:
                     continue
 
-                differences[u][v] = list(), list(), list(), list()              
-                for e in uv_entities:
-                    score_u, left_u, right_u = u_model(e, entities.loc[e])
-                    score_v, left_v, right_v = v_model(e, entities.loc[e])
-
-                    uve_voting_right = 1
-                    if privacy is not None and privacy[u, e]:
-                        uve_voting_right *= self.privacy_penalty
-                    if privacy is not None and privacy[v, e]:
-                        uve_voting_right *= self.privacy_penalty
-
-                    u_multiplicator = (1., 0., 0.) if u not in multiplicators else multiplicators[u]
-                    v_multiplicator = (1., 0., 0.) if v not in multiplicators else multiplicators[v]
-
-                    differences[u][v][0].append(
-                        v_multiplicator[0] * score_v - u_multiplicator[0] * score_u
-                    )
-                    differences[u][v][1].append(uve_voting_right)
-                    differences[u][v][2].append(
-                        u_multiplicator[0] * left_u
-                        + u_multiplicator[1] * score_u * (score_u > 0)
-                        - u_multiplicator[1] * score_u * (score_u < 0)
-                        + v_multiplicator[0] * left_v
-                        + v_multiplicator[1] * score_v * (score_v > 0)
-                        - v_multiplicator[1] * score_v * (score_v < 0)
-                    )
-                    differences[u][v][3].append(
-                        u_multiplicator[0] * right_u
-                        - u_multiplicator[1] * score_u * (score_u < 0)
-                        + u_multiplicator[1] * score_u * (score_u > 0)
-                        + v_multiplicator[0] * right_v
-                        - v_multiplicator[1] * score_v * (score_v < 0)
-                        + v_multiplicator[1] * score_v * (score_v > 0)
-                    )
+                v_multiplicator = multiplicators.get(v, (1., 0., 0.))
+                (score_u, left_u, right_u, private_u), (score_v, left_v, right_v, private_v) \
+                    = _common_scores(u_row, 0, scaler_matrix, v_index)
+                abs_uncertainty = (
+                    u_multiplicator[1] * np.abs(score_u) + v_multiplicator[1] * np.abs(score_v)
+                )
+                differences[u][v] = (
+                    v_multiplicator[0] * score_v - u_multiplicator[0] * score_u,
+                    _privacy_voting_rights(private_u, private_v, self.privacy_penalty),
+                    u_multiplicator[0] * left_u + v_multiplicator[0] * left_v + abs_uncertainty,
+                    u_multiplicator[0] * right_u + v_multiplicator[0] * right_v + abs_uncertainty,
+                )
 
         return differences
 
@@ -640,41 +690,271 @@ class Mehestan(Scaling):
             n_scalers_max=self.n_scalers_max, 
             privacy_penalty=self.privacy_penalty,
             p_norm_for_multiplicative_resilience=self.p_norm_for_multiplicative_resilience,
-            error=self.error
+            error=self.error,
+            random_seed=self.random_seed,
         )
 
     def __str__(self):
         prop_names = ["lipschitz", "min_activity", "n_scalers_max", "privacy_penalty",
-            "user_comparison_lipschitz", "p_norm_for_multiplicative_resilience", "error"]
+            "user_comparison_lipschitz", "p_norm_for_multiplicative_resilience", "error",
+            "random_seed"]
         prop = ", ".join([f"{p}={getattr(self, p)}" for p in prop_names])
         return f"{type(self).__name__}({prop})"
 
 
+def _shard_multiplicators(
+    mehestan: Mehestan,
+    scalee_scores: dict[int, tuple],
+    scaler_matrix: "_ScoreMatrix",
+    scalers: pd.DataFrame,
+    n_entities: int,
+    model_norms: dict[int, float],
+) -> tuple[dict[int, tuple[float, float]], list[float]]:
+    """ Returns the multiplicators of scalees, and the durations of the three phases """
+    start = timeit.default_timer()
+    entity_ratios = mehestan._entity_ratios(scalee_scores, scaler_matrix, n_entities)
+    end_ratios = timeit.default_timer()
+    ratio_voting_rights, ratios, ratio_uncertainties = _aggregate_user_comparisons(
+        scalers, entity_ratios, error=mehestan.error, lipschitz=mehestan.user_comparison_lipschitz
+    )
+    end_aggregate = timeit.default_timer()
+    multiplicators = mehestan.compute_multiplicators(
+        ratio_voting_rights, ratios, ratio_uncertainties, model_norms
+    )
+    end = timeit.default_timer()
+    return multiplicators, [end_ratios - start, end_aggregate - end_ratios, end - end_aggregate]
+
+
+def _shard_translations(
+    mehestan: Mehestan,
+    scalee_scores: dict[int, tuple],
+    scaler_matrix: "_ScoreMatrix",
+    scalers: pd.DataFrame,
+    n_entities: int,
+    multiplicators: dict[int, tuple[float, float]],
+) -> tuple[dict[int, tuple[float, float]], list[float]]:
+    """ Returns the translations of scalees, and the durations of the three phases """
+    start = timeit.default_timer()
+    entity_diffs = mehestan._entity_diffs(scalee_scores, scaler_matrix, n_entities, multiplicators)
+    end_diffs = timeit.default_timer()
+    diff_voting_rights, diffs, diff_uncertainties = _aggregate_user_comparisons(
+        scalers, entity_diffs, error=mehestan.error, lipschitz=mehestan.user_comparison_lipschitz
+    )
+    end_aggregate = timeit.default_timer()
+    translations = mehestan.compute_translations(diff_voting_rights, diffs, diff_uncertainties)
+    end = timeit.default_timer()
+    return translations, [end_diffs - start, end_aggregate - end_diffs, end - end_aggregate]
+
+
+# Names of the phases of `_shard_multiplicators` and `_shard_translations`, with their
+# letters in logs
+_SHARD_PHASES = {
+    _shard_multiplicators: (("b", "Entity ratios"), ("c", "Aggregate ratios"), ("d", "Multiplicators")),
+    _shard_translations: (("e", "Entity diffs"), ("f", "Aggregate diffs"), ("g", "Translations")),
+}
+
+_worker_state: Optional[tuple[Mehestan, "_ScoreMatrix", pd.DataFrame, int]] = None
+
+
+def _init_worker(
+    mehestan: Mehestan, 
+    directory: str, 
+    scaler_users: list[int], 
+    scalers: pd.DataFrame, 
+    n_entities: int,
+):
+    global _worker_state
+    _worker_state = mehestan, _ScoreMatrix.load(directory, scaler_users), scalers, n_entities
+
+
+def _solve_shard_in_worker(
+    shard_function: Callable[..., tuple[dict[int, tuple[float, float]], list[float]]],
+    scalee_scores: dict[int, tuple],
+    parameters: dict[int, Any],
+) -> tuple[dict[int, tuple[float, float]], list[float]]:
+    assert _worker_state is not None
+    mehestan, scaler_matrix, scalers, n_entities = _worker_state
+    return shard_function(mehestan, scalee_scores, scaler_matrix, scalers, n_entities, parameters)
+
+
 ##############################################
 ## Preprocessing to facilitate computations ##
 ##############################################
 
-def _compute_abs_diff(
-    user_model: ScoringModel, 
-    entity_a: int, 
-    entity_b: int, 
-    entities: pd.DataFrame
-) -> Optional[tuple[float, float, float]]:
-    output_a = user_model(entity_a, 
-    entities.loc[entity_a])
-    if output_a is None:
-        return None
-    output_b = user_model(entity_b, entities.loc[entity_b])
-    if output_b is None:
-        return None
-        
-    score_a, left_a, right_a = output_a
-    score_b, left_b, right_b = output_b
-    if score_a - score_b >=  2 * left_a + 2 * right_b:
-        return score_a - score_b, left_a + right_b, right_a + left_b
-    if score_b - score_a >= 2 * left_b + 2 * right_a:
-        return score_b - score_a, left_b + right_a, right_b + left_a
-    return None
+class _ScoreMatrix:
+    """ Dense matrix of the scores of users (rows) on entities (columns).
+    Unscored entries are NaN, and `is_scored` is the corresponding mask.
+    """
+    ARRAYS = ("scores", "lefts", "rights", "is_private")
+
+    def __init__(
+        self,
+        users: list[int],
+        scores: np.ndarray,
+        lefts: np.ndarray,
+        rights: np.ndarray,
+        is_private: np.ndarray,
+    ):
+        self.users = users
+        self.scores, self.lefts, self.rights = scores, lefts, rights
+        self.is_private = is_private
+        self.is_scored = ~np.isnan(scores)
+
+    @classmethod
+    def from_models(
+        cls,
+        user_models: Mapping[int, ScoringModel],
+        entities: pd.DataFrame,
+        privacy: Optional[PrivacySettings],
+    ) -> "_ScoreMatrix":
+        """ Gathers the scores of the models on the entities of the index of `entities` """
+        return cls.from_user_scores(list(user_models), len(entities), [
+            _user_scores(user, model, entities, privacy) for user, model in user_models.items()
+        ])
+
+    @classmethod
+    def from_user_scores(
+        cls, 
+        users: list[int], 
+        n_entities: int, 
+        user_scores: list[tuple],
+    ) -> "_ScoreMatrix":
+        """ Builds the matrix from the outputs of `_user_scores`, one per user """
+        shape = (len(users), n_entities)
+        scores, lefts, rights = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        is_private = np.zeros(shape, dtype=bool)
+        for row, (columns, *values) in enumerate(user_scores):
+            scores[row, columns], lefts[row, columns], rights[row, columns], \
+                is_private[row, columns] = values
+        return cls(users, scores, lefts, rights, is_private)
+
+    def save(self, directory: str):
+        for name in _ScoreMatrix.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, users: list[int]) -> "_ScoreMatrix":
+        """ Memory-maps read-only the arrays saved by `save` """
+        return cls(users, *(
+            np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in _ScoreMatrix.ARRAYS
+        ))
+
+    def user_scores(self, row: int) -> tuple:
+        """ Returns the scores of a user, in the format of `_user_scores` """
+        columns = np.flatnonzero(self.is_scored[row])
+        return columns, *self.values(row, columns)
+
+    def n_scores(self, row: int) -> int:
+        return int(self.is_scored[row].sum())
+
+    def values(
+        self, row: int, columns: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return (self.scores[row, columns], self.lefts[row, columns], 
+            self.rights[row, columns], self.is_private[row, columns])
+
+
+def _user_scores(
+    user: int,
+    model: ScoringModel,
+    entities: pd.DataFrame,
+    privacy: Optional[PrivacySettings],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the aligned (columns, scores, lefts, rights, is_private) of the entities
+    scored by the model, where columns are the positions of entities in `entities.index`
+    """
+    entity_ids, scores, lefts, rights = model.to_arrays(entities)
+    is_private = np.zeros(len(entity_ids), dtype=bool)
+    if privacy is not None:
+        is_private = privacy.get_many(np.full(len(entity_ids), user), entity_ids) == 1.0
+    return entities.index.get_indexer(entity_ids), scores, lefts, rights, is_private
+
+def _common_scores(
+    u_matrix: _ScoreMatrix, 
+    u_row: int, 
+    v_matrix: _ScoreMatrix, 
+    v_row: int,
+) -> tuple[
+    tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+]:
+    """ Returns the aligned (scores, lefts, rights, is_private) of two users,
+    restricted to the entities scored by both
+    """
+    columns = np.flatnonzero(u_matrix.is_scored[u_row] & v_matrix.is_scored[v_row])
+    return u_matrix.values(u_row, columns), v_matrix.values(v_row, columns)
+
+def _compute_abs_diffs(
+    scores: np.ndarray,
+    lefts: np.ndarray,
+    rights: np.ndarray,
+    firsts: np.ndarray,
+    seconds: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Computes the absolute score differences of pairs of entities, with uncertainties.
+
+    Returns
+    -------
+    out: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        (diffs, lefts, rights, is_significant), where is_significant says whether
+        the difference is large compared to the uncertainties.
+        Other values are only meaningful for significant differences.
+    """
+    diffs = scores[firsts] - scores[seconds]
+    is_positive = diffs >= 2 * lefts[firsts] + 2 * rights[seconds]
+    is_negative = - diffs >= 2 * lefts[seconds] + 2 * rights[firsts]
+    return (
+        np.where(is_positive, diffs, - diffs),
+        np.where(is_positive, lefts[firsts] + rights[seconds], lefts[seconds] + rights[firsts]),
+        np.where(is_positive, rights[firsts] + lefts[seconds], rights[seconds] + lefts[firsts]),
+        is_positive | is_negative,
+    )
+
+def _privacy_voting_rights(
+    u_is_private: np.ndarray,
+    v_is_private: np.ndarray,
+    privacy_penalty: float,
+) -> np.ndarray:
+    return np.where(u_is_private, privacy_penalty, 1.0) * np.where(v_is_private, privacy_penalty, 1.0)
+
+def _compute_ratios(
+    u_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    v_values: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    firsts: np.ndarray,
+    seconds: np.ndarray,
+    privacy_penalty: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Computes the ratios of score differences of v and u, with uncertainties,
+    for the pairs of entities (firsts[i], seconds[i]) on which both differences are significant.
+    The voting right of a ratio is penalized if the second entity is private.
+
+    Returns
+    -------
+    out: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        (ratios, voting_rights, lefts, rights)
+    """
+    u_scores, u_lefts, u_rights, u_is_private = u_values
+    v_scores, v_lefts, v_rights, v_is_private = v_values
+    diff_u, left_u, right_u, significant_u = _compute_abs_diffs(
+        u_scores, u_lefts, u_rights, firsts, seconds
+    )
+    diff_v, left_v, right_v, significant_v = _compute_abs_diffs(
+        v_scores, v_lefts, v_rights, firsts, seconds
+    )
+    significant = significant_u & significant_v
+    diff_u, left_u, right_u = diff_u[significant], left_u[significant], right_u[significant]
+    diff_v, left_v, right_v = diff_v[significant], left_v[significant], right_v[significant]
+    seconds = seconds[significant]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.abs(diff_v / diff_u)
+        lefts = ratios - np.abs((diff_v - left_v) / (diff_u + right_u))
+        rights = np.abs((diff_v + right_v) / (diff_u - left_u)) - ratios
+    voting_rights = _privacy_voting_rights(
+        u_is_private[seconds], v_is_private[seconds], privacy_penalty
+    )
+    return ratios, voting_rights, lefts, rights
 
 def _computer_user_activities(
     user: int,
@@ -797,14 +1077,13 @@ def _aggregate_user_comparisons(
     uncertainties: dict[int, list[float]
     """
     voting_rights, comparisons, uncertainties = dict(), dict(), dict()
+    trust_scores = scalers["trust_score"].to_dict() if "trust_score" in scalers else None
     
     for u in scaler_comparisons:
         voting_rights[u], comparisons[u], uncertainties[u] = list(), list(), list()
         for v in scaler_comparisons[u]:
                             
-            voting_rights[u].append(
-                scalers.loc[v, "trust_score"] if "trust_score" in scalers else 1.0
-            )
+            voting_rights[u].append(1.0 if trust_scores is None else trust_scores[v])
             comparisons[u].append(qr_median(
                 lipschitz=lipschitz, 
                 values=np.array(scaler_comparisons[u][v][0]),
@@ -6,7 +6,7 @@ import numpy as np
 from .base import Scaling
 
 from solidago.privacy_settings import PrivacySettings
-from solidago.scoring_model import ScoringModel, ScaledScoringModel
+from solidago.scoring_model import ScoringModel, ScaledScoringModel, scores_frame
 from solidago.voting_rights import VotingRights
 from solidago.primitives import qr_quantile
 
@@ -65,25 +65,16 @@ class QuantileShift(Scaling):
         out[user]: ScoringModel
             Will be scaled by the Scaling method
         """
-        weights = []
-        scores, lefts, rights = [], [], []
-        for user_id, user_model in user_models.items():
-            n_entities = 0
-            for entity_id, output in user_model.iter_entities(entities):
-                n_entities += 1
-                scores.append(output[0])
-                lefts.append(output[1])
-                rights.append(output[2])
-            if n_entities > 0:
-                weights.extend([1 / n_entities] * n_entities)
+        df = scores_frame(user_models, entities)
+        weights = 1 / df.groupby("user_id")["scores"].transform("size")
 
         shift = -qr_quantile(
             lipschitz=self.lipschitz,
             quantile=self.quantile,
-            values=np.array(scores),
-            voting_rights=np.array(weights),
-            left_uncertainties=np.array(lefts),
-            right_uncertainties=np.array(rights),
+            values=df["scores"].to_numpy(dtype=np.float64),
+            voting_rights=weights.to_numpy(dtype=np.float64),
+            left_uncertainties=df["left_uncertainties"].to_numpy(dtype=np.float64),
+            right_uncertainties=df["right_uncertainties"].to_numpy(dtype=np.float64),
             error=self.error,
         ) + self.target_score
 
@@ -3,7 +3,7 @@ import pandas as pd
 from .base import Scaling
 
 from solidago.privacy_settings import PrivacySettings
-from solidago.scoring_model import ScoringModel, ScaledScoringModel
+from solidago.scoring_model import ScoringModel, ScaledScoringModel, scores_frame
 from solidago.voting_rights import VotingRights
 from solidago.primitives import qr_standard_deviation
 
@@ -53,22 +53,4 @@ class Standardize(Scaling):
 
 
 def _get_user_scores(user_models: dict[int, ScoringModel], entities: pd.DataFrame):
-    user_list, entity_list = list(), list()
-    scores, lefts, rights = list(), list(), list()
-    for user_id, scoring_model in user_models.items():
-        for entity_id, output in scoring_model.iter_entities(entities):
-            user_list.append(user_id)
-            entity_list.append(entity_id)
-            scores.append(output[0])
-            lefts.append(output[1])
-            rights.append(output[2])
-
-    return pd.DataFrame(
-        dict(
-            user_id=user_list,
-            entity_id=entity_list,
-            scores=scores,
-            left_uncertainties=lefts,
-            right_uncertainties=rights,
-        )
-    )
+    return scores_frame(user_models, entities)
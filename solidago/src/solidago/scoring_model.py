@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Callable, Optional, Union, Iterable
+from typing import Callable, Mapping, Optional, Union, Iterable
 
 import pandas as pd
 import numpy as np
@@ -13,6 +13,8 @@ class ScoringModel:
         This abstract class provides a default implementation that for `iter_entities()`
         calling `scored_entities()` and `__call__()` to score each entity.
         `scored_entities()` and `__call__()` need to be implemented by subclasses.
+        Subclasses may override `to_arrays()` and `score_many()` to score entities
+        in batches, rather than one at a time.
     """
 
     @abstractmethod
@@ -80,6 +82,57 @@ class ScoringModel:
             if result is not None:
                 yield entity_id, result
 
+    def to_arrays(
+        self, entities: Optional[pd.DataFrame] = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score all available entities at once.
+
+        Parameters
+        ----------
+        entities : pd.DataFrame, optional
+            DataFrame containing entity features.  
+            If provided, only the entities of its index are scored.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            Aligned arrays of (entity_ids, scores, left_uncertainties, right_uncertainties).
+            These arrays may be shared with the model, and must not be modified.
+        """
+        results = list(self.iter_entities(entities))
+        entity_ids = np.array([entity_id for entity_id, _ in results])
+        values = np.array([result for _, result in results], dtype=np.float64).reshape(-1, 3)
+        return entity_ids, values[:, 0], values[:, 1], values[:, 2]
+
+    def score_many(
+        self, entity_ids, entities: Optional[pd.DataFrame] = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a batch of entities.
+
+        Parameters
+        ----------
+        entity_ids: array-like
+        entities: pd.DataFrame, optional
+            Features of the entities, indexed by entity id
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray]
+            Arrays of (scores, left_uncertainties, right_uncertainties),
+            aligned with `entity_ids`. Entities which cannot be scored are given NaN values.
+        """
+        values = np.full((len(entity_ids), 3), np.nan)
+        for index, entity_id in enumerate(entity_ids):
+            if entities is None:
+                result = self(entity_id)
+            else:
+                result = self(entity_id, entities.loc[entity_id])
+            if result is not None:
+                values[index] = result
+        return values[:, 0], values[:, 1], values[:, 2]
+
 
 class DirectScoringModel(ScoringModel):
     """
@@ -92,6 +145,23 @@ class DirectScoringModel(ScoringModel):
     ):
         super().__init__()
         self._dict = dict() if dct is None else dct
+        # Column arrays, built from `_dict` on the first batch scoring
+        self._columns: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_arrays(
+        cls, entity_ids, scores, left_uncertainties, right_uncertainties
+    ) -> "DirectScoringModel":
+        """ Builds a model from aligned arrays, where entity ids are assumed to be unique """
+        columns = tuple(np.asarray(a) for a in (
+            entity_ids, scores, left_uncertainties, right_uncertainties
+        ))
+        model = cls(dict(zip(
+            columns[0].tolist(),
+            zip(columns[1].tolist(), columns[2].tolist(), columns[3].tolist()),
+        )))
+        model._columns = columns  # type: ignore
+        return model
     
     def __call__(self, entity_id: int, entity_features=None) -> Optional[tuple[float, float, float]]:
         return self._dict.get(entity_id)
@@ -111,6 +181,7 @@ class DirectScoringModel(ScoringModel):
                 score_and_uncertainties[1]
             )
         self._dict[entity_id] = score_and_uncertainties
+        self._columns = None
 
     def scored_entities(self, entities=None) -> set[int]:
         if entities is None:
@@ -120,6 +191,24 @@ class DirectScoringModel(ScoringModel):
     def iter_entities(self, entities=None) -> Iterable[tuple[int, tuple[float, float, float]]]:
         return self._dict.items()
 
+    def to_arrays(self, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if self._columns is None:
+            values = np.array(list(self._dict.values()), dtype=np.float64).reshape(-1, 3)
+            self._columns = (np.array(list(self._dict.keys())), *values.T)  # type: ignore
+        if entities is None:
+            return self._columns  # type: ignore
+        is_scored = np.isin(self._columns[0], entities.index.to_numpy())  # type: ignore
+        return tuple(column[is_scored] for column in self._columns)  # type: ignore
+
+    def score_many(self, entity_ids, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        model_entity_ids, *columns = self.to_arrays()
+        positions = pd.Index(model_entity_ids).get_indexer(entity_ids)
+        is_scored = positions >= 0
+        values = np.full((3, len(positions)), np.nan)
+        for values_row, column in zip(values, columns):
+            values_row[is_scored] = column[positions[is_scored]]
+        return values[0], values[1], values[2]
+
     def __str__(self, indent=""):
         return "{" + f"\n{indent}    " + f",\n{indent}    ".join([
             f"{entity}: {np.round(self[entity][0], 2)}   "
@@ -206,10 +295,38 @@ class ScaledScoringModel(ScoringModel):
                 self.multiplicator_left_uncertainty, self.multiplicator)
             
         return score, left_uncertainty, right_uncertainty
+
+    def scale_scores(
+        self, base_scores: np.ndarray, base_lefts: np.ndarray, base_rights: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Vectorized version of `scale_score`, applied to arrays of scores """
+        base_left = base_scores - base_lefts
+        base_right = base_scores + base_rights
+        min_multiplicator = min(self.multiplicator_left_uncertainty, self.multiplicator)
+
+        scores = self.multiplicator * base_scores + self.translation
+        lefts = self.multiplicator * base_lefts + self.translation_left_uncertainty + np.where(
+            base_left > 0,
+            base_left * min_multiplicator,
+            (- base_left) * self.multiplicator_right_uncertainty,
+        )
+        rights = self.multiplicator * base_rights + self.translation_right_uncertainty + np.where(
+            base_right > 0,
+            base_right * self.multiplicator_right_uncertainty,
+            (- base_right) * min_multiplicator,
+        )
+        return scores, lefts, rights
         
     def scored_entities(self, entities=None) -> set[int]:
         return self.base_model.scored_entities(entities)
 
+    def to_arrays(self, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        entity_ids, *base_values = self.base_model.to_arrays(entities)
+        return entity_ids, *self.scale_scores(*base_values)
+
+    def score_many(self, entity_ids, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.scale_scores(*self.base_model.score_many(entity_ids, entities))
+
     def _direct_scaling_parameters(self):
         return (self.multiplicator, self.translation, 
             self.multiplicator_left_uncertainty, self.multiplicator_right_uncertainty, 
@@ -253,7 +370,8 @@ class PostProcessedScoringModel(ScoringModel):
         ----------
         base_model: ScoringModel
         post_process: callable
-            Must be a monotonous function float -> float
+            Must be a monotonous function float -> float,
+            which also applies elementwise to numpy arrays (as a ufunc)
         """
         self.base_model = base_model
         self.post_process = post_process
@@ -275,9 +393,67 @@ class PostProcessedScoringModel(ScoringModel):
             right = - temp
         return score, left, right
 
+    def apply_post_process_many(
+        self, base_scores: np.ndarray, base_lefts: np.ndarray, base_rights: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Vectorized version of `apply_post_process`, applied to arrays of scores """
+        scores = self.post_process(base_scores)
+        lefts = scores - self.post_process(base_scores - base_lefts)
+        rights = self.post_process(base_scores + base_rights) - scores
+        # Uncertainties are swapped if the post process is decreasing
+        is_swapped = lefts < 0
+        return scores, np.where(is_swapped, - rights, lefts), np.where(is_swapped, - lefts, rights)
+
     def scored_entities(self, entities=None) -> set[int]:
         return self.base_model.scored_entities(entities)
 
     def iter_entities(self, entities=None) -> Iterable[tuple[int, tuple[float, float, float]]]:
         for (entity_id, values) in self.base_model.iter_entities():
             yield (entity_id, self.apply_post_process(*values))
+
+    def to_arrays(self, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        entity_ids, *base_values = self.base_model.to_arrays(entities)
+        return entity_ids, *self.apply_post_process_many(*base_values)
+
+    def score_many(self, entity_ids, entities=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.apply_post_process_many(*self.base_model.score_many(entity_ids, entities))
+
+
+def scores_frame(
+    user_models: Mapping[int, ScoringModel],
+    entities: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """ Gathers the scores of all users' models, reading each model's columns at once.
+
+    Parameters
+    ----------
+    user_models: dict[int, ScoringModel]
+        user_models[user] is user's scoring model
+    entities: DataFrame, optional
+        If provided, only the entities of its index are scored
+
+    Returns
+    -------
+    DataFrame with columns
+        * user_id
+        * entity_id
+        * scores: float
+        * left_uncertainties: float
+        * right_uncertainties: float
+    """
+    columns = ["user_id", "entity_id", "scores", "left_uncertainties", "right_uncertainties"]
+    user_ids, arrays = list(), list()
+    for user_id, model in user_models.items():
+        model_arrays = model.to_arrays(entities)
+        if len(model_arrays[0]) > 0:
+            user_ids.append(np.full(len(model_arrays[0]), user_id))
+            arrays.append(model_arrays)
+    if len(arrays) == 0:
+        return pd.DataFrame({
+            column: np.array([], dtype=np.int64 if column.endswith("_id") else np.float64)
+            for column in columns
+        })
+    return pd.DataFrame(dict(zip(columns, [
+        np.concatenate(user_ids),
+        *(np.concatenate(column) for column in zip(*arrays)),
+    ])))
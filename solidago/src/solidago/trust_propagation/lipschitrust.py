@@ -7,6 +7,7 @@ from .base import TrustPropagation
 
 import pandas as pd
 import numpy as np
+from numba import njit
 
 
 class LipschiTrust(TrustPropagation):
@@ -65,22 +66,16 @@ class LipschiTrust(TrustPropagation):
         if len(users) == 0:
             return users.assign(trust_score=[])
 
-        total_vouches = vouches["voucher"].value_counts() + self.sink_vouch
-        pretrusts = users["is_pretrusted"] * self.pretrust_value
+        indptr, voucher_indices, discounts = self.transition_matrix(users, vouches)
+        pretrusts = users["is_pretrusted"].to_numpy(dtype=np.float64) * self.pretrust_value
         trusts = pretrusts.copy()
 
         n_iterations = -np.log(len(users) / self.error) / np.log(self.decay)
         n_iterations = int(np.ceil(n_iterations))
         for _ in range(n_iterations):
-            # Initialize to pretrust
-            new_trusts = pretrusts.copy()
-            # Propagate trust through vouches
-            for row in vouches.itertuples():
-                discount = self.decay * row.vouch / total_vouches[row.voucher]
-                new_trusts[row.vouchee] += discount * trusts[row.voucher]
-
-            # Bound trusts for Lipschitz resilience
-            new_trusts = new_trusts.clip(upper=1.0)
+            # Start from pretrusts, propagate trust through vouches,
+            # and bound trusts for Lipschitz resilience
+            new_trusts = _propagate(indptr, voucher_indices, discounts, trusts, pretrusts)
 
             delta = np.linalg.norm(new_trusts - trusts, ord=1)
             trusts = new_trusts
@@ -89,6 +84,39 @@ class LipschiTrust(TrustPropagation):
 
         return users.assign(trust_score=trusts)
 
+    def transition_matrix(
+        self, 
+        users: pd.DataFrame, 
+        vouches: pd.DataFrame
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Builds the vouch graph as a CSR matrix, whose rows are vouchees
+        and whose columns are vouchers, in the order of `users.index`.
+        Within a row, vouches are kept in their original order,
+        so that trust propagation sums the contributions of vouchers
+        in the same order as a sequential pass over `vouches`.
+
+        Returns
+        -------
+        indptr: np.ndarray
+            Vouches received by the vouchee at index i are stored in `indptr[i]:indptr[i+1]`
+        voucher_indices: np.ndarray
+            Index of the voucher of each stored vouch
+        discounts: np.ndarray
+            Fraction of the voucher's trust that is transmitted through the vouch
+        """
+        voucher_indices = users.index.get_indexer(vouches["voucher"])
+        vouchee_indices = users.index.get_indexer(vouches["vouchee"])
+        n_vouches = np.bincount(voucher_indices[voucher_indices >= 0], minlength=len(users))
+        total_vouches = n_vouches[voucher_indices] + self.sink_vouch
+        discounts = self.decay * vouches["vouch"].to_numpy(dtype=np.float64) / total_vouches
+
+        known = (voucher_indices >= 0) & (vouchee_indices >= 0)
+        voucher_indices, vouchee_indices = voucher_indices[known], vouchee_indices[known]
+        order = np.argsort(vouchee_indices, kind="stable")
+        indptr = np.zeros(len(users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(vouchee_indices, minlength=len(users)), out=indptr[1:])
+        return indptr, voucher_indices[order], discounts[known][order]
+
     def __str__(self):
         prop_names = ["pretrust_value", "decay", "sink_vouch", "error"]
         prop = ", ".join([f"{p}={getattr(self, p)}" for p in prop_names])
@@ -101,3 +129,17 @@ class LipschiTrust(TrustPropagation):
             sink_vouch=self.sink_vouch,
             error=self.error,
         )
+
+
+@njit
+def _propagate(indptr, voucher_indices, discounts, trusts, pretrusts):
+    """ One iteration of LipschiTrust, i.e. a sparse matrix-vector product
+    starting from pretrusts, followed by a clipping of trusts at 1.
+    """
+    new_trusts = np.empty_like(pretrusts)
+    for vouchee in range(len(pretrusts)):
+        trust = pretrusts[vouchee]
+        for k in range(indptr[vouchee], indptr[vouchee + 1]):
+            trust += discounts[k] * trusts[voucher_indices[k]]
+        new_trusts[vouchee] = min(trust, 1.0)
+    return new_trusts
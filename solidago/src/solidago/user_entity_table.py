@@ -0,0 +1,175 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+_MISSING = object()
+
+
+class UserEntityTable:
+    """ Sparse table of values indexed by (user, entity) pairs.
+
+    Values are stored column-wise, in arrays of users, entities and values
+    sorted by user then entity. Each user's values are thus a contiguous slice
+    (CSR), while a permutation sorted by entity gives each entity's values (CSC).
+    This allows bulk retrievals without looping over the pairs in python.
+
+    Individual reads and writes with `table[user, entity]` remain supported.
+    Writes are buffered, and merged into the arrays on the next bulk retrieval.
+    """
+    value_name = "value"
+    default_value: Optional[float] = None
+
+    def __init__(self, dct: Optional[dict] = None):
+        """
+        Parameters
+        ----------
+        dct: dict[int, dict[int, value]]
+            dct[entity][user] is the value of the pair (user, entity)
+        """
+        self._set_arrays(np.array([]), np.array([]), np.array([], dtype=np.float64))
+        self._pending = dict() if dct is None else {
+            (user, entity): value
+            for entity, entity_dict in dct.items()
+            for user, value in entity_dict.items()
+        }
+
+    @classmethod
+    def from_arrays(cls, users, entities, values) -> "UserEntityTable":
+        """ Builds the table from aligned arrays of users, entities and values,
+        where (user, entity) pairs are assumed to be unique.
+        """
+        table = cls()
+        users, entities = np.asarray(users), np.asarray(entities)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.lexsort((entities, users))
+        table._set_arrays(users[order], entities[order], values[order])
+        return table
+
+    @staticmethod
+    def _decode(values: np.ndarray) -> list:
+        """ Converts stored values into the values returned by `table[user, entity]` """
+        return values.tolist()
+
+    def __getitem__(self, user_entity_tuple: tuple[int, int]):
+        value = self._pending.get(user_entity_tuple, _MISSING)
+        if value is _MISSING:
+            lookup = self._lookup_cache
+            value = (self._lookup if lookup is None else lookup).get(user_entity_tuple)
+        # None marks deleted pairs
+        return self.default_value if value is None else value
+
+    def __setitem__(self, user_entity_tuple: tuple[int, int], value):
+        """ Sets the value of (user, entity), or deletes it if value is None """
+        user, entity = user_entity_tuple
+        self._pending[user, entity] = value
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self._values)
+
+    def _set_arrays(self, users: np.ndarray, entities: np.ndarray, values: np.ndarray):
+        """ Sets the arrays sorted by user then entity, and derives both indices """
+        self._users, self._entities, self._values = users, entities, values
+        self._user_ids, user_starts = np.unique(users, return_index=True)
+        self._user_indptr = np.append(user_starts, len(users))
+        self._entity_order = np.lexsort((users, entities))
+        self._entity_ids, entity_starts = np.unique(entities[self._entity_order], return_index=True)
+        self._entity_indptr = np.append(entity_starts, len(entities))
+        self._lookup_cache: Optional[dict] = None
+        self._pair_index_cache: Optional[pd.MultiIndex] = None
+
+    def _compact(self):
+        """ Merges buffered writes into the sorted arrays """
+        if not self._pending:
+            return
+        new_users = np.array([user for user, _ in self._pending])
+        new_entities = np.array([entity for _, entity in self._pending])
+        new_values = np.array(
+            [np.nan if value is None else value for value in self._pending.values()],
+            dtype=np.float64,
+        )
+        self._pending = dict()
+        if len(self._values) == 0:
+            users, entities, values = new_users, new_entities, new_values
+        else:
+            users = np.concatenate([self._users, new_users])
+            entities = np.concatenate([self._entities, new_entities])
+            values = np.concatenate([self._values, new_values])
+
+        # Buffered writes come last, so that they override previous values of the same pair
+        order = np.lexsort((np.arange(len(values)), entities, users))
+        users, entities, values = users[order], entities[order], values[order]
+        is_last = np.ones(len(values), dtype=bool)
+        is_last[:-1] = (users[1:] != users[:-1]) | (entities[1:] != entities[:-1])
+        # NaN values mark deleted pairs
+        keep = is_last & ~np.isnan(values)
+        self._set_arrays(users[keep], entities[keep], values[keep])
+
+    @property
+    def _lookup(self) -> dict[tuple, float]:
+        """ Values by (user, entity) pair, built on the first individual read """
+        if self._lookup_cache is None:
+            self._lookup_cache = dict(zip(
+                zip(self._users.tolist(), self._entities.tolist()),
+                self._decode(self._values),
+            ))
+        return self._lookup_cache
+
+    def entities(self, user: Optional[int] = None) -> set:
+        if user is None:
+            self._compact()
+            return set(self._entity_ids.tolist())
+        return set(self.on_user(user)[0].tolist())
+
+    def users(self, entity: Optional[int] = None) -> set:
+        if entity is None:
+            self._compact()
+            return set(self._user_ids.tolist())
+        return set(self.on_entity(entity)[0].tolist())
+
+    def on_user(self, user: int) -> tuple[np.ndarray, np.ndarray]:
+        """ Returns the entities of user, sorted, and the corresponding values """
+        self._compact()
+        index = np.searchsorted(self._user_ids, user)
+        if index == len(self._user_ids) or self._user_ids[index] != user:
+            return self._entities[:0], self._values[:0]
+        start, end = self._user_indptr[index], self._user_indptr[index + 1]
+        return self._entities[start:end], self._values[start:end]
+
+    def on_entity(self, entity: int) -> tuple[np.ndarray, np.ndarray]:
+        """ Returns the users of entity, sorted, and the corresponding values """
+        self._compact()
+        index = np.searchsorted(self._entity_ids, entity)
+        if index == len(self._entity_ids) or self._entity_ids[index] != entity:
+            return self._users[:0], self._values[:0]
+        positions = self._entity_order[self._entity_indptr[index]:self._entity_indptr[index + 1]]
+        return self._users[positions], self._values[positions]
+
+    def get_many(self, users, entities) -> np.ndarray:
+        """ Returns the values of the aligned (user, entity) pairs.
+        Missing pairs are given NaN values.
+        """
+        self._compact()
+        if len(self._values) == 0:
+            return np.full(len(users), np.nan)
+        if self._pair_index_cache is None:
+            self._pair_index_cache = pd.MultiIndex.from_arrays([self._users, self._entities])
+        positions = self._pair_index_cache.get_indexer(
+            pd.MultiIndex.from_arrays([np.asarray(users), np.asarray(entities)])
+        )
+        values = self._values[positions]
+        values[positions == -1] = np.nan
+        return values
+
+    def to_frame(self) -> pd.DataFrame:
+        """ Returns a DataFrame with columns `user_id`, `entity_id` and the values,
+        sorted by user then entity.
+        """
+        self._compact()
+        return pd.DataFrame({
+            "user_id": self._users,
+            "entity_id": self._entities,
+            self.value_name: self._values,
+        })
@@ -31,6 +31,17 @@ class UnorderedPairs:
             raise ValueError(b)
         return swap(self.elements[a], self.elements[b], p_shuffle)
 
+    def indices_to_pairs(self, indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Vectorized version of `index_to_pair` without shuffling,
+        which returns the positions (a, b) of the elements of the pairs, with a > b.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        a = ((1 + np.sqrt(8 * indices + 1)) / 2).astype(np.int64)
+        # Corrects floating point errors for large indices
+        a -= (a * (a - 1)) // 2 > indices
+        a += (a * (a + 1)) // 2 <= indices
+        return a, indices - (a * (a - 1)) // 2
+
     def sample(self, p_shuffle=0.5) -> tuple[int, int]:
         index = np.random.randint(self.n_elements)
         return self.index_to_pair(index, p_shuffle)
@@ -1,4 +1,3 @@
-from collections import defaultdict
 from typing import Optional
 
 import numpy as np
@@ -65,43 +64,44 @@ class AffineOvertrust(VotingRightsAssignment):
             * min_voting_right (float)
             * overtrust (float)
         """
-        voting_rights = VotingRights()
         if len(users) == 0 or len(entities) == 0:
-            return voting_rights, entities
+            return VotingRights(), entities
 
-        entity_to_users: dict[int, set[int]] = {
-            entity_id: set()
-            for entity_id in entities.index
-        }
         if user_models is None:
             # In this case it's assumed that for any pair (entity, user) the privacy
             # is defined if and only if `user` expressed a judgement on `entity`.
-            for entity_id in privacy.entities():
-                entity_to_users[entity_id] = privacy.users(entity_id)
+            pairs = privacy.to_frame()[["user_id", "entity_id"]]
         else:
-            for user_id, model in user_models.items():
-                for entity_id in model.scored_entities():
-                    entity_to_users[entity_id].add(user_id)
-
-        trust_scores = users["trust_score"]
-        new_records = []
-        for entity_id, user_ids in entity_to_users.items():
-            privacy_weights = pd.Series(
-                {u: self.privacy_penalty if privacy[u, entity_id] else 1.0 for u in user_ids}
+            pairs = pd.DataFrame(
+                [
+                    (user_id, entity_id)
+                    for user_id, model in user_models.items()
+                    for entity_id in model.scored_entities()
+                ],
+                columns=["user_id", "entity_id"],
             )
-            (voting_rights_series, cumulative_trust, min_voting_right, overtrust) = (
-                self.compute_entity_voting_rights(
-                    trust_scores=trust_scores,
-                    privacy_weights=privacy_weights,
-                )
+        pairs = pairs[pairs["entity_id"].isin(entities.index)]
+        pairs = pairs.sort_values("entity_id", kind="stable")
+        user_ids, entity_ids = pairs["user_id"].to_numpy(), pairs["entity_id"].to_numpy()
+
+        trust_scores = users["trust_score"].reindex(user_ids).fillna(0.0).to_numpy()
+        is_private = privacy.get_many(user_ids, entity_ids) == 1.0
+        privacy_weights = np.where(is_private, self.privacy_penalty, 1.0)
+
+        # The pairs of each entity are a contiguous slice of the sorted arrays
+        starts = np.searchsorted(entity_ids, entities.index, side="left")
+        ends = np.searchsorted(entity_ids, entities.index, side="right")
+        voting_rights = np.empty(len(pairs))
+        new_records = []
+        for start, end in zip(starts, ends):
+            (voting_rights[start:end], cumulative_trust, min_voting_right, overtrust) = (
+                self._entity_voting_rights(trust_scores[start:end], privacy_weights[start:end])
             )
-            for user_id, voting_right in voting_rights_series.items():
-                voting_rights[user_id, entity_id] = voting_right  # type: ignore
             new_records.append((cumulative_trust, min_voting_right, overtrust))
 
         r = list(zip(*new_records))
         entities = entities.assign(cumulative_trust=r[0], min_voting_right=r[1], overtrust=r[2])
-        return voting_rights, entities
+        return VotingRights.from_arrays(user_ids, entity_ids, voting_rights), entities
 
     def compute_entity_voting_rights(
         self,
@@ -109,16 +109,25 @@ class AffineOvertrust(VotingRightsAssignment):
         privacy_weights: pd.Series,
     ) -> tuple[pd.Series, float, float, float]:
         trust_scores_np = trust_scores[privacy_weights.index].fillna(0.0).to_numpy()
-        privacy_weights_np = privacy_weights.to_numpy()
-        cumulative_trust = self.cumulative_trust(trust_scores_np, privacy_weights_np)
-        max_overtrust = self.maximal_overtrust(cumulative_trust)
-        min_voting_right = self.min_voting_right(
-            max_overtrust, trust_scores_np, privacy_weights_np
+        voting_rights, cumulative_trust, min_voting_right, overtrust = self._entity_voting_rights(
+            trust_scores_np, privacy_weights.to_numpy()
         )
-        voting_rights = pd.Series(
-            privacy_weights_np * trust_scores_np.clip(min=min_voting_right),
-            index=privacy_weights.index,
+        return (
+            pd.Series(voting_rights, index=privacy_weights.index),
+            cumulative_trust,
+            min_voting_right,
+            overtrust,
         )
+
+    def _entity_voting_rights(
+        self,
+        trust_scores: np.ndarray,
+        privacy_weights: np.ndarray,
+    ) -> tuple[np.ndarray, float, float, float]:
+        cumulative_trust = self.cumulative_trust(trust_scores, privacy_weights)
+        max_overtrust = self.maximal_overtrust(cumulative_trust)
+        min_voting_right = self.min_voting_right(max_overtrust, trust_scores, privacy_weights)
+        voting_rights = privacy_weights * trust_scores.clip(min=min_voting_right)
         return (
             voting_rights,
             cumulative_trust,
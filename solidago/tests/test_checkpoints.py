@@ -0,0 +1,78 @@
+from importlib import import_module
+
+import numpy as np
+import pandas as pd
+
+from solidago import PrivacySettings
+from solidago.aggregation import EntitywiseQrQuantile
+from solidago.pipeline import CheckpointStore, Pipeline
+from solidago.scoring_model import scores_frame
+
+
+STAGES = ["trust_propagation", "preference_learning", "voting_rights", "scaling", "aggregation"]
+
+
+def run_pipeline(pipeline, td, store, privacy=None):
+    privacy = td.privacy if privacy is None else privacy
+    return pipeline(td.users, td.vouches, td.entities, privacy, td.judgments, checkpoints=store)
+
+
+def skip_stages(monkeypatch, pipeline, stages):
+    def fail(*args, **kwargs):
+        raise AssertionError("This stage should have been loaded from its checkpoint")
+
+    for stage in stages:
+        monkeypatch.setattr(type(getattr(pipeline, stage)), "__call__", fail)
+
+
+def assert_same_results(results, expected_results):
+    users, voting_rights, user_models, global_model = results
+    expected_users, expected_voting_rights, expected_user_models, expected_global_model = (
+        expected_results
+    )
+    pd.testing.assert_frame_equal(users, expected_users, check_dtype=False)
+    pd.testing.assert_frame_equal(voting_rights.to_frame(), expected_voting_rights.to_frame())
+    pd.testing.assert_frame_equal(scores_frame(user_models), scores_frame(expected_user_models))
+    for array, expected_array in zip(global_model.to_arrays(), expected_global_model.to_arrays()):
+        np.testing.assert_array_equal(array, expected_array)
+
+
+def test_pipeline_skips_stages_with_checkpoints(tmp_path, monkeypatch):
+    td = import_module("data.data_4")
+    pipeline = Pipeline()
+    store = CheckpointStore(tmp_path)
+    results = run_pipeline(pipeline, td, store)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{stage}.npz" for stage in STAGES
+    )
+    assert len(results[3].scored_entities()) > 0
+
+    skip_stages(monkeypatch, pipeline, STAGES)
+    assert_same_results(run_pipeline(pipeline, td, store), results)
+
+
+def test_pipeline_runs_stages_with_changed_config(tmp_path, monkeypatch):
+    td = import_module("data.data_4")
+    store = CheckpointStore(tmp_path)
+    run_pipeline(Pipeline(), td, store)
+
+    pipeline = Pipeline(aggregation=EntitywiseQrQuantile(quantile=0.5, lipschitz=0.1, error=1e-5))
+    expected_results = run_pipeline(pipeline, td, None)
+    skip_stages(monkeypatch, pipeline, STAGES[:-1])
+    assert_same_results(run_pipeline(pipeline, td, store), expected_results)
+
+
+def test_pipeline_runs_stages_with_changed_inputs(tmp_path, monkeypatch):
+    td = import_module("data.data_4")
+    pipeline = Pipeline()
+    store = CheckpointStore(tmp_path)
+    run_pipeline(pipeline, td, store)
+
+    privacy = td.privacy.to_frame()
+    privacy.loc[0, "is_private"] = not privacy.loc[0, "is_private"]
+    privacy = PrivacySettings.from_arrays(
+        privacy["user_id"], privacy["entity_id"], privacy["is_private"]
+    )
+    expected_results = run_pipeline(pipeline, td, None, privacy)
+    skip_stages(monkeypatch, pipeline, ["trust_propagation", "preference_learning"])
+    assert_same_results(run_pipeline(pipeline, td, store, privacy), expected_results)
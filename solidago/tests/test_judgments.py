@@ -0,0 +1,40 @@
+import pandas as pd
+
+from solidago.judgments import DataFrameJudgments
+from solidago.pipeline.inputs import TournesolDataset
+
+
+def test_dataframe_judgments_per_user():
+    comparisons = pd.DataFrame({
+        "user_id": [2, 0, 2, 1, 0],
+        "entity_a": [0, 1, 2, 3, 4],
+        "entity_b": [5, 6, 7, 8, 9],
+        "comparison": [1., 2., 3., 4., 5.],
+        "comparison_max": 10.,
+    })
+    judgments = DataFrameJudgments(comparisons)
+    assert list(judgments[0]["comparisons"]["entity_a"]) == [1, 4]
+    assert list(judgments[1]["comparisons"]["entity_a"]) == [3]
+    assert list(judgments[2]["comparisons"]["entity_a"]) == [0, 2]
+    assert list(judgments[2]["comparisons"].index) == [0, 2]
+    assert len(judgments[2]["assessments"]) == 0
+    assert judgments[3] is None
+
+
+def test_dataframe_judgments_reassign_comparisons():
+    judgments = DataFrameJudgments()
+    assert judgments[0] is None
+    judgments.comparisons = pd.DataFrame({
+        "user_id": [0], "entity_a": [0], "entity_b": [1], "comparison": [1.], "comparison_max": [10.]
+    })
+    assert len(judgments[0]["comparisons"]) == 1
+
+
+def test_dataframe_judgments_match_masks_on_tournesol_dataset():
+    comparisons = TournesolDataset("tests/data/tiny_tournesol.zip").get_comparisons(
+        criterion="importance"
+    )
+    judgments = DataFrameJudgments(comparisons)
+    for user_id in comparisons["user_id"].unique():
+        expected = comparisons[comparisons["user_id"] == user_id]
+        pd.testing.assert_frame_equal(judgments[user_id]["comparisons"], expected)
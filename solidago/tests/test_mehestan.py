@@ -28,3 +28,65 @@ def test_learned_models(test):
     if "trust_score" not in td.users:
         td.users["trust_score"] = 1.0
     m_models = mehestan(td.learned_models, td.users, td.entities, td.voting_rights, td.privacy)
+
+
+def _random_models(n_users, n_entities, seed=0):
+    rng = np.random.default_rng(seed)
+    entities = pd.DataFrame(index=pd.Index(range(n_entities), name="entity_id"))
+    models, privacy = dict(), PrivacySettings()
+    for user in range(n_users):
+        models[user] = DirectScoringModel()
+        for entity in np.flatnonzero(rng.random(n_entities) < 0.7).tolist():
+            models[user][entity] = (rng.normal() * (user + 1), rng.random() / 2, rng.random() / 2)
+            privacy[user, entity] = bool(rng.random() < 0.3)
+    return models, entities, privacy
+
+def test_entity_ratios_match_pairwise_computation():
+    models, entities, privacy = _random_models(4, 20)
+    ratios = mehestan.compute_entity_ratios(models, models, entities, privacy)
+    for u, v in [(0, 1), (2, 3), (3, 0)]:
+        expected = list()
+        common = sorted(models[u].scored_entities() & models[v].scored_entities())
+        for a in range(len(common)):
+            for b in range(a):
+                e, f = common[a], common[b]
+                diffs = list()
+                for model in (models[u], models[v]):
+                    (score_e, left_e, right_e), (score_f, left_f, right_f) = model[e], model[f]
+                    if score_e - score_f >= 2 * left_e + 2 * right_f:
+                        diffs.append((score_e - score_f, left_e + right_f, right_e + left_f))
+                    elif score_f - score_e >= 2 * left_f + 2 * right_e:
+                        diffs.append((score_f - score_e, left_f + right_e, right_f + left_e))
+                if len(diffs) < 2:
+                    continue
+                (diff_u, left_u, right_u), (diff_v, left_v, right_v) = diffs
+                ratio = abs(diff_v / diff_u)
+                expected.append((
+                    ratio,
+                    0.5 ** (privacy[u, f] + privacy[v, f]),
+                    ratio - abs((diff_v - left_v) / (diff_u + right_u)),
+                    abs((diff_v + right_v) / (diff_u - left_u)) - ratio,
+                ))
+        np.testing.assert_allclose(np.array(ratios[u][v]).T, np.array(expected))
+
+def test_sampled_entity_ratios_are_reproducible():
+    models, entities, privacy = _random_models(3, 150)
+    seeded = Mehestan(n_diffs_sample_max=200, random_seed=42)
+    ratios = seeded.compute_entity_ratios(models, models, entities, privacy)
+    ratios_bis = seeded.compute_entity_ratios(models, models, entities, privacy)
+    for u, v in [(0, 1), (1, 2), (2, 0)]:
+        assert 0 < len(ratios[u][v][0]) <= 200
+        for values, values_bis in zip(ratios[u][v], ratios_bis[u][v]):
+            np.testing.assert_array_equal(values, values_bis)
+
+def test_mehestan_is_independent_of_n_jobs():
+    models, entities, privacy = _random_models(12, 30)
+    users = pd.DataFrame({ "trust_score": 1.0 }, index=pd.Index(range(12), name="user_id"))
+    sequential = Mehestan(min_activity=1.0, n_scalers_max=4)
+    parallel = Mehestan(min_activity=1.0, n_scalers_max=4, n_jobs=2)
+    sequential_models = sequential(models, users, entities, None, privacy)
+    parallel_models = parallel(models, users, entities, None, privacy)
+    assert set(parallel_models) == set(sequential_models)
+    for user, model in sequential_models.items():
+        assert parallel_models[user]._direct_scaling_parameters() \
+            == model._direct_scaling_parameters()
@@ -6,6 +6,9 @@ import pandas as pd
 import pytest
 
 import solidago.preference_learning as preference_learning
+from solidago.judgments import DataFrameJudgments
+from solidago.scoring_model import DirectScoringModel
+from solidago.solvers.optimize import njit_brentq
 
 
 @pytest.mark.parametrize("test", range(4))
@@ -19,6 +22,79 @@ def test_uniform_gbt(test):
             assert output == pytest.approx(target, abs=1e-1), (user, entity)
 
 
+def test_uniform_gbt_is_independent_of_n_jobs():
+    td = importlib.import_module("data.data_3")
+    sequential_models = preference_learning.UniformGBT()(td.judgments, td.users, td.entities)
+    parallel_models = preference_learning.UniformGBT(n_jobs=2)(
+        td.judgments, td.users, td.entities
+    )
+    assert set(parallel_models) == set(sequential_models)
+    for user, model in sequential_models.items():
+        assert dict(parallel_models[user].iter_entities()) == dict(model.iter_entities())
+
+
+def test_uniform_gbt_reuses_models_of_users_without_new_judgments():
+    td = importlib.import_module("data.data_3")
+    gbt = preference_learning.UniformGBT()
+    models = gbt(td.judgments, td.users, td.entities)
+    changed_user, unchanged_user = td.users.index[:2]
+    comparisons = td.judgments.comparisons
+    new_judgments = DataFrameJudgments(comparisons[comparisons["user_id"] == changed_user])
+    initialization = {
+        user: DirectScoringModel(dict(model.iter_entities())) for user, model in models.items()
+    }
+    unchanged_model = initialization[unchanged_user]
+    for entity_id, (score, left, right) in list(unchanged_model.iter_entities()):
+        unchanged_model[entity_id] = score + 1.0, left, right
+    initialization[changed_user][next(iter(initialization[changed_user].scored_entities()))] = (
+        100.0, 0.0, 0.0
+    )
+
+    incremental_models = gbt(td.judgments, td.users, td.entities, initialization, new_judgments)
+    assert incremental_models[unchanged_user] is unchanged_model
+    for entity_id, values in models[changed_user].iter_entities():
+        assert incremental_models[changed_user](entity_id) == pytest.approx(values, abs=1e-1)
+
+
+def test_uniform_gbt_relearns_models_of_users_with_deleted_judgments():
+    td = importlib.import_module("data.data_3")
+    gbt = preference_learning.UniformGBT()
+    user = td.users.index[0]
+    initialization = { user: DirectScoringModel({ -1: (5.0, 1.0, 1.0) }) }
+    models = gbt(td.judgments, td.users, td.entities, initialization, DataFrameJudgments())
+    assert -1 not in models[user].scored_entities()
+
+
+def test_uniform_gbt_relearns_models_of_users_with_deleted_judgments_of_same_entities():
+    td = importlib.import_module("data.data_3")
+    gbt = preference_learning.UniformGBT()
+    models = gbt(td.judgments, td.users, td.entities)
+    user = td.users.index[0]
+    comparisons = td.judgments.comparisons
+    user_comparisons = comparisons[comparisons["user_id"] == user]
+    # A deleted comparison whose entities are still compared in other comparisons
+    entity_counts = pd.concat([user_comparisons["entity_a"], user_comparisons["entity_b"]])
+    entity_counts = entity_counts.value_counts()
+    deleted = next(
+        index for index, row in user_comparisons.iterrows()
+        if entity_counts[row["entity_a"]] > 1 and entity_counts[row["entity_b"]] > 1
+    )
+    judgments = DataFrameJudgments(comparisons.drop(index=deleted))
+    initialization = {
+        user: DirectScoringModel(dict(model.iter_entities())) for user, model in models.items()
+    }
+    init_model = initialization[user]
+    assert gbt.is_up_to_date(init_model, judgments[user])
+
+    # All the remaining judgments of the user are new
+    new_judgments = DataFrameJudgments(user_comparisons.drop(index=deleted))
+    incremental_models = gbt(judgments, td.users, td.entities, initialization, new_judgments)
+    assert incremental_models[user] is not init_model
+    expected_model = gbt.user_learn(judgments[user], td.entities)
+    for entity_id, values in expected_model.iter_entities():
+        assert incremental_models[user](entity_id) == pytest.approx(values, abs=1e-1)
+
+
 @pytest.mark.parametrize("test", range(4))
 def test_lbfgs_uniform_gbt(test):
     pytest.importorskip("torch")
@@ -176,3 +252,44 @@ class TestGBT:
         assert scores["B"] == pytest.approx(scores["F"], abs=1e-2)
         assert scores["C"] == pytest.approx(scores["G"], abs=1e-2)
         assert scores["D"] == pytest.approx(scores["H"], abs=1e-2)
+
+
+def test_uniform_gbt_uncertainties_match_full_likelihood():
+    rng = np.random.default_rng(0)
+    n_entities, n_comparisons = 50, 200
+    entity_a = rng.integers(n_entities, size=n_comparisons)
+    entity_b = (entity_a + 1 + rng.integers(n_entities - 1, size=n_comparisons)) % n_entities
+    comparisons = pd.DataFrame({
+        "entity_a": entity_a,
+        "entity_b": entity_b,
+        "comparison": rng.integers(-10, 11, size=n_comparisons).astype(float),
+        "comparison_max": 10.0,
+    })
+    gbt = preference_learning.UniformGBT()
+    model = gbt.comparison_learning(comparisons)
+
+    # The reference uncertainties are the roots of the likelihood of all
+    # comparisons, of which only the comparisons involving the moved entity vary.
+    entities = sorted(set(entity_a) | set(entity_b))
+    scores = pd.Series({ entity: model(entity)[0] for entity in entities })
+    score_diff = (scores[entity_a].to_numpy() - scores[entity_b].to_numpy())
+    r_actual = (comparisons["comparison"] / comparisons["comparison_max"]).to_numpy()
+    ll_actual = gbt.log_likelihood_function(score_diff, r_actual)
+    for entity in entities:
+        indicator = (entity_a == entity).astype(int) - (entity_b == entity).astype(int)
+        args = (score_diff, r_actual, indicator, ll_actual)
+        expected = []
+        for a, b, sign in [(-gbt.MAX_UNCERTAINTY, 0.0, -1), (0.0, gbt.MAX_UNCERTAINTY, 1)]:
+            try:
+                expected.append(sign * njit_brentq(
+                    gbt.translated_negative_log_likelihood,
+                    args=args,
+                    xtol=1e-2,
+                    a=a,
+                    b=b,
+                    extend_bounds="no",
+                ))
+            except ValueError:
+                expected.append(gbt.MAX_UNCERTAINTY)
+        _, left, right = model(entity)
+        assert (left, right) == pytest.approx(tuple(expected), rel=1e-6), entity
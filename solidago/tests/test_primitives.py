@@ -5,6 +5,8 @@ from solidago.primitives import (
     qr_quantile,
     qr_median,
     qr_standard_deviation,
+    qr_uncertainty,
+    grouped_qr_quantile_and_uncertainty,
     lipschitz_resilient_mean,
 )
 
@@ -142,3 +144,22 @@ def test_lipschitz_resilient_mean():
         error=1e-5,
     )
     assert mean == pytest.approx(values.mean(), abs=1e-3)
+
+
+@pytest.mark.parametrize("quantile", [0.2, 0.5])
+def test_grouped_qr_quantile_and_uncertainty_matches_each_group(quantile):
+    rng = np.random.default_rng(0)
+    group_indptr = np.array([0, 1, 4, 10, 30])
+    values, voting_rights, lefts, rights = rng.normal(size=(4, 30))
+    voting_rights, lefts, rights = np.abs(voting_rights), np.abs(lefts), np.abs(rights)
+    quantiles, uncertainties = grouped_qr_quantile_and_uncertainty(
+        0.1, quantile, values, voting_rights, lefts, rights, group_indptr
+    )
+    for group, (start, end) in enumerate(zip(group_indptr[:-1], group_indptr[1:])):
+        args = values[start:end], voting_rights[start:end], lefts[start:end], rights[start:end]
+        expected_quantile = qr_quantile(0.1, quantile, *args)
+        expected_uncertainty = qr_uncertainty(
+            0.1, *args, median=expected_quantile if quantile == 0.5 else None
+        )
+        assert quantiles[group] == expected_quantile
+        assert uncertainties[group] == expected_uncertainty
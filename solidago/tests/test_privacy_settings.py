@@ -1,3 +1,5 @@
+import numpy as np
+
 from solidago.pipeline.inputs import TournesolDataset
 from solidago.privacy_settings import PrivacySettings
 
@@ -9,6 +11,23 @@ def test_privacy_io():
     assert privacy[1, 3]
     assert privacy[0, 2] is None
 
+def test_privacy_bulk_getters():
+    privacy = PrivacySettings({ 3: { 1: True, 2: False }, 5: { 2: True } })
+    privacy[1, 5] = False
+    privacy[2, 3] = None
+    entities, is_private = privacy.on_user(2)
+    assert list(entities) == [5] and list(is_private) == [1.0]
+    users, is_private = privacy.on_entity(5)
+    assert list(users) == [1, 2] and list(is_private) == [0.0, 1.0]
+    assert privacy.users() == { 1, 2 }
+    assert privacy.entities(1) == { 3, 5 }
+    assert privacy[2, 3] is None
+    np.testing.assert_array_equal(privacy.get_many([1, 2, 2], [5, 5, 3]), [0.0, 1.0, np.nan])
+    frame = privacy.to_frame()
+    assert frame.to_dict("list") == dict(
+        user_id=[1, 1, 2], entity_id=[3, 5, 5], is_private=[True, False, True]
+    )
+
 def test_tournesol_import():
     inputs = TournesolDataset("tests/data/tiny_tournesol.zip")
     privacy = inputs.get_pipeline_kwargs(criterion="largely_recommended")["privacy"]
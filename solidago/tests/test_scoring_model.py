@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from solidago.scoring_model import (
+    DirectScoringModel, ScaledScoringModel, PostProcessedScoringModel, scores_frame
+)
+
+
+base_model = DirectScoringModel({
+    0: (2.0, 1.0, 0.5),
+    1: (-1.0, 0.2, 0.1),
+    2: (0.1, 0.4, 0.3),
+    3: (-0.3, 0.1, 0.6),
+})
+
+def scaled_model():
+    model = ScaledScoringModel(base_model, 1.3, 0.2, 0.1, 0.4, 0.05, 0.2)
+    return ScaledScoringModel(model, 0.7, -0.4, 0.2, 0.1, 0.3, 0.1)
+
+def post_processed_model():
+    return PostProcessedScoringModel(scaled_model(), lambda x: -10 * x / np.sqrt(1 + x**2))
+
+
+@pytest.mark.parametrize("model_factory", [lambda: base_model, scaled_model, post_processed_model])
+def test_batch_scoring_matches_individual_scoring(model_factory):
+    model = model_factory()
+    entity_ids, scores, lefts, rights = model.to_arrays()
+    assert set(entity_ids) == model.scored_entities()
+    for entity_id, score, left, right in zip(entity_ids, scores, lefts, rights):
+        assert (score, left, right) == pytest.approx(model(entity_id))
+
+    scores, lefts, rights = model.score_many([3, 5, 0])
+    assert (scores[0], lefts[0], rights[0]) == pytest.approx(model(3))
+    assert np.isnan([scores[1], lefts[1], rights[1]]).all()
+    assert (scores[2], lefts[2], rights[2]) == pytest.approx(model(0))
+
+
+def test_scaled_model_collapses_scalings():
+    model = scaled_model()
+    assert model.base_model is base_model
+    assert model.multiplicator == pytest.approx(0.91)
+    assert model.translation == pytest.approx(-0.26)
+
+
+def test_scores_frame():
+    models = {
+        4: DirectScoringModel.from_arrays([1, 2], [0.5, 0.1], [0.1, 0.2], [0.3, 0.4]),
+        6: DirectScoringModel(),
+        5: base_model,
+    }
+    df = scores_frame(models, entities=pd.DataFrame(index=[0, 1]))
+    assert df["user_id"].tolist() == [4, 5, 5]
+    assert df["entity_id"].tolist() == [1, 0, 1]
+    assert df["scores"].tolist() == [0.5, 2.0, -1.0]
+    assert df["right_uncertainties"].tolist() == [0.3, 0.5, 0.1]
+    assert len(scores_frame({})) == 0
@@ -1,5 +1,6 @@
 import pytest
 import importlib
+import numpy as np
 import pandas as pd
 
 from solidago.pipeline.inputs import TournesolDataset
@@ -93,3 +94,43 @@ def test_trust_all():
     assert users.loc[0, "trust_score"] == 1.0
     assert users.loc[4, "trust_score"] == 1.0
     assert users.loc[2, "trust_score"] == 1.0
+
+
+def _sequential_lipschitrust(trust_propagator, users, vouches):
+    """ Reference implementation, which propagates trust vouch by vouch """
+    total_vouches = vouches["voucher"].value_counts() + trust_propagator.sink_vouch
+    pretrusts = users["is_pretrusted"] * trust_propagator.pretrust_value
+    trusts = pretrusts.copy()
+
+    n_iterations = -np.log(len(users) / trust_propagator.error) / np.log(trust_propagator.decay)
+    for _ in range(int(np.ceil(n_iterations))):
+        new_trusts = pretrusts.copy()
+        for row in vouches.itertuples():
+            discount = trust_propagator.decay * row.vouch / total_vouches[row.voucher]
+            new_trusts[row.vouchee] += discount * trusts[row.voucher]
+        new_trusts = new_trusts.clip(upper=1.0)
+        delta = np.linalg.norm(new_trusts - trusts, ord=1)
+        trusts = new_trusts
+        if delta < trust_propagator.error:
+            break
+    return trusts
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_lipschitrust_matches_sequential_propagation(seed):
+    np.random.seed(seed)
+    users = NormalUserModel(p_trustworthy=0.8, p_pretrusted=0.2, svd_dimension=5)(60)
+    vouches = ErdosRenyiVouchModel()(users)
+    vouches["vouch"] = np.random.random(len(vouches))
+
+    trust_propagator = LipschiTrust(pretrust_value=0.8, decay=0.8, sink_vouch=5.0, error=1e-8)
+    trusts = trust_propagator(users, vouches)["trust_score"]
+    expected = _sequential_lipschitrust(trust_propagator, users, vouches)
+    assert (trusts.to_numpy() == expected.to_numpy()).all()
+
+
+def test_lipschitrust_no_vouches():
+    users = pd.DataFrame({"is_pretrusted": [True, False]})
+    vouches = pd.DataFrame(columns=["voucher", "vouchee", "vouch"])
+    users = LipschiTrust()(users, vouches)
+    assert list(users["trust_score"]) == [0.8, 0.0]
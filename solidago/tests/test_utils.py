@@ -1,4 +1,7 @@
+import numpy as np
+
 from solidago.utils import date
+from solidago.utils.pairs import UnorderedPairs
 
 def test_week_date_to_week_number():
     assert date.week_date_to_week_number("2021-01-15") == 0
@@ -8,3 +11,8 @@ def test_week_date_to_week_number():
 def test_week_number_to_week_date():
     assert date.week_number_to_week_date(0) == "2021-01-11"
     assert date.week_number_to_week_date(2) == "2021-01-25"
+
+def test_unordered_pairs_indices_to_pairs():
+    pairs = UnorderedPairs(50)
+    firsts, seconds = pairs.indices_to_pairs(np.arange(pairs.n_pairs))
+    assert list(zip(firsts, seconds)) == list(pairs)
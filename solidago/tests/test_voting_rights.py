@@ -173,6 +173,19 @@ def test_voting_rights_abstraction():
     assert voting_rights[3, 46] == 0.8
 
 
+def test_voting_rights_from_arrays():
+    voting_rights = VotingRights.from_arrays([2, 1, 2], [7, 7, 4], [0.5, 1.0, 0.2])
+    assert voting_rights[1, 7] == 1.0
+    assert voting_rights[1, 4] == 0
+    users, values = voting_rights.on_entity(7)
+    assert list(users) == [1, 2] and list(values) == [1.0, 0.5]
+    entities, values = voting_rights.on_user(2)
+    assert list(entities) == [4, 7] and list(values) == [0.2, 0.5]
+    voting_rights[1, 4] = 0.3
+    assert voting_rights.entities() == { 4, 7 }
+    assert len(voting_rights.to_frame()) == 4
+
+
 def test_affine_overtrust():
     users = pd.DataFrame(dict(trust_score=[0.5, 0.6, 0.0, 0.4, 1]))
     users.index.name = "user_id"
@@ -213,5 +226,6 @@ def test_affine_overtrust_test_data(test):
         td.users, td.entities, td.vouches, td.privacy, user_models=None,
     )
     for entity in td.voting_rights.entities():
-        for user in td.voting_rights.on_entity(entity):
+        users, _ = td.voting_rights.on_entity(entity)
+        for user in users:
             assert td.voting_rights[user, entity] == voting_rights[user, entity]